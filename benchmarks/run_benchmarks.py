@@ -0,0 +1,253 @@
+"""
+Benchmarks for the feature extraction hot paths
+
+Times the Part 1 / Part 2 feature functions one document at a time on
+synthetic Lang-8-like pages (benchmarks/synthetic.py) of several sizes and
+reports, per function and size:
+    - docs/sec
+    - latency percentiles per document (p50 / p90 / p99, ms)
+    - peak Python memory allocated during a pass (tracemalloc, KiB)
+
+Runs offline and without lang-8.zip: NLTK data is never downloaded, and a
+benchmark whose NLTK package is not installed is reported as skipped.
+
+Results can be written to JSON and compared with a stored baseline; the run
+exits with status 1 if any benchmark got slower than the tolerance allows.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --tolerance 0.2
+    python benchmarks/run_benchmarks.py --only text_stats --sizes large --docs 500
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from benchmarks.synthetic import SIZES, make_documents
+from src.part_1 import extract_l1, extract_text, parse_html, parse_html_fast
+from src.part_2_lexicon_pos import extract_lexicon_features, get_POS_rato_features
+from src.part_2_stats import sentence_length_stats, text_stats
+from src.resources import set_offline
+
+# name -> (input kind, function of one input); kinds are prepared by _inputs
+BENCHMARKS = {
+    'extract_l1': ('soup', extract_l1),
+    'extract_text': ('soup', extract_text),
+    'parse_html': ('html', lambda html: parse_html(html, 'bench.html')),
+    'parse_html_fast': ('html', lambda html: parse_html_fast(html, 'bench.html')),
+    'extract_lexicon_features': ('text', extract_lexicon_features),
+    'get_POS_rato_features': ('text', get_POS_rato_features),
+    'sentence_length_stats': ('text', sentence_length_stats),
+    'text_stats': ('text', text_stats),
+}
+
+# Documents run before timing (resource loading, first-call costs)
+N_WARMUP = 5
+
+
+def _inputs(kind, documents):
+    """
+    Benchmark inputs of one kind for (filename, html) documents.
+    """
+    if kind == 'html':
+        return [html for _, html in documents]
+    if kind == 'soup':
+        return [BeautifulSoup(html, 'html.parser') for _, html in documents]
+    if kind == 'text':
+        return [parse_html(html, filename)[1] for filename, html in documents]
+    raise ValueError(f"Unknown input kind {kind!r}")
+
+
+def time_calls(func, inputs, repeat=1):
+    """
+    Per-call wall time of func over the inputs.
+
+    Returns:
+        np.ndarray: latencies in seconds, len(inputs) * repeat values
+    """
+    latencies = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter_ns()
+            func(item)
+            latencies.append(time.perf_counter_ns() - start)
+    return np.array(latencies, dtype=np.float64) / 1e9
+
+
+def peak_memory(func, inputs):
+    """
+    Peak Python memory allocated during one pass over the inputs (bytes).
+
+    Measured in a separate pass: tracemalloc slows the calls down.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        for item in inputs:
+            func(item)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def summarize(latencies, peak_bytes):
+    """
+    Result row for one benchmark and size.
+    """
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+    return {
+        'calls': int(len(latencies)),
+        'docs_per_sec': float(len(latencies) / latencies.sum()) if latencies.sum() > 0 else float('inf'),
+        'mean_ms': float(latencies.mean() * 1000),
+        'p50_ms': float(p50),
+        'p90_ms': float(p90),
+        'p99_ms': float(p99),
+        'peak_mem_kib': peak_bytes / 1024,
+    }
+
+
+def run_benchmarks(names=None, sizes=None, n_docs=200, repeat=1, seed=521):
+    """
+    Run the selected benchmarks on every selected document size.
+
+    Args:
+        names (list): keys of BENCHMARKS (default: all)
+        sizes (list): keys of synthetic.SIZES (default: all)
+        n_docs (int): timed documents per size
+        repeat (int): timed passes over the documents
+        seed (int): seed for the synthetic documents
+
+    Returns:
+        dict: {benchmark: {size: result row, or {'skipped': reason}}}
+    """
+    names = names or list(BENCHMARKS)
+    sizes = sizes or list(SIZES)
+
+    documents = {size: make_documents(n_docs, size, seed=seed) for size in sizes}
+    # Separate documents for warm-up, so caches are not primed with the timed ones
+    warmup = {size: make_documents(N_WARMUP, size, seed=seed + 1) for size in sizes}
+
+    results = {}
+    for name in names:
+        kind, func = BENCHMARKS[name]
+        results[name] = {}
+        for size in sizes:
+            try:
+                for item in _inputs(kind, warmup[size]):
+                    func(item)
+            except LookupError as exc:
+                # Missing NLTK data in offline mode
+                results[name][size] = {'skipped': str(exc).strip().splitlines()[0]}
+                continue
+
+            inputs = _inputs(kind, documents[size])
+            latencies = time_calls(func, inputs, repeat=repeat)
+            results[name][size] = summarize(latencies, peak_memory(func, inputs))
+
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare docs/sec with a baseline run.
+
+    A benchmark regresses when its docs/sec falls below
+    baseline * (1 - tolerance). Benchmarks missing or skipped on either side
+    are not compared.
+
+    Returns:
+        list: (benchmark, size, baseline docs/sec, current docs/sec, ratio, regressed)
+    """
+    rows = []
+    for name, by_size in results.items():
+        for size, row in by_size.items():
+            base = baseline.get(name, {}).get(size, {})
+            if 'docs_per_sec' not in row or 'docs_per_sec' not in base:
+                continue
+            ratio = row['docs_per_sec'] / base['docs_per_sec']
+            rows.append((name, size, base['docs_per_sec'], row['docs_per_sec'], ratio,
+                         ratio < 1 - tolerance))
+    return rows
+
+
+def print_results(results):
+    header = f"{'benchmark':<26}{'size':<8}{'docs/sec':>12}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'peak KiB':>11}"
+    print(header)
+    print('-' * len(header))
+    for name, by_size in results.items():
+        for size, row in by_size.items():
+            if 'skipped' in row:
+                print(f"{name:<26}{size:<8}  skipped: {row['skipped']}")
+                continue
+            print(f"{name:<26}{size:<8}{row['docs_per_sec']:>12.1f}{row['p50_ms']:>10.3f}"
+                  f"{row['p90_ms']:>10.3f}{row['p99_ms']:>10.3f}{row['peak_mem_kib']:>11.1f}")
+
+
+def print_comparison(rows, tolerance):
+    print(f"\nCompared with baseline (regression = more than {tolerance:.0%} fewer docs/sec):")
+    for name, size, base, current, ratio, regressed in rows:
+        flag = 'REGRESSION' if regressed else ''
+        print(f"{name:<26}{size:<8}{base:>12.1f} -> {current:>10.1f}  x{ratio:.2f}  {flag}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Benchmarks to run')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), help='Document sizes')
+    parser.add_argument('--docs', type=int, default=200, help='Timed documents per size')
+    parser.add_argument('--repeat', type=int, default=1, help='Timed passes over the documents')
+    parser.add_argument('--seed', type=int, default=521)
+    parser.add_argument('--output', type=Path, help='Write this run to a JSON file')
+    parser.add_argument('--save-baseline', type=Path, help='Write this run as the new baseline')
+    parser.add_argument('--baseline', type=Path, help='Baseline JSON to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed docs/sec drop before a benchmark counts as regressed')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    # Never download NLTK data while benchmarking
+    set_offline(True)
+
+    results = run_benchmarks(args.only, args.sizes, n_docs=args.docs, repeat=args.repeat,
+                             seed=args.seed)
+    print_results(results)
+
+    run = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'docs': args.docs,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(run, indent=2))
+            print(f"\nWrote {path}")
+
+    if args.baseline is not None:
+        if not args.baseline.exists():
+            print(f"\nNo baseline at {args.baseline}; create one with --save-baseline")
+        else:
+            baseline = json.loads(args.baseline.read_text())['results']
+            rows = compare(results, baseline, args.tolerance)
+            print_comparison(rows, args.tolerance)
+            if any(regressed for *_, regressed in rows):
+                sys.exit(1)
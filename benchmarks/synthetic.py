@@ -0,0 +1,97 @@
+"""
+Synthetic Lang-8-like documents for the benchmarks
+
+Pages mimic the structure part_1 reads (a profile list with
+<li class='speaking'> and the entry in <div id='body_show_ori'>). The entry
+is made of learner-style sentences drawn from a fixed vocabulary covering
+articles, pronouns, prepositions, modals, adjectives and the lexicon words,
+so every feature function does realistic work. Generation is seeded and
+needs neither the network nor lang-8.zip.
+"""
+
+import random
+
+# Approximate words per entry for each named size
+SIZES = {
+    'small': 50,
+    'medium': 250,
+    'large': 1000,
+}
+
+L1S = ['Japanese', 'Korean', 'Mandarin', 'French', 'Spanish', 'Russian']
+
+SUBJECTS = ['I', 'we', 'my friend', 'my teacher', 'they', 'she', 'he', 'my family']
+VERBS = ['went to', 'visited', 'studied in', 'talked about', 'liked', 'wanted to see',
+         'remembered', 'wrote about', 'prayed at', 'walked around']
+OBJECTS = ['the church', 'a small cafe', 'Tokyo', 'Seoul', 'Paris', 'the library', 'Madrid',
+           'an old temple', 'the station', 'my school', 'Beijing', 'a holy place', 'Japan']
+MODALS = ['can', 'could', 'should', 'would', 'must', 'might', 'will']
+ADJECTIVES = ['happy', 'difficult', 'beautiful', 'interesting', 'tired', 'new', 'Korean',
+              'Chinese', 'Japanese', 'French', 'quiet', 'famous']
+PREPOSITIONS = ['in', 'on', 'at', 'with', 'after', 'before', 'for', 'during']
+TIMES = ['yesterday', 'last week', 'the morning', 'the weekend', 'summer vacation', 'class']
+ENDINGS = ['.', '.', '.', '!', '?', '...']
+
+PAGE = """<html><head><title>Lang-8 entry</title></head><body>
+<ul class='user_info'>
+<li class='gender'>Female</li>
+<li class='speaking' data-title='Native language' rel='tooltip' title='Native language'>{l1}</li>
+<li class='studying'>English</li>
+</ul>
+<div id='body_show_ori'>{body}</div>
+<div id='body_show_mod'>Corrections are not part of the entry.</div>
+</body></html>"""
+
+
+def _sentence(rng):
+    pattern = rng.randrange(4)
+    if pattern == 0:
+        words = [rng.choice(SUBJECTS), rng.choice(VERBS), rng.choice(OBJECTS),
+                 rng.choice(PREPOSITIONS), rng.choice(TIMES)]
+    elif pattern == 1:
+        words = [rng.choice(SUBJECTS), rng.choice(MODALS), 'be', rng.choice(ADJECTIVES)]
+    elif pattern == 2:
+        words = ['It', 'was', 'a', rng.choice(ADJECTIVES), 'day', ',', 'so', rng.choice(SUBJECTS),
+                 rng.choice(VERBS), rng.choice(OBJECTS)]
+    else:
+        words = ['The', rng.choice(ADJECTIVES), 'food', rng.choice(PREPOSITIONS),
+                 rng.choice(OBJECTS), 'was', 'very', rng.choice(ADJECTIVES)]
+    text = ' '.join(words).replace(' ,', ',')
+    return text[0].upper() + text[1:] + rng.choice(ENDINGS)
+
+
+def make_entry(n_words, rng):
+    """
+    Entry text of roughly n_words words, split into <p> paragraphs.
+    """
+    paragraphs, current, count = [], [], 0
+    while count < n_words:
+        sentence = _sentence(rng)
+        current.append(sentence)
+        count += len(sentence.split())
+        if len(current) >= rng.randint(3, 6):
+            paragraphs.append(current)
+            current = []
+    if current:
+        paragraphs.append(current)
+    return ''.join(f"<p>{' '.join(p)}</p>" for p in paragraphs)
+
+
+def make_documents(n_docs, size='medium', seed=521):
+    """
+    Deterministic synthetic pages.
+
+    Args:
+        n_docs (int): number of documents
+        size (str): key of SIZES
+        seed (int): random seed
+
+    Returns:
+        list: (filename, html) pairs
+    """
+    rng = random.Random(f"{seed}-{size}")
+    n_words = SIZES[size]
+    return [
+        (f"{size}_{i}.html", PAGE.format(l1=rng.choice(L1S), body=make_entry(n_words, rng)))
+        for i in range(n_docs)
+    ]
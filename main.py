@@ -1,68 +1,158 @@
 """
 main.py
 
-Activate the whole pipeline:
-- runs src/part_3.py (data build -> vectorize -> baseline -> ablation -> retrain)
-- then runs src/part_5.py (EDA plots -> grid search -> RFECV -> scores)
+Activate the whole pipeline (src/pipeline.py):
+- part 3 stages: extract -> featurize -> vectorize -> baseline -> compare -> ablation
+- part 5 stages: tune -> select -> report -> export (model bundle for src/predict.py)
+
+Every stage saves its outputs under artifacts/, so a single stage (or part)
+reuses the cached outputs of earlier stages instead of recomputing them.
 
 Usage:
     python main.py
     python main.py --step part_3
     python main.py --step part_5
+    python main.py --step tune
+    python main.py --profile --cprofile featurize
+    python main.py --pos-tagger cached
+    python main.py --labels l1 --max-per-class 2000 --scoring balanced_accuracy
+    python main.py --model hist_gb
+    python main.py --step select --selection rfecv --selection-step 0.2
 """
 
 from __future__ import annotations
 
 import argparse
-import os
-import runpy
 from pathlib import Path
 
+from src.labels import LABEL_SCHEMES
+from src.models import DEFAULT_MODEL, MODELS
+from src.pipeline import PART_3_STAGES, PART_5_STAGES, STAGES, PipelineConfig, run_pipeline
+from src.selection import SELECTION_METHODS
+from src.taggers import TAGGERS
 
-def run_part_3_and_part_5(project_root: Path, step: str = "all") -> None:
-    src_dir = project_root / "src"
-    part_3_path = src_dir / "part_3.py"
-    part_5_path = src_dir / "part_5.py"
-
-    if not part_3_path.exists():
-        raise FileNotFoundError(f"Missing: {part_3_path}")
-    if not part_5_path.exists():
-        raise FileNotFoundError(f"Missing: {part_5_path}")
-
-    # 1) Change CWD so that Path.cwd().parent inside part_3.py resolves correctly
-    old_cwd = Path.cwd()
-    os.chdir(src_dir)
-
-    try:
-        # 2) Run part_3 and capture its globals
-        globals_after_part_3 = {}
-        if step in ("all", "part_3"):
-            print("\n========== Running PART 3 ==========\n")
-            globals_after_part_3 = runpy.run_path(str(part_3_path))
-
-        # 3) Run part_5 in the SAME namespace (so it can see X_train_array, vec, test_tree, etc.)
-        if step in ("all", "part_5"):
-            print("\n========== Running PART 5 ==========\n")
+STEPS = {
+    "all": tuple(STAGES),
+    "part_3": PART_3_STAGES,
+    "part_5": PART_5_STAGES,
+    **{stage: (stage,) for stage in STAGES},
+}
 
-            # If user runs only part_5, we must first run part_3 to create required variables.
-            if step == "part_5" and not globals_after_part_3:
-                globals_after_part_3 = runpy.run_path(str(part_3_path))
 
-            runpy.run_path(str(part_5_path), init_globals=globals_after_part_3)
-
-        print("\nDone.\n")
-
-    finally:
-        os.chdir(old_cwd)
+def selection_step(value: str) -> int | float:
+    """
+    Whole numbers are a feature count, values in (0, 1) a fraction.
+    """
+    step = float(value)
+    if step <= 0:
+        raise argparse.ArgumentTypeError(f"step must be positive, got {value}")
+    return step if step < 1 else int(step)
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--step",
-        choices=["all", "part_3", "part_5"],
+        choices=list(STEPS),
         default="all",
-        help="Which step to run",
+        help="Which step (or single stage) to run",
+    )
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=-1,
+        help="Worker processes / parallel fits (-1 = all cores)",
+    )
+    parser.add_argument(
+        "--artifact-dir",
+        type=Path,
+        default=None,
+        help="Where stage outputs are cached (default: artifacts/)",
+    )
+    parser.add_argument(
+        "--pos-tagger",
+        choices=list(TAGGERS),
+        default="nltk",
+        help="POS tagging backend (see src/taggers.py)",
+    )
+    parser.add_argument(
+        "--labels",
+        choices=LABEL_SCHEMES,
+        default="binary",
+        help="Classes to predict: Asian / European, language family, or every L1 (see src/labels.py)",
+    )
+    parser.add_argument(
+        "--exclude-l1",
+        nargs="*",
+        default=[],
+        help="L1s whose documents are left out",
+    )
+    parser.add_argument(
+        "--sample-fraction",
+        type=float,
+        default=None,
+        help="Train on a stratified fraction of the training documents",
+    )
+    parser.add_argument(
+        "--max-per-class",
+        type=int,
+        default=None,
+        help="Train on at most this many documents per class",
+    )
+    parser.add_argument(
+        "--scoring",
+        default="accuracy",
+        help="sklearn scorer for tuning and RFECV (e.g. balanced_accuracy, f1_macro)",
+    )
+    parser.add_argument(
+        "--ngram-features",
+        type=int,
+        default=0,
+        help="Add hashed word + char n-grams with this many columns each (e.g. 262144; 0 = off)",
+    )
+    parser.add_argument(
+        "--model",
+        choices=list(MODELS),
+        default=DEFAULT_MODEL,
+        help="Model for baseline, ablation, tuning and RFECV (see src/models.py)",
+    )
+    parser.add_argument(
+        "--compare-models",
+        nargs="+",
+        choices=list(MODELS),
+        default=None,
+        help="Models fitted side by side by the compare stage (default: all, "
+             "without hist_gb when --ngram-features is set)",
+    )
+    parser.add_argument(
+        "--selection",
+        choices=SELECTION_METHODS,
+        default="rfecv",
+        help="Feature selection method of the select stage (see src/selection.py)",
+    )
+    parser.add_argument(
+        "--selection-step",
+        type=selection_step,
+        default=1,
+        help="RFECV features dropped per round, or a fraction (0-1) of the remaining ones "
+             "(always a fraction with --ngram-features)",
+    )
+    parser.add_argument(
+        "--min-features",
+        type=int,
+        default=1,
+        help="Never select fewer features than this",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time every stage and feature extractor; report in reports/profiling/",
+    )
+    parser.add_argument(
+        "--cprofile",
+        choices=list(STAGES),
+        default=None,
+        help="Run this stage under cProfile (dumped to reports/profiling/<stage>.prof)",
     )
     return parser.parse_args()
 
@@ -70,4 +160,24 @@ def parse_args() -> argparse.Namespace:
 if __name__ == "__main__":
     args = parse_args()
     project_root = Path(__file__).resolve().parent
-    run_part_3_and_part_5(project_root, step=args.step)
+    config = PipelineConfig(
+        root=project_root,
+        n_jobs=args.n_jobs,
+        artifact_dir=args.artifact_dir,
+        pos_tagger=args.pos_tagger,
+        label_scheme=args.labels,
+        exclude_l1=tuple(args.exclude_l1),
+        sample_fraction=args.sample_fraction,
+        max_per_class=args.max_per_class,
+        scoring=args.scoring,
+        ngram_features=args.ngram_features,
+        model=args.model,
+        compare_models=tuple(args.compare_models) if args.compare_models else None,
+        selection=args.selection,
+        selection_step=args.selection_step,
+        min_features_to_select=args.min_features,
+        profile=args.profile,
+        cprofile_stage=args.cprofile,
+    )
+    run_pipeline(config, STEPS[args.step])
+    print("\nDone.\n")
@@ -1,76 +1,558 @@
-from src.part_1 import iterate_documents
-from src.part_2_stats import sentence_length_stats, text_stats
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+
+from src import profiling, taggers
+from src.corpus import Corpus, is_corpus
+from src.feature_store import FeatureStore, content_hash
+from src.labels import BINARY_LABELS
+from src.part_1 import PARSERS, iter_zip_members
+from src.part_2_analysis import analyze_batch, as_analysis, tag_docs
+from src.part_2_stats import sentence_length_stats, text_stats, text_stats_batch
 from src.part_2_lexicon_pos import extract_lexicon_features, get_POS_rato_features
 
+# Order matters: a filename listed in several splits goes to the first one
+SPLITS = ('train', 'dev', 'test')
+
+# (name, version, function) in output order. Bump an extractor's version
+# whenever its output changes so cached rows from the old code are recomputed.
+FEATURE_EXTRACTORS = [
+    # === 8 features (Lexicon and POS features)
+    ('lexicon', '3', extract_lexicon_features),
+    ('pos', '3', get_POS_rato_features),
+    # === 7 features (Sentence segmentation–based, Statistical) ===
+    ('sentence', '1', partial(sentence_length_stats, long_thresh=20)),
+    ('text_stats', '1', text_stats),
+]
+
+# Extractors whose output depends on the POS tagging backend (src/taggers.py)
+TAGGED_EXTRACTORS = {'lexicon', 'pos'}
+
+def extractor_versions(backend=None):
+    """
+    (name, version) of each extractor as used for caching and model bundles.
+    With a POS backend other than the default, the tagged extractors get it
+    appended to their version, e.g. 'pos' '1+spacy'.
+
+    Args:
+        backend (str): POS backend, None for this process's (taggers.get_backend)
+
+    Returns:
+        list: (name, version) in FEATURE_EXTRACTORS order
+    """
+    backend = backend or taggers.get_backend()
+    versions = []
+    for name, version, _ in FEATURE_EXTRACTORS:
+        if name in TAGGED_EXTRACTORS and backend != taggers.DEFAULT_BACKEND:
+            version = f'{version}+{backend}'
+        versions.append((name, version))
+    return versions
+
+def _text_stats_records(docs):
+    return text_stats_batch(docs).to_dict('records')
+
+# Optional many-documents-at-once versions of extractors, same outputs
+BATCH_EXTRACTORS = {
+    'text_stats': _text_stats_records,
+}
+
+# Feature names produced by each extractor, e.g. for group ablation
+FEATURE_GROUPS = {
+    'lexicon': ['asian_top_word_match', 'Religious_Feature'],
+    'pos': ['article_ratio', 'pronoun_density', 'preposition_ratio',
+            'modal_verb_ratio', 'adjective_ratio'],
+    'sentence': ['sent_per_100_tokens', 'avg_sent_len_tokens', 'sent_cv_log'],
+    'text_stats': ['unique_lemma_ratio', 'hapax_ratio', 'mean_word_len', 'punct_per_token'],
+}
+
 def create_label(l1):
     """
     Convert L1 to binary class label.
-    
+
     Args:
         l1 (str): Native language
-    
+
     Returns:
         str: 'European' or 'Asian', or None for other languages
+
+    Other label schemes (language family, one class per L1): src/labels.py
     """
-    if l1 in ['French', 'Spanish']:
-        return 'European'
-    elif l1 in ['Mandarin', 'Japanese', 'Korean']:
-        return 'Asian'
-    else:
-        return None
+    return BINARY_LABELS.get(l1)
 
-def build_dataset(zip_path, train_files, dev_files, test_files):
+def extract_features(text):
     """
-    Build train/dev/test datasets with features and labels.
-    
+    Compute the full feature dict for one document.
+
+    The text is tokenized, POS-tagged and sentence-split once, and the
+    analysis is shared by all four extractors.
+
+    Args:
+        text: Document text (str or DocAnalysis)
+
+    Returns:
+        dict: feature name -> value
+    """
+    doc = as_analysis(text)
+
+    # Start a fresh feature dict for this document
+    features = {}
+    for _, _, extractor in FEATURE_EXTRACTORS:
+        features.update(extractor(doc))
+
+    return features
+
+def read_split(path):
+    """
+    Read a split file (one filename per line) into a set.
+    """
+    with open(path) as f:
+        return set(line.strip() for line in f)
+
+def split_members(zip_path, split_sets):
+    """
+    List the zip members that belong to one of the splits, without
+    decompressing anything.
+
     Args:
         zip_path: Path to lang-8.zip
-        train_files, dev_files, test_files: Paths to files listing filenames for each split
-    
+        split_sets (dict): split name -> set of filenames
+
     Returns:
-        tuple: (X_train, y_train, X_dev, y_dev, X_test, y_test)
+        list: (member, split) pairs in zip order
+    """
+    members = []
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        for info in zf.infolist():
+            member = info.filename
+            if not member.endswith('.html'):
+                continue
+
+            # Match filename format in train/dev/test lists
+            filename_only = member.split("/")[-1]
+            for split in SPLITS:
+                if filename_only in split_sets[split]:
+                    members.append((member, split))
+                    break
+
+    return members
+
+def _stream_members(zip_path, split_of):
+    """
+    (member, raw) for exactly the given members, read ahead by a background
+    thread. The allow-list also matches bare filenames, so members of other
+    directories sharing a filename are dropped here.
     """
-    X_train, y_train = [], []
-    X_dev, y_dev = [], []
-    X_test, y_test = [], []
+    for member, raw in iter_zip_members(zip_path, allow=split_of):
+        if member in split_of:
+            yield member, raw
+
+def _parse_member(raw, member, parser='fast'):
+    """
+    Decode and parse the raw bytes of one zip member.
+
+    Returns:
+        tuple: (l1, text, filename)
+    """
+    with profiling.record(f'parse:{parser}'):
+        return PARSERS[parser](raw.decode('utf-8', errors='ignore'), member)
+
+def _featurize_batch(documents, store, parser):
+    """
+    Feature dicts for a batch of labelled documents.
+
+    Extractor outputs already in the store are reused; everything else is
+    computed from one DocAnalysis per document, with sentence segmentation
+    for the whole batch done in a single nlp.pipe pass. Extractors listed in
+    BATCH_EXTRACTORS run once over all documents that need them.
+
+    Args:
+        documents (list): (member, digest, raw, text) -- text is None if not parsed yet
+        store: FeatureStore or None
+        parser (str): HTML backend used to parse documents whose text is needed
+
+    Returns:
+        list: feature dicts, in input order
+    """
+    versions = dict(extractor_versions())
+    outputs = []
+    for member, digest, _, _ in documents:
+        cached = {}
+        if store is not None:
+            for name, version in versions.items():
+                features = store.get_features(member, digest, name, version)
+                if features is not None:
+                    cached[name] = features
+        outputs.append(cached)
+
+    pending = [i for i, cached in enumerate(outputs) if len(cached) < len(FEATURE_EXTRACTORS)]
+    texts = []
+    for i in pending:
+        member, _, raw, text = documents[i]
+        if text is None:
+            # L1 came from the cache -> parse only now that a feature is missing
+            text = _parse_member(raw, member, parser)[1]
+        texts.append(text)
+
+    with profiling.record('segment:spacy', calls=len(texts)):
+        docs = list(analyze_batch(texts, batch_size=max(1, len(texts))))
+    # The sentences of documents missing POS features are tagged in one backend call
+    tag_docs([doc for i, doc in zip(pending, docs) if 'pos' not in outputs[i]])
+    for name, _, extractor in FEATURE_EXTRACTORS:
+        todo = [(i, doc) for i, doc in zip(pending, docs) if name not in outputs[i]]
+        if not todo:
+            continue
+
+        with profiling.record(f'extractor:{name}', calls=len(todo)):
+            if name in BATCH_EXTRACTORS:
+                computed = BATCH_EXTRACTORS[name]([doc for _, doc in todo])
+            else:
+                computed = [extractor(doc) for _, doc in todo]
+
+        for (i, _), features in zip(todo, computed):
+            outputs[i][name] = features
+            if store is not None:
+                member, digest = documents[i][:2]
+                store.put_features(member, digest, name, versions[name], features)
+
+    results = []
+    for cached in outputs:
+        features = {}
+        for name, _, _ in FEATURE_EXTRACTORS:
+            features.update(cached[name])
+        results.append(features)
+    return results
+
+def featurize_texts(texts):
+    """
+    Feature dicts for plain document texts (no zip member, no cache), e.g.
+    new documents to classify. Same features as build_dataset.
+
+    Returns:
+        list: feature dicts, in input order
+    """
+    return _featurize_batch([(None, None, None, text) for text in texts], None, None)
+
+def process_members(members, zip_path, cache_path=None, parser='fast', batch_size=256,
+                    label_fn=create_label, pos_tagger=None):
+    """
+    Parse and featurize a shard of zip members.
+
+    Members are handled batch_size at a time, which bounds memory and lets
+    sentence segmentation run batched. With a cache, a document whose L1 and
+    features are all stored under its current content hash is neither parsed
+    nor featurized again.
+
+    Args:
+        members (list): (member, split) pairs
+        zip_path: Path to lang-8.zip
+        cache_path: Optional path to a FeatureStore database
+        parser (str): HTML backend from part_1.PARSERS ('fast' or 'bs4')
+        batch_size (int): Documents per featurization batch
+        label_fn: l1 -> label, None to skip the document (see src/labels.py)
+        pos_tagger (str): POS backend (taggers.TAGGERS), None for this process's
+
+    Returns:
+        list: (split, features, label) for every labelled document, in input order
+    """
+    results = []
+    store_cm = FeatureStore(cache_path) if cache_path else nullcontext()
+    split_of = dict(members)
+    # Members stream out of the zip in archive order (= the order of
+    # split_members) while the previous ones are parsed
+    stream = _stream_members(zip_path, split_of)
+    with store_cm as store, taggers.using_backend(pos_tagger):
+        for batch in _batches(members, batch_size):
+            documents, splits, labels = [], [], []
+            for _, (member, raw) in zip(batch, stream):
+                split = split_of[member]
+                text = None
+                digest = None
+                found, l1 = False, None
+                if store is not None:
+                    digest = content_hash(raw, parser)
+                    found, l1 = store.get_l1(member, digest)
+                if not found:
+                    l1, text, _ = _parse_member(raw, member, parser)
+                    if store is not None:
+                        store.put_l1(member, digest, l1)
+
+                # Make label (e.g., European vs Asian); skip others
+                label = label_fn(l1)
+                if label is None:
+                    continue
+
+                documents.append((member, digest, raw, text))
+                splits.append(split)
+                labels.append(label)
+
+            features = _featurize_batch(documents, store, parser)
+            results.extend(zip(splits, features, labels))
+
+            if store is not None:
+                store.commit()
+
+    return results
 
-    with open(train_files) as f:
-        train_set = set(line.strip() for line in f)
+def extract_members(members, zip_path, parser='fast', label_fn=create_label):
+    """
+    Parse a shard of zip members without featurizing them.
 
-    with open(dev_files) as f:
-        dev_set = set(line.strip() for line in f)
+    Args:
+        members (list): (member, split) pairs
+        zip_path: Path to lang-8.zip
+        parser (str): HTML backend from part_1.PARSERS ('fast' or 'bs4')
+        label_fn: l1 -> label, None to skip the document (see src/labels.py)
 
-    with open(test_files) as f:
-        test_set = set(line.strip() for line in f)
+    Returns:
+        list: one record dict (member, split, l1, label, text, content_hash)
+            per labelled document, in input order
+    """
+    records = []
+    split_of = dict(members)
+    for member, raw in _stream_members(zip_path, split_of):
+        l1, text, _ = _parse_member(raw, member, parser)
 
-    for l1, text, filename in iterate_documents(zip_path):
         # Make label (e.g., European vs Asian); skip others
-        label = create_label(l1)
+        label = label_fn(l1)
         if label is None:
             continue
 
-        # Start a fresh feature dict for this document
-        features = {}
+        records.append({
+            'member': member,
+            'split': split_of[member],
+            'l1': l1,
+            'label': label,
+            'text': text,
+            'content_hash': content_hash(raw, parser),
+        })
+
+    return records
+
+def featurize_records(records, cache_path=None, batch_size=256, pos_tagger=None):
+    """
+    Feature dicts for already extracted records (see extract_members).
+
+    Args:
+        pos_tagger (str): POS backend (taggers.TAGGERS), None for this process's
+
+    Returns:
+        list: feature dicts, in input order
+    """
+    results = []
+    store_cm = FeatureStore(cache_path) if cache_path else nullcontext()
+    with store_cm as store, taggers.using_backend(pos_tagger):
+        for batch in _batches(records, batch_size):
+            documents = [(r['member'], r['content_hash'], None, r['text']) for r in batch]
+            results.extend(_featurize_batch(documents, store, parser=None))
+            if store is not None:
+                store.commit()
+
+    return results
+
+def _resolve_n_jobs(n_jobs):
+    """
+    Turn an n_jobs value (None / -1 meaning all cores) into a worker count.
+    """
+    if n_jobs is None or n_jobs < 0:
+        return os.cpu_count() or 1
+    return max(1, n_jobs)
+
+def _batches(items, size):
+    """
+    Consecutive chunks of at most `size` items.
+    """
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def _shards(items, n_shards):
+    """
+    Cut a list into at most n_shards contiguous, order-preserving chunks.
+    """
+    return _batches(items, max(1, -(-len(items) // n_shards)))
+
+def _profiled_shard(func, shard, *args):
+    """
+    Worker side of _map_shards with profiling on: the worker's totals are
+    returned along with the shard results.
+    """
+    profiling.enable()
+    profiling.reset()
+    return func(shard, *args), profiling.snapshot()
+
+def _map_shards(func, items, n_jobs, *args):
+    """
+    Run func(shard, *args) over a list split into shards, in a process pool
+    when n_jobs != 1, and concatenate the per-shard result lists in order.
+    """
+    n_workers = _resolve_n_jobs(n_jobs)
+    if n_workers == 1 or len(items) <= 1:
+        return func(items, *args)
+
+    # A few shards per worker keeps the pool busy when documents vary in length
+    shards = _shards(items, n_workers * 4)
+    profiled = profiling.is_enabled()
+    task = partial(_profiled_shard, func) if profiled else func
+    results = []
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        # map() yields in submission order -> deterministic merge
+        jobs = pool.map(task, shards, *[[arg] * len(shards) for arg in args])
+        for shard_results in jobs:
+            if profiled:
+                shard_results, stats = shard_results
+                profiling.merge(stats)
+            results.extend(shard_results)
+    return results
+
+def _read_splits(train_files, dev_files, test_files):
+    return {
+        'train': read_split(train_files),
+        'dev': read_split(dev_files),
+        'test': read_split(test_files),
+    }
+
+def corpus_records(corpus_path, split_sets, label_fn=create_label):
+    """
+    Labelled records of a pre-extracted corpus (see src/corpus.py) that
+    belong to one of the splits, in the same shape as extract_members.
+    Labels are recomputed from the L1 with label_fn (the file stores the
+    binary one).
+
+    Returns:
+        list: record dicts (member, split, l1, label, text, content_hash) in zip order
+    """
+    split_of = {}
+    for split in SPLITS:
+        for filename in split_sets[split]:
+            split_of.setdefault(filename, split)
+
+    records = []
+    with Corpus(corpus_path) as corpus:
+        for record in corpus.records(allow=split_of):
+            record['label'] = label_fn(record['l1'])
+            if record['label'] is None:
+                continue
+            record['split'] = split_of.get(record['member'].split("/")[-1])
+            records.append(record)
+    return records
+
+def extract_documents(zip_path, train_files, dev_files, test_files, n_jobs=1, parser='fast',
+                      label_fn=create_label):
+    """
+    Parse every labelled document listed in a split, without featurizing.
 
-        # === 8 features (Lexicon and POS features)
-        features.update(extract_lexicon_features(text))
-        features.update(get_POS_rato_features(text))
+    A pre-extracted corpus file may be passed instead of the zip; its
+    records are read directly and no HTML is parsed.
 
-        # === 7 features (Sentence segmentation–based, Statistical) ===
-        features.update(sentence_length_stats(text, long_thresh=20))
-        features.update(text_stats(text))
+    Args:
+        zip_path: Path to lang-8.zip or to a corpus file
+        train_files, dev_files, test_files: Paths to files listing filenames for each split
+        n_jobs (int): Worker processes; 1 runs in-process, None or -1 uses every core
+        parser (str): HTML backend from part_1.PARSERS ('fast' or 'bs4')
+        label_fn: l1 -> label, None to skip the document (default: binary
+            European / Asian, see src/labels.py for the other schemes)
+
+    Returns:
+        list: record dicts (member, split, l1, label, text, content_hash) in zip order
+    """
+    split_sets = _read_splits(train_files, dev_files, test_files)
+    if is_corpus(zip_path):
+        return corpus_records(zip_path, split_sets, label_fn)
+
+    members = split_members(zip_path, split_sets)
+    return _map_shards(extract_members, members, n_jobs, zip_path, parser, label_fn)
+
+def featurize_documents(records, n_jobs=1, cache_path=None, batch_size=256, pos_tagger=None):
+    """
+    Compute (or load from the FeatureStore at cache_path) the features of
+    every record returned by extract_documents.
+
+    Args:
+        pos_tagger (str): POS backend (taggers.TAGGERS), None for this
+            process's; passed to the workers whatever their start method
+
+    Returns:
+        list: feature dicts, aligned with records
+    """
+    pos_tagger = pos_tagger or taggers.get_backend()
+    return _map_shards(featurize_records, records, n_jobs, cache_path, batch_size, pos_tagger)
+
+def to_splits(records, features):
+    """
+    Group records and their feature dicts by split.
+
+    Returns:
+        tuple: (X_train, y_train, X_dev, y_dev, X_test, y_test)
+    """
+    X = {split: [] for split in SPLITS}
+    y = {split: [] for split in SPLITS}
+    for record, feats in zip(records, features):
+        X[record['split']].append(feats)
+        y[record['split']].append(record['label'])
+
+    return X['train'], y['train'], X['dev'], y['dev'], X['test'], y['test']
+
+
+def split_texts(records):
+    """
+    Document texts grouped by split, in the row order of to_splits.
+
+    Returns:
+        tuple: (train texts, dev texts, test texts)
+    """
+    texts = {split: [] for split in SPLITS}
+    for record in records:
+        texts[record['split']].append(record['text'])
+    return texts['train'], texts['dev'], texts['test']
+
+def build_dataset(zip_path, train_files, dev_files, test_files, n_jobs=1, cache_path=None,
+                  parser='fast', batch_size=256, label_fn=create_label, pos_tagger=None):
+    """
+    Build train/dev/test datasets with features and labels.
+
+    Documents that are not listed in any split are skipped before they are
+    decompressed or parsed. With n_jobs != 1 the remaining zip members are
+    sharded over a process pool; shards are merged back in zip order, so the
+    output is identical to the serial run.
+
+    With cache_path set, per-document L1 and extractor outputs are read from
+    and written to a FeatureStore, so reruns only compute missing or
+    invalidated rows.
+
+    A pre-extracted corpus file (src/corpus.py) can stand in for the zip,
+    in which case no HTML is decompressed or parsed.
+
+    Args:
+        zip_path: Path to lang-8.zip or to a corpus file
+        train_files, dev_files, test_files: Paths to files listing filenames for each split
+        n_jobs (int): Worker processes; 1 runs in-process, None or -1 uses every core
+        cache_path: Optional path to a FeatureStore (SQLite) database
+        parser (str): HTML backend from part_1.PARSERS ('fast' or 'bs4')
+        batch_size (int): Documents per featurization batch (sentence segmentation
+            runs through spaCy's nlp.pipe once per batch)
+        label_fn: l1 -> label, None to skip the document (default: binary
+            European / Asian, see src/labels.py for the other schemes)
+        pos_tagger (str): POS backend (taggers.TAGGERS), None for this
+            process's; passed to the workers whatever their start method
+
+    Returns:
+        tuple: (X_train, y_train, X_dev, y_dev, X_test, y_test)
+    """
+    pos_tagger = pos_tagger or taggers.get_backend()
+    split_sets = _read_splits(train_files, dev_files, test_files)
+    if is_corpus(zip_path):
+        records = corpus_records(zip_path, split_sets, label_fn)
+        features = _map_shards(featurize_records, records, n_jobs, cache_path, batch_size, pos_tagger)
+        return to_splits(records, features)
 
-        # Match filename format in train/dev/test lists
-        filename_only = filename.split("/")[-1]
+    members = split_members(zip_path, split_sets)
+    results = _map_shards(process_members, members, n_jobs, zip_path, cache_path, parser, batch_size,
+                          label_fn, pos_tagger)
 
-        if filename_only in train_set:
-            X_train.append(features)
-            y_train.append(label)
-        elif filename_only in dev_set:
-            X_dev.append(features)
-            y_dev.append(label)
-        elif filename_only in test_set:
-            X_test.append(features)
-            y_test.append(label)
+    X = {split: [] for split in SPLITS}
+    y = {split: [] for split in SPLITS}
+    for split, features, label in results:
+        X[split].append(features)
+        y[split].append(label)
 
-    return X_train, y_train, X_dev, y_dev, X_test, y_test
+    return X['train'], y['train'], X['dev'], y['dev'], X['test'], y['test']
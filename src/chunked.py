@@ -0,0 +1,393 @@
+"""
+Out-of-core feature blocks
+
+build_dataset returns every document's feature dict at once, which does not
+scale to the full multi-language Lang-8 dump. Here documents are streamed out
+of the zip (or a corpus file), featurized a batch at a time, and turned into
+CSR blocks of at most block_size documents per split:
+
+    for block in iter_feature_blocks("data/raw/lang-8.zip", split_sets, block_size=10000):
+        block.split, block.X, block.y, block.members
+
+Blocks are vectorized with a SchemaVectorizer over the fixed feature schema
+(FEATURE_NAMES), so no pass over the data is needed to learn the columns and
+every block has the same columns as a DictVectorizer fit on the whole corpus.
+Hashed n-gram columns (src/ngrams.py) can be appended the same way, since
+hashing needs no fit either.
+
+Memory is bounded by one open block per split plus the batches in flight,
+whatever the corpus size. Blocks can be written to a directory of .npz files
+and read back one at a time (or stacked, since a CSR block is far smaller
+than the feature dicts it came from).
+
+Usage:
+    python src/chunked.py --block-size 10000
+    python src/chunked.py --labels l1 --all-documents   # every L1, no splits
+    python src/chunked.py --ngram-features 262144        # + hashed n-grams
+"""
+
+import argparse
+import json
+import sys
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src import profiling, taggers
+from src.build_dataset import (FEATURE_GROUPS, SPLITS, _featurize_batch, _parse_member, _profiled_shard,
+                               _read_splits, _resolve_n_jobs, create_label)
+from src.corpus import Corpus, is_corpus
+from src.feature_store import FeatureStore, content_hash
+from src.labels import LABEL_SCHEMES, LabelMapper
+from src.ngrams import NgramHasher
+from src.part_1 import PARSERS, iter_zip_members
+from src.sparse import as_csr32, hstack_features
+
+# Every feature the extractors produce, in DictVectorizer column order
+FEATURE_NAMES = sorted(name for names in FEATURE_GROUPS.values() for name in names)
+
+# Split name used when no split files are given
+ALL = 'all'
+
+FeatureBlock = namedtuple('FeatureBlock', ['split', 'X', 'y', 'members'])
+
+
+# -----------------------
+# Fixed-schema vectorizer
+# -----------------------
+class SchemaVectorizer(TransformerMixin, BaseEstimator):
+    """
+    DictVectorizer with its columns given up front instead of learned.
+
+    transform() needs no fit and works on any block of feature dicts: keys
+    outside the schema are ignored, missing keys are 0, booleans become
+    0 / 1. Output is CSR float32 with int32 indices (see sparse.as_csr32),
+    and the attributes DictVectorizer users read (feature_names_,
+    vocabulary_) are set, so it can replace a fitted DictVectorizer.
+    """
+
+    def __init__(self, feature_names=None):
+        self.feature_names = feature_names
+
+    @property
+    def feature_names_(self):
+        return list(FEATURE_NAMES if self.feature_names is None else self.feature_names)
+
+    @property
+    def vocabulary_(self):
+        return {name: i for i, name in enumerate(self.feature_names_)}
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.feature_names_, dtype=object)
+
+    def fit(self, X=None, y=None):
+        return self
+
+    def transform(self, X):
+        """
+        Args:
+            X (list): feature dicts
+
+        Returns:
+            scipy.sparse.csr_matrix: (len(X), n_features) float32
+        """
+        names = self.feature_names_
+        dense = np.zeros((len(X), len(names)), dtype=np.float32)
+        for row, features in zip(dense, X):
+            row[:] = [features.get(name, 0) for name in names]
+        return as_csr32(sp.csr_matrix(dense))
+
+
+# -----------------------
+# Streaming featurization
+# -----------------------
+def _zip_items(zip_path, split_of):
+    """
+    (member, split, raw bytes) for the documents to featurize, in zip order.
+    """
+    for member, raw in iter_zip_members(zip_path, allow=split_of):
+        if split_of is None:
+            yield member, ALL, raw
+        elif member in split_of or member.rsplit('/', 1)[-1] in split_of:
+            yield member, split_of.get(member, split_of.get(member.rsplit('/', 1)[-1])), raw
+
+
+def _corpus_items(corpus_path, split_of):
+    """
+    (member, split, record) for the documents of a corpus file, in zip order.
+    """
+    with Corpus(corpus_path) as corpus:
+        for record in corpus.records(allow=split_of):
+            split = ALL if split_of is None else split_of.get(record['member'].rsplit('/', 1)[-1])
+            yield record['member'], split, record
+
+
+def featurize_items(items, parser='fast', cache_path=None, label_fn=create_label, with_text=False,
+                    pos_tagger=None):
+    """
+    Label and featurize one batch of (member, split, raw bytes or corpus record).
+
+    Runs in a worker process when n_jobs != 1, so label_fn must be picklable
+    (a module-level function or a LabelMapper), and the POS backend comes in
+    as pos_tagger (None: this process's).
+
+    Returns:
+        list: (member, split, label, features, text) per labelled document, in
+            input order; text is None unless with_text (n-gram blocks)
+    """
+    documents, kept = [], []
+    for member, split, source in items:
+        if isinstance(source, dict):
+            # Corpus record: already parsed. The stored label is the binary
+            # one, so relabel from the L1
+            l1, text, digest, raw = source['l1'], source['text'], source['content_hash'], None
+        else:
+            l1, text, _ = _parse_member(source, member, parser)
+            digest, raw = content_hash(source, parser), source
+
+        label = label_fn(l1)
+        if label is None:
+            continue
+        documents.append((member, digest, raw, text))
+        kept.append((member, split, label))
+
+    store_cm = FeatureStore(cache_path) if cache_path else nullcontext()
+    with store_cm as store, taggers.using_backend(pos_tagger):
+        features = _featurize_batch(documents, store, parser)
+        if store is not None:
+            store.commit()
+
+    texts = [text if with_text else None for _, _, _, text in documents]
+    return [
+        (member, split, label, feats, text)
+        for (member, split, label), feats, text in zip(kept, features, texts)
+    ]
+
+
+def _imap_batches(func, batches, n_jobs, *args):
+    """
+    Yield func(batch, *args) for each batch, in order.
+
+    Unlike ProcessPoolExecutor.map, batches are pulled from the iterator only
+    as results are consumed (at most two per worker in flight), so a lazy
+    stream of documents is never materialized.
+    """
+    n_workers = _resolve_n_jobs(n_jobs)
+    if n_workers == 1:
+        for batch in batches:
+            yield func(batch, *args)
+        return
+
+    profiled = profiling.is_enabled()
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        pending = deque()
+        for batch in batches:
+            if profiled:
+                pending.append(pool.submit(_profiled_shard, func, batch, *args))
+            else:
+                pending.append(pool.submit(func, batch, *args))
+            if len(pending) >= 2 * n_workers:
+                yield _result(pending.popleft(), profiled)
+        while pending:
+            yield _result(pending.popleft(), profiled)
+
+
+def _result(future, profiled):
+    result = future.result()
+    if profiled:
+        result, stats = result
+        profiling.merge(stats)
+    return result
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_feature_blocks(source, split_sets=None, block_size=10000, n_jobs=1, cache_path=None,
+                        parser='fast', batch_size=256, label_fn=create_label, vectorizer=None, ngrams=None,
+                        pos_tagger=None):
+    """
+    Stream feature blocks of at most block_size documents per split.
+
+    Args:
+        source: Path to lang-8.zip or to a corpus file (src/corpus.py)
+        split_sets (dict): split name -> set of filenames; documents in no
+            split are skipped. None keeps every document, under split 'all'
+        block_size (int): Documents per block
+        n_jobs (int): Worker processes; 1 runs in-process, None or -1 uses every core
+        cache_path: Optional path to a FeatureStore database
+        parser (str): HTML backend from part_1.PARSERS ('fast' or 'bs4')
+        batch_size (int): Documents per featurization batch (unit of work of a worker)
+        label_fn: l1 -> label, or None to skip the document (see src/labels.py)
+        vectorizer: Fitted vectorizer for the blocks (default: SchemaVectorizer())
+        ngrams: Optional NgramHasher; its columns follow the vectorizer's
+        pos_tagger (str): POS backend (taggers.TAGGERS), None for this
+            process's; passed to the workers whatever their start method
+
+    Yields:
+        FeatureBlock: (split, CSR X, y array, member array); a split's
+            blocks come in zip order, the last one may be short
+    """
+    vectorizer = vectorizer or SchemaVectorizer()
+    pos_tagger = pos_tagger or taggers.get_backend()
+
+    split_of = None
+    if split_sets is not None:
+        split_of = {}
+        for split in SPLITS:
+            for filename in split_sets[split]:
+                split_of.setdefault(filename, split)
+
+    items = _corpus_items(source, split_of) if is_corpus(source) else _zip_items(source, split_of)
+    open_blocks = {}
+
+    def make_block(split, rows):
+        members, labels, features, texts = zip(*rows)
+        with profiling.record('blocks:vectorize', calls=len(rows)):
+            X = vectorizer.transform(list(features))
+        if ngrams is not None:
+            with profiling.record('blocks:ngrams', calls=len(rows)):
+                X = hstack_features(X, ngrams.transform(texts))
+        return FeatureBlock(split, X, np.array(labels), np.array(members))
+
+    for results in _imap_batches(featurize_items, _chunks(items, batch_size), n_jobs,
+                                 parser, cache_path, label_fn, ngrams is not None, pos_tagger):
+        for member, split, label, features, text in results:
+            rows = open_blocks.setdefault(split, [])
+            rows.append((member, label, features, text))
+            if len(rows) == block_size:
+                yield make_block(split, rows)
+                open_blocks[split] = []
+
+    for split, rows in open_blocks.items():
+        if rows:
+            yield make_block(split, rows)
+
+
+# -----------------------
+# Blocks on disk
+# -----------------------
+def write_feature_blocks(blocks, out_dir, feature_names=None, ngrams=None):
+    """
+    Write blocks as <out_dir>/<split>-<n>.npz plus a schema.json manifest.
+
+    Hashed n-gram columns are not named one by one in the manifest; it
+    records the hasher's parameters and the total column count instead.
+
+    Returns:
+        dict: the manifest (feature names, n-gram parameters, column count,
+            blocks and documents per split)
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    feature_names = list(FEATURE_NAMES if feature_names is None else feature_names)
+    manifest = {
+        'feature_names': feature_names,
+        'ngrams': None if ngrams is None else ngrams.get_params(),
+        'n_features': len(feature_names) + (0 if ngrams is None else ngrams.n_output_features),
+        'splits': {},
+    }
+
+    for block in blocks:
+        entry = manifest['splits'].setdefault(block.split, {'blocks': [], 'documents': 0})
+        path = out_dir / f"{block.split}-{len(entry['blocks']):05d}.npz"
+        np.savez(
+            path, data=block.X.data, indices=block.X.indices, indptr=block.X.indptr,
+            shape=np.array(block.X.shape), y=block.y, members=block.members,
+        )
+        entry['blocks'].append(path.name)
+        entry['documents'] += len(block.y)
+
+    # Written last: a directory without it is an interrupted run
+    (out_dir / 'schema.json').write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def read_manifest(block_dir):
+    return json.loads((Path(block_dir) / 'schema.json').read_text())
+
+
+def load_feature_blocks(block_dir, split):
+    """
+    Yield the FeatureBlocks of one split from write_feature_blocks, in order.
+    """
+    block_dir = Path(block_dir)
+    entry = read_manifest(block_dir)['splits'].get(split, {'blocks': []})
+    for name in entry['blocks']:
+        with np.load(block_dir / name) as arrays:
+            X = sp.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                              shape=tuple(arrays['shape']))
+            yield FeatureBlock(split, X, arrays['y'], arrays['members'])
+
+
+def stack_feature_blocks(block_dir, split):
+    """
+    One split as a single CSR matrix and label array.
+
+    Returns:
+        tuple: (X, y)
+    """
+    blocks = list(load_feature_blocks(block_dir, split))
+    manifest = read_manifest(block_dir)
+    n_features = manifest.get('n_features', len(manifest['feature_names']))
+    if not blocks:
+        return as_csr32(sp.csr_matrix((0, n_features), dtype=np.float32)), np.array([], dtype=str)
+    X = as_csr32(sp.vstack([block.X for block in blocks], format='csr'))
+    return X, np.concatenate([block.y for block in blocks])
+
+
+def parse_args():
+    project_root = Path(__file__).resolve().parent.parent
+    data_dir = project_root / "data"
+    corpus_path = data_dir / "processed" / "lang-8.corpus"
+
+    parser = argparse.ArgumentParser(description="Write feature blocks for out-of-core training")
+    parser.add_argument("--source", type=Path,
+                        default=corpus_path if corpus_path.exists() else data_dir / "raw" / "lang-8.zip",
+                        help="lang-8.zip or a corpus file (default: the corpus if it exists)")
+    parser.add_argument("--out", type=Path, default=data_dir / "processed" / "blocks")
+    parser.add_argument("--block-size", type=int, default=10000, help="Documents per block")
+    parser.add_argument("--labels", choices=LABEL_SCHEMES, default="binary",
+                        help="Label scheme (src/labels.py); l1 makes every L1 its own class")
+    parser.add_argument("--exclude-l1", nargs="*", default=[], help="L1s to leave out")
+    parser.add_argument("--ngram-features", type=int, default=0,
+                        help="Append hashed word + char n-grams, this many columns each (0 = off)")
+    parser.add_argument("--all-documents", action="store_true",
+                        help="Ignore the split files and keep every document (split 'all')")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--parser", choices=list(PARSERS), default="fast")
+    parser.add_argument("--cache", type=Path, default=data_dir / "cache" / "features.sqlite")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    data_dir = Path(__file__).resolve().parent.parent / "data"
+
+    split_sets = None
+    if not args.all_documents:
+        split_sets = _read_splits(data_dir / "train.txt", data_dir / "dev.txt", data_dir / "test.txt")
+
+    ngrams = NgramHasher(n_features=args.ngram_features) if args.ngram_features else None
+    blocks = iter_feature_blocks(
+        args.source, split_sets, block_size=args.block_size, n_jobs=args.n_jobs,
+        cache_path=args.cache, parser=args.parser, label_fn=LabelMapper(args.labels, exclude=args.exclude_l1),
+        ngrams=ngrams,
+    )
+    manifest = write_feature_blocks(blocks, args.out, ngrams=ngrams)
+    for split, entry in manifest['splits'].items():
+        print(f"{split}: {entry['documents']} documents in {len(entry['blocks'])} blocks")
+    print(f"Wrote {args.out}")
@@ -0,0 +1,218 @@
+"""
+Pre-extracted Lang-8 corpus
+
+A one-time conversion parses every HTML member of lang-8.zip and writes
+(filename, l1, label, text, content_hash) records into a single binary
+file, so later runs never decompress or parse HTML again.
+
+File layout (little-endian):
+
+    MAGIC | u32 version
+    record*      u32 byte length of each field (NONE = missing), then the
+                 UTF-8 fields: member, l1, label, text, content_hash
+    index        JSON list of [member, record offset], in record order
+    u64 index offset | MAGIC
+
+The file is memory-mapped when read; the index gives O(1) access to any
+document by member name or bare filename. content_hash is the SHA-1 of the
+original HTML bytes plus the parser used for the conversion (see
+feature_store.content_hash), so FeatureStore keys stay the same whichever
+source the documents come from.
+
+Usage:
+    python src/corpus.py --zip data/raw/lang-8.zip --out data/processed/lang-8.corpus
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.feature_store import content_hash
+from src.part_1 import PARSERS, iter_zip_members, iterate_documents
+
+MAGIC = b'L8CORPUS'
+VERSION = 2
+
+_FIELDS = ('member', 'l1', 'label', 'text', 'content_hash')
+_RECORD_HEADER = struct.Struct('<5I')
+_FILE_HEADER = struct.Struct('<8sI')
+_FOOTER = struct.Struct('<Q8s')
+# Field length marking a None value
+_NONE = 0xFFFFFFFF
+
+
+def is_corpus(path):
+    """
+    Whether path is a converted corpus file (checked by its magic bytes).
+    """
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except (FileNotFoundError, IsADirectoryError):
+        return False
+
+
+def _encode(record):
+    fields = [None if record[name] is None else str(record[name]).encode('utf-8')
+              for name in _FIELDS]
+    lengths = [_NONE if field is None else len(field) for field in fields]
+    return _RECORD_HEADER.pack(*lengths) + b''.join(field for field in fields if field is not None)
+
+
+def convert_zip(zip_path, out_path, parser='fast'):
+    """
+    Parse every HTML member of the zip once and write them to a corpus file.
+
+    The file is written next to out_path and renamed into place when
+    complete, so an interrupted conversion never leaves a truncated corpus.
+
+    Args:
+        zip_path: Path to lang-8.zip
+        out_path: Path of the corpus file to create
+        parser (str): HTML backend from part_1.PARSERS ('fast' or 'bs4')
+
+    Returns:
+        int: number of documents written
+    """
+    # Imported here: build_dataset itself reads corpora through this module
+    from src.build_dataset import create_label
+
+    parse = PARSERS[parser]
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + '.tmp')
+
+    index = []
+    with open(tmp_path, 'wb') as f:
+        f.write(_FILE_HEADER.pack(MAGIC, VERSION))
+        for member, raw in iter_zip_members(zip_path):
+            l1, text, _ = parse(raw.decode('utf-8', errors='ignore'), member)
+            index.append([member, f.tell()])
+            f.write(_encode({
+                'member': member,
+                'l1': l1,
+                'label': create_label(l1),
+                'text': text,
+                'content_hash': content_hash(raw, parser),
+            }))
+
+        index_offset = f.tell()
+        f.write(json.dumps(index).encode('utf-8'))
+        f.write(_FOOTER.pack(index_offset, MAGIC))
+
+    os.replace(tmp_path, out_path)
+    return len(index)
+
+
+class Corpus:
+    """
+    Read-only, memory-mapped view of a corpus file.
+
+    Usage:
+        with Corpus("data/processed/lang-8.corpus") as corpus:
+            record = corpus["1234.html"]
+            for record in corpus.records(allow=train_names):
+                ...
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = _FILE_HEADER.unpack_from(self._map, 0)
+        index_offset, end_magic = _FOOTER.unpack_from(self._map, len(self._map) - _FOOTER.size)
+        if magic != MAGIC or end_magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a complete corpus file")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"{self.path} has corpus version {version}, expected {VERSION}")
+
+        index = json.loads(self._map[index_offset:len(self._map) - _FOOTER.size])
+        self._offsets = {member: offset for member, offset in index}
+        # Split files list bare filenames
+        self._by_filename = {member.rsplit('/', 1)[-1]: member for member, _ in index}
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, name):
+        return name in self._offsets or name in self._by_filename
+
+    def __getitem__(self, name):
+        """
+        Record dict for a member name or bare filename.
+        """
+        offset = self._offsets.get(name)
+        if offset is None:
+            offset = self._offsets[self._by_filename[name]]
+        return self._read(offset)
+
+    def _read(self, offset):
+        lengths = _RECORD_HEADER.unpack_from(self._map, offset)
+        position = offset + _RECORD_HEADER.size
+        record = {}
+        for name, length in zip(_FIELDS, lengths):
+            if length == _NONE:
+                record[name] = None
+            else:
+                record[name] = self._map[position:position + length].decode('utf-8')
+                position += length
+        return record
+
+    def records(self, allow=None):
+        """
+        Yield record dicts in file (= zip) order.
+
+        Args:
+            allow: Optional member names or bare filenames to restrict to
+        """
+        allow = None if allow is None else set(allow)
+        for member, offset in self._offsets.items():
+            if allow is None or member in allow or member.rsplit('/', 1)[-1] in allow:
+                yield self._read(offset)
+
+    def __iter__(self):
+        return self.records()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_documents(path, parser='fast'):
+    """
+    (l1, text, filename) for every document of a corpus file or a zip,
+    like part_1.iterate_documents.
+    """
+    if is_corpus(path):
+        with Corpus(path) as corpus:
+            for record in corpus:
+                yield record['l1'], record['text'], record['member']
+    else:
+        yield from iterate_documents(path, parser=parser)
+
+
+if __name__ == "__main__":
+    project_root = Path(__file__).resolve().parent.parent
+    arg_parser = argparse.ArgumentParser(description="Convert lang-8.zip into a corpus file")
+    arg_parser.add_argument("--zip", type=Path, default=project_root / "data" / "raw" / "lang-8.zip")
+    arg_parser.add_argument("--out", type=Path,
+                            default=project_root / "data" / "processed" / "lang-8.corpus")
+    arg_parser.add_argument("--parser", choices=list(PARSERS), default="fast")
+    args = arg_parser.parse_args()
+
+    n_documents = convert_zip(args.zip, args.out, parser=args.parser)
+    print(f"Wrote {n_documents} documents to {args.out}")
@@ -0,0 +1,138 @@
+"""
+Persistent feature cache for build_dataset
+
+Rows are keyed by zip member name + SHA-1 of the member's raw bytes and the
+HTML parser that extracted its text, so an edited or replaced document, or
+one parsed by another backend, is recomputed automatically. Each feature
+extractor's output is stored separately together with its version tag;
+bumping the version of one extractor only invalidates that extractor's rows.
+The L1 of every document is cached as well, which lets a fully cached
+document skip HTML parsing altogether.
+
+Backed by SQLite (stdlib) in WAL mode so several worker processes can read
+and write the same store. Writes are buffered in memory and flushed by
+commit() in one short executemany transaction, so a worker never holds the
+database's single write lock while it featurizes a batch.
+"""
+
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    member TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    l1 TEXT,
+    PRIMARY KEY (member, content_hash)
+);
+CREATE TABLE IF NOT EXISTS features (
+    member TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    extractor TEXT NOT NULL,
+    version TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (member, content_hash, extractor)
+);
+"""
+
+
+def content_hash(raw, parser=None):
+    """
+    Hash of a document's raw bytes, used as part of the cache key.
+
+    Args:
+        raw (bytes): the member's HTML
+        parser (str): part_1.PARSERS backend the L1 and text come from;
+            appended to the hash, since backends may extract different text
+    """
+    digest = hashlib.sha1(raw).hexdigest()
+    return digest if parser is None else f'{digest}:{parser}'
+
+
+class FeatureStore:
+    """
+    SQLite-backed cache of per-document L1 and extractor outputs.
+
+    Usage:
+        with FeatureStore("data/cache/features.sqlite") as store:
+            found, l1 = store.get_l1(member, h)
+            feats = store.get_features(member, h, "pos", "1")
+    """
+
+    def __init__(self, path, timeout=60.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=timeout)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        # Rows written since the last commit(), visible to this store's reads
+        self._pending_l1 = {}
+        self._pending_features = {}
+
+    def get_l1(self, member, content_hash):
+        """
+        Returns:
+            tuple: (found, l1) -- l1 may legitimately be None
+        """
+        if (member, content_hash) in self._pending_l1:
+            return True, self._pending_l1[member, content_hash]
+        row = self._conn.execute(
+            "SELECT l1 FROM documents WHERE member = ? AND content_hash = ?",
+            (member, content_hash),
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, row[0]
+
+    def put_l1(self, member, content_hash, l1):
+        self._pending_l1[member, content_hash] = l1
+
+    def get_features(self, member, content_hash, extractor, version):
+        """
+        Returns:
+            dict or None: cached features, None if missing or stale
+        """
+        pending = self._pending_features.get((member, content_hash, extractor))
+        if pending is not None and pending[0] == version:
+            return json.loads(pending[1])
+        row = self._conn.execute(
+            "SELECT payload FROM features "
+            "WHERE member = ? AND content_hash = ? AND extractor = ? AND version = ?",
+            (member, content_hash, extractor, version),
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def put_features(self, member, content_hash, extractor, version, features):
+        self._pending_features[member, content_hash, extractor] = (version, json.dumps(features))
+
+    def commit(self):
+        """
+        Write the buffered rows in one transaction.
+        """
+        if not self._pending_l1 and not self._pending_features:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?)",
+                [(member, digest, l1) for (member, digest), l1 in self._pending_l1.items()],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?, ?)",
+                [key + value for key, value in self._pending_features.items()],
+            )
+        self._pending_l1.clear()
+        self._pending_features.clear()
+
+    def close(self):
+        self.commit()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
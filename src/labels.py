@@ -0,0 +1,199 @@
+"""
+Label schemes, compact label encoding and class-aware sampling
+
+A label scheme maps a document's L1 to its class, or to None to drop the
+document:
+
+    binary  European (French, Spanish) vs Asian (Mandarin, Japanese, Korean)
+    family  language family from data/labels/families.tsv
+    l1      the L1 itself (every native language is a class)
+
+    label_fn = LabelMapper("family", exclude=["Russian"])
+    label_fn("Spanish")   # 'Romance'
+
+LabelMapper is picklable, so it can be handed to worker processes.
+
+For many classes and documents, labels are kept as small integer codes
+(encode_labels) and training sets can be cut down per class
+(stratified_sample, balanced_subsample) for fast iteration.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+
+LABEL_DIR = Path(__file__).resolve().parent.parent / "data" / "labels"
+
+LABEL_SCHEMES = ('binary', 'family', 'l1')
+
+BINARY_LABELS = {
+    'French': 'European',
+    'Spanish': 'European',
+    'Mandarin': 'Asian',
+    'Japanese': 'Asian',
+    'Korean': 'Asian',
+}
+
+
+@lru_cache(maxsize=None)
+def load_families(path=LABEL_DIR / "families.tsv"):
+    """
+    Returns:
+        dict: L1 -> language family
+    """
+    families = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                l1, family = line.split("\t")
+                families[l1.strip()] = family.strip()
+    return families
+
+
+class LabelMapper:
+    """
+    L1 -> class label under one scheme.
+
+    Args:
+        scheme (str): one of LABEL_SCHEMES
+        exclude: L1s whose documents are always dropped
+        other (str): label for L1s the scheme does not map (binary and
+            family); None drops them
+    """
+
+    def __init__(self, scheme='binary', exclude=(), other=None):
+        if scheme not in LABEL_SCHEMES:
+            raise ValueError(f"Unknown label scheme {scheme!r}, expected one of {LABEL_SCHEMES}")
+        self.scheme = scheme
+        self.exclude = frozenset(exclude)
+        self.other = other
+        if scheme == 'binary':
+            self.mapping = BINARY_LABELS
+        elif scheme == 'family':
+            self.mapping = load_families()
+        else:
+            self.mapping = None
+
+    def __call__(self, l1):
+        if not l1 or l1 in self.exclude:
+            return None
+        if self.mapping is None:
+            return l1
+        return self.mapping.get(l1, self.other)
+
+    def __repr__(self):
+        return f"LabelMapper({self.scheme!r}, exclude={sorted(self.exclude)}, other={self.other!r})"
+
+
+# -----------------------
+# Encoding
+# -----------------------
+def _code_dtype(n_classes):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_classes <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def encode_labels(*label_lists, classes=None):
+    """
+    Integer codes for one or more label lists, sharing one class list.
+
+    Codes use the smallest integer type that fits (int8 up to 127 classes).
+    Labels missing from `classes` get code -1.
+
+    Args:
+        label_lists: e.g. y_train, y_dev, y_test
+        classes: class names in code order (default: sorted labels of all lists)
+
+    Returns:
+        tuple: (classes array, code array per label list)
+    """
+    if classes is None:
+        classes = np.unique(np.concatenate([np.asarray(y, dtype=object) for y in label_lists]))
+    classes = np.asarray(classes, dtype=object)
+    index = {label: code for code, label in enumerate(classes)}
+    dtype = _code_dtype(len(classes))
+    codes = [np.fromiter((index.get(label, -1) for label in y), dtype=dtype, count=len(y)) for y in label_lists]
+    return classes, codes
+
+
+def decode_labels(codes, classes):
+    """
+    Class names of integer codes; codes are returned as they are when
+    classes is None (labels that were never encoded).
+    """
+    if classes is None:
+        return np.asarray(codes)
+    return np.asarray(classes, dtype=object)[np.asarray(codes)]
+
+
+def one_hot(codes, n_classes):
+    """
+    Sparse (CSR) indicator matrix of integer codes, e.g. for per-class metrics.
+    """
+    codes = np.asarray(codes)
+    return sp.csr_matrix(
+        (np.ones(len(codes), dtype=np.int8), (np.arange(len(codes)), codes)),
+        shape=(len(codes), n_classes),
+    )
+
+
+# -----------------------
+# Sampling
+# -----------------------
+def _class_members(y):
+    """
+    Indices of each class's documents (one sort, not one scan per class).
+    """
+    _, codes = np.unique(np.asarray(y), return_inverse=True)
+    order = np.argsort(codes, kind='stable')
+    boundaries = np.cumsum(np.bincount(codes))[:-1]
+    return np.split(order, boundaries) if len(codes) else []
+
+
+def stratified_sample(y, fraction, random_state=521):
+    """
+    Indices of a random subset with the class proportions of y (every class
+    keeps at least one document).
+
+    Returns:
+        np.ndarray: sorted indices into y
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError(f"fraction must be in (0, 1], got {fraction}")
+    rng = np.random.default_rng(random_state)
+    keep = [
+        rng.choice(members, size=max(1, int(round(fraction * len(members)))), replace=False)
+        for members in _class_members(y)
+    ]
+    return np.sort(np.concatenate(keep)) if keep else np.array([], dtype=np.intp)
+
+
+def balanced_subsample(y, max_per_class, random_state=521):
+    """
+    Indices of at most max_per_class random documents per class; smaller
+    classes are kept whole.
+
+    Returns:
+        np.ndarray: sorted indices into y
+    """
+    rng = np.random.default_rng(random_state)
+    keep = [
+        rng.choice(members, size=max_per_class, replace=False) if len(members) > max_per_class else members
+        for members in _class_members(y)
+    ]
+    return np.sort(np.concatenate(keep)) if keep else np.array([], dtype=np.intp)
+
+
+def class_counts(y):
+    """
+    Returns:
+        dict: label -> number of documents, largest class first
+    """
+    labels, counts = np.unique(np.asarray(y), return_counts=True)
+    order = np.argsort(-counts, kind='stable')
+    return {labels[i].item() if hasattr(labels[i], 'item') else labels[i]: int(counts[i]) for i in order}
@@ -0,0 +1,108 @@
+"""
+Lexicons and one-pass lexicon matching
+
+A lexicon is a text file under data/lexicons/ named <lexicon>.txt, with one
+term per line (blank lines and '#' comments are ignored). Terms may be
+phrases; words are separated by any whitespace when matching.
+
+All lexicons are case-folded and compiled into a single regex, so one scan
+over the raw text finds every term of every lexicon, bounded by non-word
+characters (e.g. "Tokyo's", "(church)"). No tokenizer or POS tagger is
+involved.
+"""
+
+import re
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+LEXICON_DIR = Path(__file__).resolve().parent.parent / "data" / "lexicons"
+
+
+def _normalize(term):
+    return " ".join(term.casefold().split())
+
+
+def load_lexicon(path):
+    """
+    Returns:
+        frozenset: normalized terms of one lexicon file
+    """
+    terms = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            term = _normalize(line.split("#", 1)[0])
+            if term:
+                terms.add(term)
+    return frozenset(terms)
+
+
+def load_lexicons(lexicon_dir=LEXICON_DIR):
+    """
+    Returns:
+        dict: lexicon name (file stem) -> frozenset of terms, sorted by name
+    """
+    return {path.stem: load_lexicon(path) for path in sorted(Path(lexicon_dir).glob("*.txt"))}
+
+
+class LexiconMatcher:
+    """
+    Finds the terms of several lexicons in a text with one compiled regex.
+
+    Usage:
+        matcher = LexiconMatcher({"religion": {"god", "holy spirit"}})
+        matcher.counts("God bless. Holy  Spirit!")   # {'religion': 2}
+        matcher.features("...")   # {'religion_count': 2, 'religion_match': True}
+    """
+
+    def __init__(self, lexicons):
+        self.names = list(lexicons)
+        # term -> lexicons containing it (a term may be in several)
+        self._owners = {}
+        for name, terms in lexicons.items():
+            for term in terms:
+                self._owners.setdefault(_normalize(term), []).append(name)
+
+        # Longest first, so a phrase wins over a term it starts with
+        alternatives = sorted(self._owners, key=len, reverse=True)
+        pattern = "|".join(r"\s+".join(map(re.escape, term.split())) for term in alternatives)
+        # A pattern that never matches when there are no terms at all
+        self._regex = re.compile(rf"(?<!\w)(?:{pattern})(?!\w)" if pattern else r"(?!x)x")
+
+    def term_counts(self, text):
+        """
+        Returns:
+            dict: lexicon name -> Counter of the matched terms
+        """
+        found = {name: Counter() for name in self.names}
+        for match in self._regex.finditer(text.casefold()):
+            term = _normalize(match.group(0))
+            for name in self._owners[term]:
+                found[name][term] += 1
+        return found
+
+    def counts(self, text):
+        """
+        Returns:
+            dict: lexicon name -> number of term occurrences
+        """
+        return {name: sum(terms.values()) for name, terms in self.term_counts(text).items()}
+
+    def features(self, text):
+        """
+        Returns:
+            dict: '<lexicon>_count' (int) and '<lexicon>_match' (bool) per lexicon
+        """
+        features = {}
+        for name, count in self.counts(text).items():
+            features[f"{name}_count"] = count
+            features[f"{name}_match"] = count > 0
+        return features
+
+
+@lru_cache(maxsize=None)
+def default_matcher():
+    """
+    Matcher over every lexicon in data/lexicons/, built once per process.
+    """
+    return LexiconMatcher(load_lexicons())
@@ -0,0 +1,289 @@
+"""
+Model registry
+
+Every model the pipeline can train, behind the plain sklearn interface
+(fit / predict / predict_proba / score, pickled with joblib in the model
+bundle). Each entry also says how it is configured for the baseline and
+ablation fits, what the hyperparameter search explores, and where RFECV
+reads its feature ranking from:
+
+    tree            DecisionTreeClassifier (the original model)
+    random_forest   RandomForestClassifier, trees fitted on n_jobs threads
+    hist_gb         HistGradientBoostingClassifier (binned, OpenMP threads)
+    linear          MaxAbsScaler + LogisticRegression, sparse end to end
+
+    model = make_model("random_forest", n_jobs=4)
+    table = compare_models(["tree", "hist_gb"], X_train, y_train, X_dev, y_dev)
+
+hist_gb densifies its input, so with hashed n-grams (hundreds of thousands
+of columns) it is left out of the default comparison and refused by the
+stages that fit config.model.
+
+n_jobs is the model's own parallelism. Where the caller already runs fits
+in parallel (ablation, search, RFECV folds) models are built with n_jobs=1,
+so the cores are not oversubscribed.
+"""
+
+import time
+from typing import Callable, Dict, NamedTuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.stats import loguniform, randint
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MaxAbsScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from src import profiling
+from src.search import SEARCH_DISTRIBUTIONS, SEARCH_GRID
+
+DEFAULT_MODEL = 'tree'
+
+COMPARISON_COLUMNS = ('model', 'fit_s', 'fit_cpu_s', 'predict_s', 'train_score', 'dev_score',
+                      'dev_score_per_cpu_s')
+
+
+def _dense(X):
+    return X.toarray() if sp.issparse(X) else X
+
+
+class SparseHistGradientBoosting(HistGradientBoostingClassifier):
+    """
+    HistGradientBoostingClassifier that takes sparse input (densified per
+    call, so use it on the hand-crafted features rather than on hashed
+    n-grams) and exposes split-gain feature importances, so RFECV and
+    importance-based selection can rank its features.
+    """
+
+    def fit(self, X, y, sample_weight=None):
+        return super().fit(_dense(X), y, sample_weight=sample_weight)
+
+    def predict(self, X):
+        return super().predict(_dense(X))
+
+    def predict_proba(self, X):
+        return super().predict_proba(_dense(X))
+
+    def decision_function(self, X):
+        return super().decision_function(_dense(X))
+
+    @property
+    def feature_importances_(self):
+        """
+        Total split gain per feature over all trees, normalized to sum to 1.
+        """
+        gains = np.zeros(self.n_features_in_)
+        for predictors in self._predictors:
+            for predictor in predictors:
+                nodes = predictor.nodes[~predictor.nodes['is_leaf'].astype(bool)]
+                np.add.at(gains, nodes['feature_idx'], nodes['gain'])
+        total = gains.sum()
+        return gains / total if total > 0 else gains
+
+
+def _tree(n_jobs):
+    return DecisionTreeClassifier(random_state=521)
+
+
+def _random_forest(n_jobs):
+    return RandomForestClassifier(n_estimators=200, n_jobs=n_jobs, random_state=521)
+
+
+def _hist_gb(n_jobs):
+    # Threads come from OpenMP (OMP_NUM_THREADS), there is no n_jobs
+    return SparseHistGradientBoosting(random_state=521)
+
+
+def _linear(n_jobs):
+    # MaxAbsScaler keeps CSR input sparse (no centering)
+    return Pipeline([
+        ('scale', MaxAbsScaler()),
+        ('model', LogisticRegression(max_iter=2000, random_state=521)),
+    ])
+
+
+class ModelSpec(NamedTuple):
+    """
+    build: n_jobs -> unfitted estimator
+    baseline_params / ablation_params: set_params() for those stages' fits
+    search_grid / search_distributions: param spaces for src/search.py
+    importance_getter: where feature importances are read (src/selection.py, RFECV)
+    dense_input: the model densifies its input (not for hashed n-grams)
+    """
+    build: Callable
+    baseline_params: Dict
+    ablation_params: Dict
+    search_grid: Dict
+    search_distributions: Dict
+    importance_getter: str = 'auto'
+    dense_input: bool = False
+
+
+MODELS = {
+    'tree': ModelSpec(
+        build=_tree,
+        baseline_params={'max_depth': 3},
+        ablation_params={'max_depth': 4},
+        search_grid=SEARCH_GRID,
+        search_distributions=SEARCH_DISTRIBUTIONS,
+    ),
+    # 2 x 3 x 3 x 2 x 2 = 72 configurations
+    'random_forest': ModelSpec(
+        build=_random_forest,
+        baseline_params={},
+        ablation_params={'n_estimators': 100},
+        search_grid={
+            'n_estimators': [100, 300],
+            'max_depth': [None, 8, 16],
+            'min_samples_leaf': [1, 2, 5],
+            'max_features': ['sqrt', 0.5],
+            'class_weight': [None, 'balanced'],
+        },
+        search_distributions={
+            'n_estimators': randint(100, 501),
+            'max_depth': [None, 4, 8, 16, 32],
+            'min_samples_leaf': randint(1, 11),
+            'max_features': ['sqrt', 'log2', 0.3, 0.5],
+            'class_weight': [None, 'balanced'],
+        },
+    ),
+    # 3 x 2 x 3 x 2 x 2 = 72 configurations
+    'hist_gb': ModelSpec(
+        build=_hist_gb,
+        baseline_params={},
+        ablation_params={'max_iter': 100},
+        search_grid={
+            'learning_rate': [0.03, 0.1, 0.3],
+            'max_iter': [100, 300],
+            'max_leaf_nodes': [15, 31, 63],
+            'l2_regularization': [0.0, 1.0],
+            'class_weight': [None, 'balanced'],
+        },
+        search_distributions={
+            'learning_rate': loguniform(0.01, 0.5),
+            'max_iter': randint(50, 501),
+            'max_leaf_nodes': randint(8, 128),
+            'min_samples_leaf': randint(5, 51),
+            'l2_regularization': loguniform(1e-3, 10),
+            'class_weight': [None, 'balanced'],
+        },
+        dense_input=True,
+    ),
+    # 6 x 2 = 12 configurations
+    'linear': ModelSpec(
+        build=_linear,
+        baseline_params={},
+        ablation_params={},
+        search_grid={
+            'model__C': [0.01, 0.1, 1.0, 10.0, 100.0, 1000.0],
+            'model__class_weight': [None, 'balanced'],
+        },
+        search_distributions={
+            'model__C': loguniform(1e-3, 1e3),
+            'model__class_weight': [None, 'balanced'],
+        },
+        importance_getter='named_steps.model.coef_',
+    ),
+}
+
+
+def get_spec(name):
+    if name not in MODELS:
+        raise ValueError(f"Unknown model {name!r}, expected one of {list(MODELS)}")
+    return MODELS[name]
+
+
+def check_ngram_input(name, ngram_features):
+    """
+    Refuse a model that densifies its input when hashed n-grams are on: a
+    dense float64 copy of n x (hand-crafted + 2 * ngram_features) columns
+    does not fit in memory.
+
+    Raises:
+        ValueError: if the model densifies and ngram_features is set
+    """
+    if ngram_features and get_spec(name).dense_input:
+        raise ValueError(
+            f"Model {name!r} densifies its input and cannot be fitted on "
+            f"{ngram_features} hashed n-gram columns per analyzer; pick a sparse model "
+            f"({', '.join(default_comparison(ngram_features))}) or turn n-grams off"
+        )
+
+
+def default_comparison(ngram_features=0):
+    """
+    Models the compare stage fits when none are named: all of them, minus
+    the ones that densify their input when hashed n-grams are on.
+    """
+    return [name for name, spec in MODELS.items() if not (ngram_features and spec.dense_input)]
+
+
+def make_model(name=DEFAULT_MODEL, n_jobs=1, stage=None):
+    """
+    Unfitted estimator from the registry.
+
+    Args:
+        name (str): key of MODELS
+        n_jobs (int): the model's own parallelism (random forest only)
+        stage (str): 'baseline' or 'ablation' to apply that stage's params
+
+    Returns:
+        sklearn estimator
+    """
+    spec = get_spec(name)
+    model = spec.build(n_jobs)
+    if stage is not None:
+        model.set_params(**getattr(spec, f'{stage}_params'))
+    return model
+
+
+def search_space(name, mode):
+    """
+    Param space of a model for a search mode of src/search.py.
+    """
+    spec = get_spec(name)
+    return spec.search_grid if mode in ('grid', 'halving_grid') else spec.search_distributions
+
+
+# -----------------------
+# Side-by-side comparison
+# -----------------------
+def compare_models(names, X_train, y_train, X_dev, y_dev, n_jobs=-1):
+    """
+    Fit every model with its default settings and report time and accuracy.
+
+    CPU time is this process's (all its threads), so it also covers the
+    random forest's and gradient boosting's worker threads.
+
+    Returns:
+        pd.DataFrame: one row per model (COMPARISON_COLUMNS), best dev score first
+    """
+    rows = []
+    for name in names:
+        model = make_model(name, n_jobs=n_jobs)
+
+        with profiling.record(f'model:{name}:fit'):
+            wall, cpu = time.perf_counter(), time.process_time()
+            model.fit(X_train, y_train)
+            fit_s, fit_cpu_s = time.perf_counter() - wall, time.process_time() - cpu
+
+        with profiling.record(f'model:{name}:predict'):
+            start = time.perf_counter()
+            dev_score = model.score(X_dev, y_dev)
+            predict_s = time.perf_counter() - start
+
+        rows.append({
+            'model': name,
+            'fit_s': fit_s,
+            'fit_cpu_s': fit_cpu_s,
+            'predict_s': predict_s,
+            'train_score': model.score(X_train, y_train),
+            'dev_score': dev_score,
+            'dev_score_per_cpu_s': dev_score / max(fit_cpu_s, 1e-9),
+        })
+
+    table = pd.DataFrame(rows, columns=list(COMPARISON_COLUMNS))
+    return table.sort_values('dev_score', ascending=False, kind='stable').reset_index(drop=True)
@@ -0,0 +1,156 @@
+"""
+Hashed word and character n-gram features
+
+Native language identification gains a lot from n-grams (function word
+pairs, spelling patterns), but a DictVectorizer over n-gram dicts grows a
+column per distinct n-gram and has to see the whole corpus before it can
+transform anything. NgramHasher hashes n-grams into a fixed number of
+columns per analyzer instead, so:
+
+    - memory is bounded by n_features, whatever the vocabulary size
+    - nothing is fitted: any block of documents (or a single new document)
+      can be transformed on its own, in any process
+    - the output is CSR float32, ready to be put next to the hand-crafted
+      features (sparse.hstack_features)
+
+    hasher = NgramHasher(n_features=2 ** 18)
+    X_ngrams = hasher.transform(texts)
+    for X_block in iter_ngram_blocks(texts, hasher, block_size=10000):
+        ...
+
+Column names ('word_ngram_17', ...) are made on access (FeatureNames), not
+stored: with 2 ** 18 columns per analyzer a list of them costs more than
+the features. Code that handles every column (ablation, selection) should
+address the hashed block as a column range rather than by name.
+"""
+
+from collections.abc import Sequence
+from itertools import islice
+from operator import index
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction.text import HashingVectorizer
+
+ANALYZERS = ('word', 'char')
+
+
+class FeatureNames(Sequence):
+    """
+    Column names: the given names, then one per hashed column of `hasher`,
+    each made when it is accessed.
+
+    Args:
+        names (list): names of the leading (e.g. hand-crafted) columns
+        hasher (NgramHasher): its columns follow them
+    """
+
+    def __init__(self, names, hasher):
+        self.names = list(names)
+        self.hasher = hasher
+
+    def __len__(self):
+        return len(self.names) + self.hasher.n_output_features
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = index(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"column {i} out of range for {len(self)} columns")
+        if i < len(self.names):
+            return self.names[i]
+        analyzer, bucket = divmod(i - len(self.names), self.hasher.n_features)
+        # Hashed columns have no n-gram behind them, only a bucket number
+        return f"{self.hasher.analyzers[analyzer]}_ngram_{bucket}"
+
+    @property
+    def hashed_columns(self):
+        """
+        range of the hashed columns
+        """
+        return range(len(self.names), len(self))
+
+
+class NgramHasher(TransformerMixin, BaseEstimator):
+    """
+    Word and character n-gram counts hashed into n_features columns each.
+
+    Args:
+        n_features (int): columns per analyzer (hash space size)
+        analyzers (tuple): 'word' and / or 'char'
+        word_ngram_range (tuple): (min_n, max_n) of word n-grams
+        char_ngram_range (tuple): (min_n, max_n) of character n-grams, taken
+            inside word boundaries (char_wb)
+        norm (str): 'l2', 'l1' or None, applied per analyzer, so long and
+            short documents are comparable
+    """
+
+    def __init__(self, n_features=2 ** 18, analyzers=ANALYZERS, word_ngram_range=(1, 2),
+                 char_ngram_range=(2, 4), norm='l2'):
+        self.n_features = n_features
+        self.analyzers = analyzers
+        self.word_ngram_range = word_ngram_range
+        self.char_ngram_range = char_ngram_range
+        self.norm = norm
+
+    def _vectorizers(self):
+        for analyzer in self.analyzers:
+            if analyzer not in ANALYZERS:
+                raise ValueError(f"Unknown analyzer {analyzer!r}, expected one of {ANALYZERS}")
+            yield analyzer, HashingVectorizer(
+                analyzer='word' if analyzer == 'word' else 'char_wb',
+                ngram_range=self.word_ngram_range if analyzer == 'word' else self.char_ngram_range,
+                n_features=self.n_features,
+                alternate_sign=False,
+                norm=self.norm,
+                dtype=np.float32,
+            )
+
+    @property
+    def n_output_features(self):
+        return self.n_features * len(self.analyzers)
+
+    @property
+    def feature_names_(self):
+        return FeatureNames((), self)
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(list(self.feature_names_), dtype=object)
+
+    def fit(self, X=None, y=None):
+        return self
+
+    def transform(self, X):
+        """
+        Args:
+            X (list): document texts
+
+        Returns:
+            scipy.sparse.csr_matrix: (len(X), n_output_features) float32
+        """
+        X = list(X)
+        blocks = [vectorizer.transform(X) for _, vectorizer in self._vectorizers()]
+        return sp.hstack(blocks, format='csr', dtype=np.float32)
+
+
+def iter_ngram_blocks(texts, hasher=None, block_size=10000):
+    """
+    Hash a stream of texts block by block.
+
+    Only one block of texts is held at a time, so the stream can come
+    straight from a zip or corpus file.
+
+    Yields:
+        scipy.sparse.csr_matrix: (<= block_size, hasher.n_output_features)
+    """
+    hasher = hasher or NgramHasher()
+    texts = iter(texts)
+    while True:
+        block = list(islice(texts, block_size))
+        if not block:
+            return
+        yield hasher.transform(block)
@@ -9,7 +9,13 @@ Processing and extracting files for:
 # Date: 2025-12-09
 """
 
+import queue
+import threading
 import zipfile 
+import re
+from collections import Counter
+from html.entities import html5
+from html.parser import HTMLParser
 from bs4 import BeautifulSoup
 
 def extract_l1(soup):
@@ -76,27 +82,333 @@ def parse_html(html_text, filename):
 
     return l1, text, filename 
 
-def iterate_documents(zip_path):
+# Tag names and string rules of bs4's html.parser tree builder, so the
+# streaming extractor below puts string boundaries where bs4 would
+_VOID_TAGS = frozenset([
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr',
+    'image', 'img', 'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid',
+    'param', 'source', 'spacer', 'track', 'wbr',
+])
+_PRESERVE_WHITESPACE_TAGS = frozenset(['pre', 'textarea'])
+# Strings in these are not text for get_text()
+_STRING_CONTAINER_TAGS = frozenset(['rt', 'rp', 'style', 'script', 'template'])
+# Named references as html.parser reports them (without the ';')
+_ENTITIES = {name[:-1]: char for name, char in html5.items() if name.endswith(';')}
+_DECIMAL_PREFIX = re.compile(r'^([0-9]+)(.*)')
+_HEX_PREFIX = re.compile(r'^([0-9a-f]+)(.*)')
+_ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+class _StopParsing(Exception):
+    """
+    Both targets are closed; the rest of the page cannot change them
+    """
+
+class _Lang8Extractor(HTMLParser):
+    """
+    Stream a page through html.parser and keep only the strings of the first
+    <li class='speaking'> and the first <div id='body_show_ori'>.
+
+    No tree is built, but open tags are tracked the way BeautifulSoup's
+    html.parser builder tracks them (no implicit closing, an end tag pops
+    up to the nearest open tag of that name or is ignored, void tags close
+    at once), and a string ends at every tag, comment or declaration, so
+    the strings are exactly the ones bs4's get_text() would see.
+    """
+
+    def __init__(self):
+        # Entities are resolved by handle_entityref / handle_charref, as in bs4
+        super().__init__(convert_charrefs=False)
+        self.stack = []
+        self.open_counts = Counter()
+        self.data = []
+        # Stack depths of open script/style/template/rt/rp and pre/textarea
+        self.container_depths = []
+        self.preserve_depths = []
+        self.already_closed_void = []
+        # Target name -> [stack depth, strings, still open]
+        self.targets = {}
+
+    def _end_data(self, keep=True):
+        if not self.data:
+            return
+        data = ''.join(self.data)
+        self.data = []
+        if not self.preserve_depths and not data.strip(_ASCII_SPACES):
+            data = '\n' if '\n' in data else ' '
+        if keep:
+            for _, strings, is_open in self.targets.values():
+                if is_open:
+                    strings.append(data)
+
+    def _push(self, tag, attrs):
+        self._end_data(not self.container_depths)
+        depth = len(self.stack)
+        self.stack.append(tag)
+        self.open_counts[tag] += 1
+        if tag in _PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depths.append(depth)
+        if tag in _STRING_CONTAINER_TAGS:
+            self.container_depths.append(depth)
+
+        if tag == 'li' and 'li' not in self.targets:
+            if 'speaking' in _attr(attrs, 'class').split():
+                self.targets['li'] = [depth, [], True]
+        elif tag == 'div' and 'div' not in self.targets:
+            if _attr(attrs, 'id') == 'body_show_ori':
+                self.targets['div'] = [depth, [], True]
+
+    def _pop_to(self, tag):
+        self._end_data(not self.container_depths)
+        while self.open_counts[tag]:
+            name = self.stack.pop()
+            self.open_counts[name] -= 1
+            depth = len(self.stack)
+            if self.preserve_depths and self.preserve_depths[-1] == depth:
+                self.preserve_depths.pop()
+            if self.container_depths and self.container_depths[-1] == depth:
+                self.container_depths.pop()
+            for target in self.targets.values():
+                if target[0] == depth:
+                    target[2] = False
+            if name == tag:
+                break
+        if len(self.targets) == 2 and not any(is_open for _, _, is_open in self.targets.values()):
+            raise _StopParsing
+
+    def handle_starttag(self, tag, attrs):
+        self._push(tag, attrs)
+        if tag in _VOID_TAGS:
+            self._pop_to(tag)
+            self.already_closed_void.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._push(tag, attrs)
+        self._pop_to(tag)
+
+    def handle_endtag(self, tag):
+        # </br> right after <br> closes nothing (bs4 already closed it)
+        if tag in self.already_closed_void:
+            self.already_closed_void.remove(tag)
+        else:
+            self._pop_to(tag)
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_entityref(self, name):
+        # Unknown entities stay as '&name', without the ';'
+        self.data.append(_ENTITIES.get(name) or '&' + name)
+
+    def handle_charref(self, name):
+        self.data.append(_charref(name))
+
+    def _other(self, keep=False, data=''):
+        # Comments, doctypes and processing instructions end the current
+        # string and are not text themselves; CDATA sections are
+        self._end_data(not self.container_depths)
+        self.data.append(data)
+        self._end_data(keep)
+
+    def handle_comment(self, data):
+        self._other()
+
+    def handle_decl(self, decl):
+        self._other()
+
+    def handle_pi(self, data):
+        self._other()
+
+    def unknown_decl(self, data):
+        if data.upper().startswith('CDATA['):
+            self._other(keep=True, data=data[len('CDATA['):])
+        else:
+            self._other()
+
+    def close(self):
+        super().close()
+        # The trailing string belongs to whatever is still open
+        self._end_data(not self.container_depths)
+
+    def strings(self, target):
+        return self.targets[target][1] if target in self.targets else None
+
+def _charref(name):
+    """
+    Text of a numeric character reference '&#<name>', resolved as bs4 does:
+    a trailing non-digit part ('12ab') stays as text, invalid code points
+    become U+FFFD and 0x80-0x9F are read as windows-1252.
+    """
+    base, prefix = 10, _DECIMAL_PREFIX
+    if name[:1] in ('x', 'X'):
+        name, base, prefix = name[1:], 16, _HEX_PREFIX
+    extra = ''
+    try:
+        number = int(name, base)
+    except ValueError:
+        match = prefix.search(name)
+        if match is None:
+            return name
+        number, extra = int(match.group(1), base), match.group(2)
+
+    if number == 0 or number > 0x10ffff or 0xd800 <= number <= 0xdfff:
+        return '\ufffd' + extra
+    if 0x80 <= number <= 0x9f:
+        try:
+            return bytes([number]).decode('cp1252') + extra
+        except UnicodeDecodeError:
+            pass
+    return chr(number) + extra
+
+def _attr(attrs, name):
+    """
+    Last value of an attribute (bs4 keeps the last of duplicates), '' if missing
+    """
+    value = ''
+    for key, item in attrs:
+        if key == name:
+            value = item or ''
+    return value
+
+def parse_html_fast(html_text, filename):
+    """
+    Fast path for parse_html that streams the page instead of building a
+    BeautifulSoup tree.
+
+    Only the strings of the first <li class='speaking'> and the
+    <div id='body_show_ori'> are kept, and parsing stops once both are
+    closed. Tags are matched and strings split exactly as in bs4's
+    html.parser tree, then normalised the same way as extract_l1 /
+    extract_text, so the output is the same as parse_html's.
+
+    Args:
+        html_text: HTML from files 
+        str: Filename 
+
+    Returns:
+        tuple: (l1, text, filename)
+    """
+    extractor = _Lang8Extractor()
+    try:
+        extractor.feed(html_text)
+        extractor.close()
+    except _StopParsing:
+        pass
+
+    l1 = extractor.strings('li')
+    if l1 is not None:
+        l1 = ''.join(l1).strip()
+
+    text = extractor.strings('div')
+    text = ' '.join(' '.join(text).split()) if text is not None else ""
+
+    return l1, text, filename
+
+# Name -> parse function, selectable with iterate_documents(parser=...)
+PARSERS = {
+    'bs4': parse_html,
+    'fast': parse_html_fast,
+}
+
+# Marks the end of the member stream in the prefetch queue
+_END_OF_ZIP = object()
+
+def _wanted(info, allow, suffix):
+    """
+    Whether a zip entry passes the suffix filter and the optional allow-list
+    (matched on the full member name or on the bare filename).
+    """
+    name = info.filename
+    if info.is_dir() or not name.endswith(suffix):
+        return False
+    return allow is None or name in allow or name.rsplit('/', 1)[-1] in allow
+
+def iter_zip_members(zip_path, allow=None, suffix='.html', prefetch=32):
+    """
+    Stream (member, raw bytes) pairs out of a zip in archive order.
+
+    Entries are taken from infolist() one at a time and decompressed by a
+    background thread into a queue of at most `prefetch` members, so reading
+    and inflating overlaps with whatever the caller does with each document,
+    and memory stays bounded by the queue rather than the corpus size.
+
+    Args:
+        zip_path: Path to lang-8.zip
+        allow: Optional iterable of member names or bare filenames (e.g. the
+            lines of train.txt); other members are skipped without being read
+        suffix (str): Only members ending with this are yielded
+        prefetch (int): Max members decompressed ahead; 0 reads inline
+
+    Yields:
+        tuple: (member, raw bytes)
+    """
+    allow = None if allow is None else set(allow)
+
+    if prefetch <= 0:
+        with zipfile.ZipFile(zip_path, 'r') as zf:
+            for info in zf.infolist():
+                if _wanted(info, allow, suffix):
+                    yield info.filename, zf.read(info)
+        return
+
+    # Open in the caller so a bad path fails here, not in the thread
+    zf = zipfile.ZipFile(zip_path, 'r')
+    buffer = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up once the consumer is gone instead of blocking forever
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for info in zf.infolist():
+                if _wanted(info, allow, suffix):
+                    if not put((info.filename, zf.read(info))):
+                        return
+        except Exception as exc:
+            # Re-raised on the consumer side
+            put(exc)
+            return
+        put(_END_OF_ZIP)
+
+    reader = threading.Thread(target=produce, name='zip-prefetch', daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END_OF_ZIP:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        reader.join()
+        zf.close()
+
+def iterate_documents(zip_path, parser='fast', allow=None, prefetch=32):
     """
     Go through all fiels and extract the data
 
+    Args:
+        zip_path: Path to lang-8.zip
+        parser (str): 'fast' (streaming fast path, default) or 'bs4' (BeautifulSoup)
+        allow: Optional member names / filenames to restrict to (see iter_zip_members)
+        prefetch (int): Members decompressed ahead by the reader thread
+
     Yields:
         tuple: (l1, text, filename)
     """
-    # Open zip
-    with zipfile.ZipFile(zip_path, 'r') as zf:
-        html_files = [f for f in zf.namelist() if f.endswith('.html')]
-        
-        # Loop through each file
-        for filename in html_files:
-            # Read file
-            with zf.open(filename) as f:
-                html_content = f.read().decode('utf-8', errors='ignore')
-            # Parse HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
-            # Extract L1 and text
-            l1 = extract_l1(soup)
-            text = extract_text(soup)
-            # Yield document
-            yield l1, text, filename
+    parse = PARSERS[parser]
 
+    # Decompression runs ahead in a reader thread while this one parses
+    for filename, raw in iter_zip_members(zip_path, allow=allow, prefetch=prefetch):
+        html_content = raw.decode('utf-8', errors='ignore')
+        # Parse HTML, extract L1 and text, yield document
+        yield parse(html_content, filename)
@@ -0,0 +1,200 @@
+"""
+## Part 2: Shared per-document analysis
+
+Every Part 2 feature function needs some mix of word tokens, POS tags,
+sentences and lemmas. `DocAnalysis` computes each of those at most once per
+document and only when a feature actually asks for it, so running all the
+extractors on the same text segments, tokenizes and POS-tags it a single time.
+Segmentation is shared too: the spaCy sentences feed the sentence statistics
+and are what NLTK tokenizes and tags, one sentence at a time. The
+underlying NLTK / spaCy resources come from src.resources and are loaded on
+first use.
+"""
+
+import os
+import re
+from functools import cached_property, lru_cache
+from itertools import tee
+from typing import NamedTuple
+
+from src import profiling, taggers
+from src.resources import get_lemmatizer, get_sentencizer, get_word_tokenizer
+
+_WORD_RE = re.compile(r"\b\w+\b")
+
+# Max distinct tokens kept in the lemma cache (per process)
+LEMMA_CACHE_SIZE = int(os.environ.get('L2_LEMMA_CACHE_SIZE', 2 ** 17))
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(token: str) -> str:
+    """
+    WordNet lemma of a token, memoised in a bounded process-wide LRU cache.
+
+    Lang-8 vocabulary is very repetitive, so most lookups are hits. Each
+    worker process has its own cache; forked workers start from a copy of
+    the parent's.
+    """
+    return get_lemmatizer().lemmatize(token)
+
+
+def lemma_cache_info():
+    """
+    Returns:
+        CacheInfo: (hits, misses, maxsize, currsize) of the lemma cache
+    """
+    return lemmatize.cache_info()
+
+
+class Sentence(NamedTuple):
+    """
+    One sentence of a document, as found by the spaCy sentencizer.
+    """
+    text: str
+    # Non-space token strings
+    tokens: list
+
+
+class DocAnalysis:
+    """
+    Lazily computed NLP analysis of one text.
+
+    The text is sentence-split once (spaCy sentencizer); sentence statistics,
+    word tokenization and POS tagging all work from those sentences.
+
+    Attributes (each computed on first access, then cached):
+        text: the raw text
+        segments: Sentence (text, spaCy tokens) per non-empty sentence
+        sentences: spaCy tokens of each sentence
+        sentence_words: NLTK word tokens of each lowercased sentence
+            (empty ones dropped)
+        sentence_tags: (word, tag) pairs per entry of `sentence_words`, from
+            the current src.taggers backend
+        words: all of `sentence_words`, in order
+        pos_tags: (word, tag) pairs for `words`
+        tokens: regex word tokens (\\b\\w+\\b) of the lowercased text
+        lemmas: WordNet lemma for each entry of `tokens` (via the lemma cache)
+    """
+
+    def __init__(self, text: str, segments=None):
+        self.text = text
+        # Precomputed by a batched pass (see analyze_batch)
+        if segments is not None:
+            self.segments = segments
+
+    @cached_property
+    def segments(self):
+        return _doc_segments(get_sentencizer()(self.text))
+
+    @cached_property
+    def sentences(self):
+        return [segment.tokens for segment in self.segments]
+
+    @cached_property
+    def sentence_words(self):
+        tokenize = get_word_tokenizer()
+        with profiling.record('nltk:word_tokenize'):
+            sentence_words = [tokenize(segment.text.lower()) for segment in self.segments]
+        return [words for words in sentence_words if words]
+
+    @cached_property
+    def sentence_tags(self):
+        sentence_words = self.sentence_words
+        with profiling.record(f'pos_tag:{taggers.get_backend()}'):
+            return taggers.tag_batch(sentence_words)
+
+    @cached_property
+    def words(self):
+        return [word for words in self.sentence_words for word in words]
+
+    @cached_property
+    def pos_tags(self):
+        return [pair for pairs in self.sentence_tags for pair in pairs]
+
+    @cached_property
+    def tokens(self):
+        return _WORD_RE.findall(self.text.lower())
+
+    @cached_property
+    def lemmas(self):
+        return [lemmatize(tok) for tok in self.tokens]
+
+
+def _doc_segments(spacy_doc):
+    """
+    Sentence (text, non-space token strings) of each non-empty sentence in a
+    spaCy Doc.
+    """
+    segments = []
+    for sent in spacy_doc.sents:
+        # count tokens, ignoring spaces
+        tokens = [t.text for t in sent if not t.is_space]
+        if tokens:
+            segments.append(Sentence(sent.text, tokens))
+    return segments
+
+
+def segment_batch(texts, batch_size: int = 256, n_process: int = 1):
+    """
+    Sentence-split many texts with spaCy's batched nlp.pipe.
+
+    Args:
+        texts: list or stream of strings
+        batch_size: texts per nlp.pipe batch
+        n_process: spaCy worker processes (-1 = all cores)
+
+    Yields:
+        list: Sentence of each text, as in DocAnalysis.segments
+    """
+    nlp = get_sentencizer()
+    for spacy_doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+        yield _doc_segments(spacy_doc)
+
+
+def analyze_batch(texts, batch_size: int = 256, n_process: int = 1):
+    """
+    DocAnalysis for each text, with sentences precomputed by segment_batch.
+
+    Works on streams: texts are consumed lazily, a batch at a time.
+
+    Yields:
+        DocAnalysis
+    """
+    texts, texts_for_nlp = tee(texts)
+    for text, segments in zip(texts, segment_batch(texts_for_nlp, batch_size, n_process)):
+        yield DocAnalysis(text, segments=segments)
+
+
+def tag_docs(docs, n_jobs=1):
+    """
+    POS-tag the sentences of every DocAnalysis that is not tagged yet with
+    one call to the tagging backend, so batching backends see the sentences
+    of the whole batch. With n_jobs != 1 the sentences are tagged by a
+    process pool (see taggers.tag_parallel), e.g. for a few long documents.
+    """
+    todo = [doc for doc in docs if 'sentence_tags' not in doc.__dict__]
+    if not todo:
+        return
+    sentence_words = [words for doc in todo for words in doc.sentence_words]
+    with profiling.record(f'pos_tag:{taggers.get_backend()}', calls=len(todo)):
+        if n_jobs == 1:
+            tagged = taggers.tag_batch(sentence_words)
+        else:
+            tagged = taggers.tag_parallel(sentence_words, n_jobs=n_jobs)
+
+    position = 0
+    for doc in todo:
+        doc.sentence_tags = tagged[position:position + len(doc.sentence_words)]
+        position += len(doc.sentence_words)
+
+
+def as_analysis(text) -> DocAnalysis:
+    """
+    Accept either a raw string or an existing DocAnalysis.
+
+    Lets every feature function keep taking plain text while callers that
+    run several extractors share one analysis.
+    """
+    if isinstance(text, DocAnalysis):
+        return text
+    return DocAnalysis(text)
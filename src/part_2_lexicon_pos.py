@@ -1,37 +1,21 @@
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.stem import PorterStemmer
-from nltk import pos_tag
 from collections import Counter
 import string
 
-# Define lexicons
-Asian_words = {
-    "china", "chinese", "korea", "korean", 
-    "japan", "japanese", "tokyo", "beijing", 
-    "shanghai", "seoul"
-}
+from src.lexicons import default_matcher, load_lexicons
+from src.part_2_analysis import as_analysis
+from src.taggers import ARTICLES, NOUN_TAGS, TAG_GROUPS
 
-European_words = {
-    "Spain", "Spanish", "French", "France", "Paris",
-    "Madrid", "Barcelona", "Lyon", "Merci"
-}
+# Define lexicons (data/lexicons/*.txt, case-folded)
+LEXICONS = load_lexicons()
+Asian_words = LEXICONS["asian"]
+European_words = LEXICONS["european"]
+Religion_words = LEXICONS["religion"]
 
-Religion_words = {
-    "catholic", "christ", "god", "church",
-    "pray", "angel", "holy", "spirit", "devil"
-}
-
-#Define Noun tags
-NOUN_TAGS = {'NN', 'NNS', 'NNP', 'NNPS'}
-
-
-# Download required NLTK data
-nltk.download('punkt')
-nltk.download('averaged_perceptron_tagger_eng')
-nltk.download('wordnet')
 features = {}
 
+POS_RATIO_FEATURES = ('article_ratio', 'pronoun_density', 'preposition_ratio', 'modal_verb_ratio',
+                      'adjective_ratio')
+
 def extract_lexicon_features(text):
     '''
     Extract the Boolean value of romance cognates exsitence in the text we analyze, 
@@ -44,22 +28,26 @@ def extract_lexicon_features(text):
     while European speakers may be more direct. 
     This reflects cultural differences in politeness strategies and assertiveness.
     Args:
-        text: Strings
+        text: Strings, or a DocAnalysis shared with the other extractors
 
     Returns:
         tuple: (Boolean, Boolean, Boolean)
     '''
     features = {}
 
-    # Tokenization
-    words = word_tokenize(text.lower())
-    total_words = len(words)
-    if total_words == 0:
+    # One regex pass over the raw text for every lexicon
+    doc = as_analysis(text)
+    lexicon_terms = default_matcher().term_counts(doc.text)
+    religious = bool(lexicon_terms['religion'])
+
+    # Two of the top 3 nouns can only be Asian words if the text contains at
+    # least two different ones; otherwise skip tokenizing and POS tagging
+    if len(lexicon_terms['asian']) < 2:
         features['asian_top_word_match'] = False
-        features['Religious_Feature'] = False
+        features['Religious_Feature'] = religious
         return features
-    
-    pos_tagged_words = pos_tag(words)
+
+    pos_tagged_words = doc.pos_tags
     nouns = [word for word, tag in pos_tagged_words if tag in NOUN_TAGS]
 
     # Calculate Word Frequencies
@@ -80,7 +68,7 @@ def extract_lexicon_features(text):
             
     # The feature is True if 2 or more words matched the lexicon
     features['asian_top_word_match'] = (match_count >= 2)
-    features['Religious_Feature'] = any(word in Religion_words  for word in words)
+    features['Religious_Feature'] = religious
     return features
 
 def get_POS_rato_features(text):
@@ -96,40 +84,39 @@ def get_POS_rato_features(text):
     Get descriptive writing style differences
 
     Args:
-        text: Strings
+        text: Strings, or a DocAnalysis shared with the other extractors
 
     Returns:
-        tuple: (Float, Float, Float, Float, Float)
+        dict: the five ratios (all 0.0 for a text without words)
     '''
-    features = {}
+    features = dict.fromkeys(POS_RATIO_FEATURES, 0.0)
 
     # Tokenization
-    words = word_tokenize(text.lower())
-    sentences = sent_tokenize(text)
+    doc = as_analysis(text)
+    words = doc.words
     
-    # POS tagging
-    pos_tags = pos_tag(words)
+    # POS tagging (shared with extract_lexicon_features)
+    pos_tags = doc.pos_tags
     
     # Safety checks
     total_words = len(words)
-    total_sentences = len(sentences)
 
     if total_words == 0:
-        return 0
+        return features
     
-    articles = sum(1 for word, tag in pos_tags if tag == 'DT' and word in ['a', 'an', 'the'])
+    articles = sum(1 for word, tag in pos_tags if tag in TAG_GROUPS['article'] and word in ARTICLES)
     features['article_ratio'] = articles / total_words
 
-    pronouns = sum(1 for _, tag in pos_tags if tag in ['PRP', 'PRP$'])
+    pronouns = sum(1 for _, tag in pos_tags if tag in TAG_GROUPS['pronoun'])
     features['pronoun_density'] = pronouns / total_words
     
-    prepositions = sum(1 for _, tag in pos_tags if tag == 'IN')
+    prepositions = sum(1 for _, tag in pos_tags if tag in TAG_GROUPS['preposition'])
     features['preposition_ratio'] = prepositions / total_words
 
-    modals = sum(1 for _, tag in pos_tags if tag == 'MD')
+    modals = sum(1 for _, tag in pos_tags if tag in TAG_GROUPS['modal'])
     features['modal_verb_ratio'] = modals / total_words
 
-    adjectives = sum(1 for _, tag in pos_tags if tag in ['JJ', 'JJR', 'JJS'])
+    adjectives = sum(1 for _, tag in pos_tags if tag in TAG_GROUPS['adjective'])
     features['adjective_ratio'] = adjectives / total_words
 
     return features
\ No newline at end of file
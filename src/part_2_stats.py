@@ -1,27 +1,23 @@
 import sys
 from pathlib import Path
 from statistics import mean, pstdev
-from typing import Dict, Iterator
+from typing import Dict, Iterable, Iterator
 from collections import Counter
+from itertools import tee
 import string
-import re
 import math
 
-import spacy
-from nltk.stem import WordNetLemmatizer
+import numpy as np
+import pandas as pd
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from src.part_1 import iterate_documents  
+from src.corpus import iter_documents
+from src.part_2_analysis import analyze_batch, as_analysis, segment_batch
+from src.part_2_analysis import lemma_cache_info, lemmatize  # re-exported for callers of text_stats
 
-_nlp = spacy.blank("en")
-_nlp.add_pipe("sentencizer")
-
-# Initialise lemmatizer
-_lemmatizer = WordNetLemmatizer()
-
-def sentence_length_stats(text: str, long_thresh: int = 20) -> Dict[str, float]:
+def sentence_length_stats(text, long_thresh: int = 20) -> Dict[str, float]:
     """
-    Compute sentence-based features for a single text.
+    Compute sentence-based features for a single text (str or DocAnalysis).
     
     Features (updated):
         - sent_per_100_tokens: number of sentences per 100 tokens
@@ -37,15 +33,30 @@ def sentence_length_stats(text: str, long_thresh: int = 20) -> Dict[str, float]:
           directly; instead we use a normalized rate (sent_per_100_tokens) and
           sent_cv_log to capture sentence-length variation.
     """
-    doc = _nlp(text)
-    lengths = []
+    lengths = [len(sent) for sent in as_analysis(text).sentences]
+    return _sentence_stats_from_lengths(lengths)
+
 
-    for sent in doc.sents:
-        # count tokens, ignoring spaces
-        tokens = [t for t in sent if not t.is_space]
-        if tokens:
-            lengths.append(len(tokens))
+def sentence_length_stats_batch(
+    texts: Iterable[str],
+    long_thresh: int = 20,
+    batch_size: int = 256,
+    n_process: int = 1,
+) -> Iterator[Dict[str, float]]:
+    """
+    sentence_length_stats for a list or stream of texts.
 
+    Segmentation goes through spaCy's batched nlp.pipe, so throughput scales
+    with batch_size and n_process. Yields one dict per text, in input order.
+    """
+    for segments in segment_batch(texts, batch_size=batch_size, n_process=n_process):
+        yield _sentence_stats_from_lengths([len(segment.tokens) for segment in segments])
+
+
+def _sentence_stats_from_lengths(lengths) -> Dict[str, float]:
+    """
+    The three sentence features from per-sentence token counts.
+    """
     # No sentences / no tokens case
     if not lengths:
         return {
@@ -79,9 +90,78 @@ def sentence_length_stats(text: str, long_thresh: int = 20) -> Dict[str, float]:
     }
 
 
-def text_stats(text: str) -> Dict[str, float]:
+TEXT_STATS_COLUMNS = ("unique_lemma_ratio", "hapax_ratio", "mean_word_len", "punct_per_token")
+
+# Deleted with bytes.translate to count characters. Both sets are ASCII, and
+# UTF-8 never uses ASCII byte values inside multi-byte characters, so byte
+# counts equal character counts.
+_PUNCT_BYTES = string.punctuation.encode("ascii")
+_DIGITS_UNDERSCORE_BYTES = (string.digits + "_").encode("ascii")
+
+
+def _text_counts(doc):
     """
-    Compute token-level statistical features for a single text.
+    Integer counts behind text_stats for one DocAnalysis:
+    (tokens, unique lemmas, hapax tokens, letters in tokens, punctuation chars).
+
+    Work is done once per distinct token rather than once per token or per
+    character; counts are exact, so the ratios match text_stats bit for bit.
+    """
+    tokens = doc.tokens
+    raw = doc.text.encode("utf-8")
+    punct_chars = len(raw) - len(raw.translate(None, _PUNCT_BYTES))
+    if not tokens:
+        return 0, 0, 0, 0, punct_chars
+
+    counts = Counter(tokens)
+    unique_lemmas = len({lemmatize(tok) for tok in counts})
+    hapax_count = list(counts.values()).count(1)
+
+    # Tokens are \w+ runs: in ASCII the only non-letters are digits and '_'
+    joined = "".join(tokens)
+    if joined.isascii():
+        total_letters = len(joined.encode("ascii").translate(None, _DIGITS_UNDERSCORE_BYTES))
+    else:
+        total_letters = sum(map(str.isalpha, joined))
+
+    return len(tokens), unique_lemmas, hapax_count, total_letters, punct_chars
+
+
+def text_stats_batch(texts: Iterable) -> pd.DataFrame:
+    """
+    text_stats for many texts (str or DocAnalysis) at once.
+
+    Per-document counts are gathered with compiled regex / bytes.translate
+    counting and turned into ratios with vectorised NumPy division. The
+    values are identical to calling text_stats on each text.
+
+    Returns:
+        DataFrame: one row per text (input order), columns TEXT_STATS_COLUMNS
+    """
+    counts = np.array(
+        [_text_counts(as_analysis(text)) for text in texts], dtype=np.int64
+    ).reshape(-1, 5)
+    total_tokens, unique_lemmas, hapax, letters, punct = counts.T
+
+    # Ratios are 0.0 for documents without tokens, and mean_word_len also
+    # for documents without letters
+    has_tokens = total_tokens > 0
+    has_letters = has_tokens & (letters > 0)
+    values = np.zeros((len(counts), len(TEXT_STATS_COLUMNS)), dtype=np.float64)
+    for j, (numerator, where) in enumerate([
+        (unique_lemmas, has_tokens),
+        (hapax, has_tokens),
+        (letters, has_letters),
+        (punct, has_tokens),
+    ]):
+        np.divide(numerator, total_tokens, out=values[:, j], where=where)
+
+    return pd.DataFrame(values, columns=list(TEXT_STATS_COLUMNS))
+
+
+def text_stats(text) -> Dict[str, float]:
+    """
+    Compute token-level statistical features for a single text (str or DocAnalysis).
 
     Features (updated):
         - unique_lemma_ratio: #unique lemmas / total_tokens
@@ -96,11 +176,11 @@ def text_stats(text: str) -> Dict[str, float]:
           poorly discriminative on short Lang-8 texts (values collapsed
           near 1.0 for almost all documents).
     """
-
-    tokens = re.findall(r"\b\w+\b", text.lower())
+    doc = as_analysis(text)
+    tokens = doc.tokens
     total_tokens = len(tokens)
 
-    punct_chars = sum(1 for ch in text if ch in string.punctuation)
+    punct_chars = sum(1 for ch in doc.text if ch in string.punctuation)
 
     if total_tokens == 0:
         return {
@@ -111,8 +191,7 @@ def text_stats(text: str) -> Dict[str, float]:
         }
 
     # Lemmas for unique_lemma_ratio
-    lemmas = [_lemmatizer.lemmatize(tok) for tok in tokens]
-    unique_lemmas = len(set(lemmas))
+    unique_lemmas = len(set(doc.lemmas))
     unique_lemma_ratio = unique_lemmas / total_tokens
 
     # Hapax ratio
@@ -139,11 +218,20 @@ def text_stats(text: str) -> Dict[str, float]:
 
 
 def iter_sentence_features(
-    zip_path: str, long_thresh: int = 20
+    zip_path: str,
+    long_thresh: int = 20,
+    batch_size: int = 256,
+    n_process: int = 1,
+    exclude_l1: Iterable[str] = ("Russian",),
 ) -> Iterator[Dict[str, float]]:
     """
     Iterate over all Lang-8 documents and yield features.
 
+    Sentences are segmented in batches of `batch_size` documents with
+    spaCy's nlp.pipe (`n_process` workers). `zip_path` may also be a
+    pre-extracted corpus file (src/corpus.py), which skips HTML parsing.
+    Documents whose L1 is in `exclude_l1` are skipped (pass () to keep all).
+
     Yields one dict per document with keys:
         - 'l1'
         - 'filename'
@@ -152,13 +240,22 @@ def iter_sentence_features(
         - statistical:
             'unique_lemma_ratio', 'hapax_ratio', 'mean_word_len', 'punct_per_token'
     """
-    for l1, text, filename in iterate_documents(zip_path):
-        # Example of excluding one L1 if needed
-        if l1 == "Russian":
-            continue
+    exclude_l1 = set(exclude_l1)
+    documents = (
+        (l1, text, filename)
+        for l1, text, filename in iter_documents(zip_path)
+        if l1 not in exclude_l1
+    )
+    documents, documents_for_nlp = tee(documents)
+    analyses = analyze_batch(
+        (text for _, text, _ in documents_for_nlp),
+        batch_size=batch_size,
+        n_process=n_process,
+    )
 
-        sent_stats = sentence_length_stats(text, long_thresh=long_thresh)
-        token_stats = text_stats(text)
+    for (l1, _, filename), doc in zip(documents, analyses):
+        sent_stats = sentence_length_stats(doc, long_thresh=long_thresh)
+        token_stats = text_stats(doc)
 
         yield {
             "l1": l1,
@@ -1,100 +1,228 @@
-import pandas as pd
-import numpy as np
+"""
+## Part 3: Dataset construction, vectorization, baseline and feature ablation
+
+Each step is a pipeline stage (see src/pipeline.py): it takes the run
+config plus the outputs of the stages it depends on, and returns a dict of
+artifacts that the pipeline persists.
+
+    extract   -> labelled documents of the train/dev/test splits (config.label_scheme)
+    featurize -> feature dicts per split
+    vectorize -> DictVectorizer (+ hashed n-grams, config.ngram_features) CSR
+                 matrices, integer-coded labels
+    baseline  -> dev score of config.model with its baseline settings (depth-3 tree)
+    compare   -> fit time and dev score of every model in config.compare_models
+                 (default: all that take sparse input when n-grams are on)
+    ablation  -> leave-one-out / group ablation, retrained config.model
+
+Usage:
+    python src/part_3.py
+"""
+
+import sys
 from pathlib import Path
-from src.build_dataset import build_dataset
 
-# Root path direction
-ROOT = Path.cwd().parent
-DATA = ROOT / "data"
+import numpy as np
+from sklearn.feature_extraction import DictVectorizer
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.ablation import run_ablation
+from src.build_dataset import FEATURE_GROUPS, extract_documents, featurize_documents, split_texts, to_splits
+from src.labels import balanced_subsample, class_counts, encode_labels, stratified_sample
+from src.models import check_ngram_input, compare_models, default_comparison, make_model
+from src.ngrams import FeatureNames, NgramHasher
+from src.sparse import as_csr32, hstack_features
+
+
+def extract(config):
+    # Reads the pre-extracted corpus if there is one, else parses the zip
+    # (n_jobs: shard it over every core; parser: HTML extraction backend;
+    # label_fn: L1 -> class under config.label_scheme)
+    documents = extract_documents(
+        config.source, config.train_split, config.dev_split, config.test_split,
+        n_jobs=config.n_jobs, parser=config.parser, label_fn=config.label_fn,
+    )
+    return {"documents": documents}
 
-# train, test, dev
-zip_path = DATA / "raw" / "lang-8.zip"
-train = DATA / "train.txt"
-dev = DATA / "dev.txt"
-test = DATA / "test.txt"
 
-X_train, y_train, X_dev, y_dev, X_test, y_test = build_dataset(
-    zip_path, train, dev, test
-)
+def featurize(config, extract):
+    # Per-document features are cached in config.feature_cache across runs
+    documents = extract["documents"]
+    features = featurize_documents(
+        documents, n_jobs=config.n_jobs, cache_path=config.feature_cache, pos_tagger=config.pos_tagger,
+    )
+    X_train, y_train, X_dev, y_dev, X_test, y_test = to_splits(documents, features)
+    return {
+        "X_train": X_train, "y_train": y_train,
+        "X_dev": X_dev, "y_dev": y_dev,
+        "X_test": X_test, "y_test": y_test,
+    }
+
 
 # -----------------------
 # Vectorization
 # -----------------------
-from sklearn.feature_extraction import DictVectorizer
-
-vec = DictVectorizer(sparse=True)
+def vectorize(config, extract, featurize):
+    # float32 is what the tree models use internally, so nothing is lost
+    vec = DictVectorizer(sparse=True, dtype=np.float32)
+
+    X_train_vec = vec.fit_transform(featurize["X_train"])
+    X_dev_vec = vec.transform(featurize["X_dev"])
+    X_test_vec = vec.transform(featurize["X_test"])
+    feature_names = list(vec.feature_names_)
+
+    # Hashed word / char n-grams: a fixed number of columns however large
+    # the vocabulary, and nothing to fit
+    ngrams = None
+    if config.ngram_features:
+        ngrams = NgramHasher(n_features=config.ngram_features)
+        T_train, T_dev, T_test = split_texts(extract["documents"])
+        X_train_vec = hstack_features(X_train_vec, ngrams.transform(T_train))
+        X_dev_vec = hstack_features(X_dev_vec, ngrams.transform(T_dev))
+        X_test_vec = hstack_features(X_test_vec, ngrams.transform(T_test))
+        # Names of the hashed columns are made on access, not stored
+        feature_names = FeatureNames(feature_names, ngrams)
+
+    if config.sparse:
+        # Keep CSR end to end; trees, GridSearchCV and RFECV accept sparse input.
+        # The *_array names are kept from the original scripts
+        X_train_array = as_csr32(X_train_vec)
+        X_dev_array = as_csr32(X_dev_vec)
+        X_test_array = as_csr32(X_test_vec)
+    else:
+        # Sparse to dense arrays
+        X_train_array = X_train_vec.toarray()
+        X_dev_array = X_dev_vec.toarray()
+        X_test_array = X_test_vec.toarray()
+
+    # Labels as small integer codes into `classes` (int8 up to 127 classes)
+    classes, (y_train, y_dev, y_test) = encode_labels(
+        featurize["y_train"], featurize["y_dev"], featurize["y_test"]
+    )
 
-X_train_vec = vec.fit_transform(X_train)
-X_dev_vec = vec.transform(X_dev)
-X_test_vec = vec.transform(X_test)
+    # Optional smaller training set for fast iteration, per class
+    train_index = np.arange(len(y_train))
+    if config.sample_fraction is not None:
+        train_index = train_index[stratified_sample(y_train, config.sample_fraction)]
+    if config.max_per_class is not None:
+        train_index = train_index[balanced_subsample(y_train[train_index], config.max_per_class)]
+    if len(train_index) < len(y_train):
+        X_train_array, y_train = X_train_array[train_index], y_train[train_index]
+
+    counts = {classes[code]: n for code, n in class_counts(y_train).items()}
+    print(f"{len(classes)} classes, {len(y_train)} training documents: {counts}")
+
+    return {
+        "vec": vec,
+        "ngrams": ngrams,
+        "feature_names": feature_names,
+        "classes": classes,
+        "train_index": train_index,
+        "X_train_array": X_train_array, "y_train": y_train,
+        "X_dev_array": X_dev_array, "y_dev": y_dev,
+        "X_test_array": X_test_array, "y_test": y_test,
+    }
 
-# Sparse to dense arrays
-X_train_array = X_train_vec.toarray()
-X_dev_array = X_dev_vec.toarray()
-X_test_array = X_test_vec.toarray()
 
 # -----------------------
 # Baseline model
 # -----------------------
-from sklearn.tree import DecisionTreeClassifier
+def baseline(config, vectorize):
+    check_ngram_input(config.model, config.ngram_features)
+    model = make_model(config.model, n_jobs=config.n_jobs, stage="baseline")
+    model.fit(vectorize["X_train_array"], vectorize["y_train"])
+    score = model.score(vectorize["X_dev_array"], vectorize["y_dev"])
+    print(f"baseline accuracy ({config.model}) = {score}")
+    return {"baseline": model, "baseline_score": score}
 
-baseline = DecisionTreeClassifier(random_state=521, max_depth=3)
-baseline.fit(X_train_array, y_train)
-print(f"baseline accuracy = {baseline.score(X_dev_array, y_dev)}")
 
 # -----------------------
-# Feature ablation
+# Model families side by side
 # -----------------------
-def feature_ablation(vec, index, X_train_array, y_train, X_dev_array, y_dev):
-    baseline = DecisionTreeClassifier(random_state=521, max_depth=4)
-    baseline.fit(X_train_array, y_train)
-    base_score = baseline.score(X_dev_array, y_dev)
+def compare(config, vectorize):
+    names = config.compare_models or default_comparison(config.ngram_features)
+    for name in names:
+        check_ngram_input(name, config.ngram_features)
+    table = compare_models(
+        names,
+        vectorize["X_train_array"], vectorize["y_train"],
+        vectorize["X_dev_array"], vectorize["y_dev"],
+        n_jobs=config.n_jobs,
+    )
+    print(table.to_string(index=False))
 
-    n_features = X_train_array.shape[1]
-    keep_cols = np.delete(np.arange(n_features), index)
+    path = config.model_comparison_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(path, index=False)
+    print(f"Model comparison written to {path}")
+    return {"comparison": table}
 
-    X_train = X_train_array[:, keep_cols]
-    X_dev = X_dev_array[:, keep_cols]
 
-    model = DecisionTreeClassifier(random_state=521, max_depth=4)
-    model.fit(X_train, y_train)
+# -----------------------
+# Feature ablation + retrain with selected features
+# -----------------------
+def ablation(config, vectorize):
+    check_ngram_input(config.model, config.ngram_features)
+    vec = vectorize["vec"]
+    X_train_array, y_train = vectorize["X_train_array"], vectorize["y_train"]
+    X_dev_array, y_dev = vectorize["X_dev_array"], vectorize["y_dev"]
+    X_test_array, y_test = vectorize["X_test_array"], vectorize["y_test"]
+
+    # Baseline (config.model, max_depth=4 for the tree) is fitted once; the leave-one-out fits and the
+    # leave-one-group-out fits (all lexicon / POS / sentence / text stats
+    # features) run in parallel. Hashed n-grams are only dropped as a group,
+    # by column range
+    groups = dict(FEATURE_GROUPS)
+    if vectorize["ngrams"] is not None:
+        groups["ngrams"] = vectorize["feature_names"].hashed_columns
+    ablation_table = run_ablation(
+        X_train_array, y_train, X_dev_array, y_dev, vec.feature_names_,
+        estimator=make_model(config.model, stage="ablation"), groups=groups,
+        single_features=vec.feature_names_,
+        n_jobs=config.n_jobs,
+    )
+    print(ablation_table.drop(columns="indices").to_string(index=False))
 
-    accuracy = model.score(X_dev, y_dev)
-    delta = base_score - accuracy
+    single = ablation_table[ablation_table["kind"] == "feature"]
+    result = [
+        (indices[0], name, accuracy, delta)
+        for name, indices, accuracy, delta in zip(
+            single["name"], single["indices"], single["accuracy"], single["delta"]
+        )
+    ]
+    print(f'index, feature name, accuracy without the feature, the accuracy changes compare with the baseline model \n{result}')
 
-    return index, vec.feature_names_[index], accuracy * 100, delta * 100
+    ablation_features = []
+    for index, feature, score, delta in result:
+        if delta == 0:
+            ablation_features.append(index)
 
+    ablation_features_with_name = []
+    for index, feature, score, delta in result:
+        if delta == 0:
+            ablation_features_with_name.append(feature)
+    print(ablation_features_with_name)
 
-result = []
-for index, feature in enumerate(vec.feature_names_):
-    result.append(
-        feature_ablation(
-            vec, index, X_train_array, y_train, X_dev_array, y_dev
-        )
-    )
+    # Retrain with selected features
+    # (the "test_tree" key is kept from the original scripts, whatever the model)
+    test_tree = make_model(config.model, n_jobs=config.n_jobs, stage="ablation")
 
-result = sorted(result, key=lambda x: x[3])
-print(f'index, feature name, accuracy without the feature, the accuracy changes compare with the baseline model \n{result}')
+    n_features = X_train_array.shape[1]
+    keep_cols = np.delete(np.arange(n_features), ablation_features)
 
-ablation_features = []
-for index, feature, score, delta in result:
-    if delta == 0:
-        ablation_features.append(index)
+    test_tree.fit(X_train_array[:, keep_cols], y_train)
 
-ablation_features_with_name = []
-for index, feature, score, delta in result:
-    if delta == 0:
-        ablation_features_with_name.append(feature)
-print(ablation_features_with_name)
+    print(f'model performance after feature ablation on test set: {test_tree.score(X_test_array[:, keep_cols], y_test)}')
 
-# -----------------------
-# Retrain with selected features
-# -----------------------
-test_tree = DecisionTreeClassifier(max_depth=4, random_state=521)
+    return {
+        "ablation_table": ablation_table,
+        "result": result,
+        "ablation_features": ablation_features,
+        "keep_cols": keep_cols,
+        "test_tree": test_tree,
+    }
 
-n_features = X_train_array.shape[1]
-keep_cols = np.delete(np.arange(n_features), ablation_features)
 
-test_tree.fit(X_train_array[:, keep_cols], y_train)
+if __name__ == "__main__":
+    from src.pipeline import PART_3_STAGES, PipelineConfig, run_pipeline
 
-print(f'model performance after feature ablation on test set: {test_tree.score(X_test_array[:, keep_cols], y_test)}')
+    run_pipeline(PipelineConfig(), PART_3_STAGES)
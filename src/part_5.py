@@ -1,125 +1,261 @@
-import pandas as pd
-import altair as alt
-import altair_ally as aly
-import matplotlib.pyplot as plt
+"""
+## Part 5: Hyperparameter tuning, feature selection and reporting
 
-from sklearn.tree import plot_tree, DecisionTreeClassifier
-from sklearn.model_selection import GridSearchCV, StratifiedKFold
-from sklearn.feature_selection import RFECV
+Pipeline stages (see src/pipeline.py):
+
+    tune   -> hyperparameter search for config.model (src/search.py, src/models.py)
+    select -> feature selection for the tuned model (src/selection.py: importance,
+              permutation or RFECV); selected features + timings saved next to
+              the model bundle
+    report -> EDA figures, tree plot (tree models), final dev / test scores
+    export -> model bundle for src/predict.py
 
-from scipy.stats import loguniform, randint
+Usage:
+    python src/part_5.py
+"""
+
+import json
+import sys
 from pathlib import Path
 
-# ---------- Image output directory ----------
-PROJECT_ROOT = Path(__file__).resolve().parent.parent
-IMAGE_DIR = PROJECT_ROOT / "reports/figures" / "part_5"
-IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+import numpy as np
+from sklearn.base import clone
+from sklearn.tree import plot_tree, DecisionTreeClassifier
 
-# -----------------------
-# DataFrames for EDA
-# -----------------------
-X_train = pd.DataFrame(X_train)
-X_dev = pd.DataFrame(X_dev)
-X_test = pd.DataFrame(X_test)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src import profiling
+from src.labels import decode_labels
+from src.models import check_ngram_input, get_spec, make_model, search_space
+from src.predict import save_bundle
+from src.search import run_search
+from src.selection import select_features
 
-train = X_train.copy()
-train["target"] = y_train
+# RFECV step with hashed n-gram columns: a fixed number of columns per round
+# would mean one refit per few columns over hundreds of thousands of them
+NGRAM_SELECTION_STEP = 0.2
 
-cat_cols = train.select_dtypes(include=["bool", "object"]).columns.tolist()
 
 # -----------------------
-# EDA
+# Hyperparameter search
 # -----------------------
-aly.alt.data_transformers.enable("vegafusion")
-
-dist_chart = aly.dist(train, color="target").resolve_scale(y="independent")
-dist_chart.save(IMAGE_DIR / "dist_target.png")
-
-cat_train = train[cat_cols].melt(
-    id_vars="target", var_name="variable", value_name="value"
-)
-
-cat_chart = alt.Chart(cat_train).mark_bar().encode(
-    x=alt.X("value:N").title("Category"),
-    y=alt.Y("count()").title("Count"),
-    color="target",
-).properties(
-    width=150,
-    height=150,
-).facet(
-    "variable:N",
-    columns=3,
-)
-cat_chart.save(IMAGE_DIR / "categorical_distributions.png")
-
-corr_chart = aly.corr(train)
-corr_chart.save(IMAGE_DIR / "correlation.png")
+def tune(config, vectorize):
+    check_ngram_input(config.model, config.ngram_features)
+    # Candidates are fitted in parallel, so the model itself runs on one core
+    model = make_model(config.model)
+
+    # Finished chunks are checkpointed; rerunning the same search resumes
+    best_tree, search_results = run_search(
+        model,
+        vectorize["X_train_array"],
+        vectorize["y_train"],
+        mode=config.search_mode,
+        param_space=search_space(config.model, config.search_mode),
+        n_iter=config.search_n_iter,
+        time_budget=config.search_time_budget,
+        n_jobs=config.n_jobs,
+        scoring=config.scoring,
+        checkpoint=config.search_checkpoint,
+    )
+    print(f"Best parameters ({len(search_results)} candidates scored): {best_tree.get_params()}")
+    return {"best_tree": best_tree, "search_results": search_results}
+
 
 # -----------------------
-# Tree visualization
+# Feature selection
 # -----------------------
-plt.figure(figsize=(14, 8))
-plot_tree(
-    test_tree,
-    feature_names=vec.feature_names_,
-    class_names=["Asian", "European"],
-    filled=True,
-    impurity=False,
-    fontsize=10,
-)
-plt.tight_layout()
-plt.savefig(IMAGE_DIR / "decision_tree.png", dpi=200)
-plt.close()
+def column_ranges(columns):
+    """
+    Sorted column indices as [start, stop) runs of consecutive columns.
+
+    Args:
+        columns (np.ndarray): sorted column indices
+
+    Returns:
+        list: [[start, stop], ...]
+    """
+    if not len(columns):
+        return []
+    breaks = np.flatnonzero(np.diff(columns) != 1) + 1
+    starts = columns[np.r_[0, breaks]]
+    stops = columns[np.r_[breaks - 1, len(columns) - 1]] + 1
+    return [[int(start), int(stop)] for start, stop in zip(starts, stops)]
+
+
+def select(config, vectorize, tune):
+    check_ngram_input(config.model, config.ngram_features)
+    X_train, y_train = vectorize["X_train_array"], vectorize["y_train"]
+
+    step = config.selection_step
+    if vectorize["ngrams"] is not None and config.selection == "rfecv" and step >= 1:
+        print(f"rfecv: step {step} -> {NGRAM_SELECTION_STEP} of the remaining features per round "
+              f"({X_train.shape[1]} columns with hashed n-grams)")
+        step = NGRAM_SELECTION_STEP
+
+    # RFECV fold results are cached in config.selection_cache across runs
+    result = select_features(
+        tune["best_tree"], X_train, y_train,
+        method=config.selection,
+        importance_getter=get_spec(config.model).importance_getter,
+        step=step,
+        min_features_to_select=config.min_features_to_select,
+        threshold=config.selection_threshold,
+        n_repeats=config.permutation_repeats,
+        scoring=config.scoring,
+        n_jobs=config.n_jobs,
+        memory=config.selection_cache,
+    )
+    selected_columns = np.flatnonzero(result["support"])
+    # Hand-crafted columns by name; hashed n-gram columns have no meaningful
+    # name and can number hundreds of thousands, so they are kept as ranges
+    feature_names = vectorize["feature_names"]
+    with_ngrams = vectorize["ngrams"] is not None
+    n_named = feature_names.hashed_columns.start if with_ngrams else len(feature_names)
+    named_columns = selected_columns[selected_columns < n_named]
+    selected_features = [feature_names[i] for i in named_columns]
+    hashed_ranges = column_ranges(selected_columns[selected_columns >= n_named])
+
+    # The tuned model refitted on the selected columns only
+    model = clone(tune["best_tree"]).fit(X_train[:, selected_columns], y_train)
+
+    timings = {name: round(seconds, 3) for name, seconds in result["timings"].items()}
+    print(f"{config.selection}: kept {len(selected_columns)}/{X_train.shape[1]} features in "
+          f"{timings['total_s']}s: {selected_features}")
+    if with_ngrams:
+        n_hashed = len(selected_columns) - len(named_columns)
+        print(f"  {len(named_columns)}/{n_named} hand-crafted, {n_hashed}/{X_train.shape[1] - n_named} "
+              f"hashed n-gram columns in {len(hashed_ranges)} ranges")
+
+    # Next to the model bundle, for inference and for comparing runs
+    path = config.selection_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "method": config.selection,
+        "model": config.model,
+        "n_features": X_train.shape[1],
+        "n_selected": len(selected_columns),
+        "selected_columns": named_columns.tolist(),
+        "selected_features": selected_features,
+        # [start, stop) column ranges
+        "selected_hashed_columns": hashed_ranges,
+        "timings": timings,
+    }, indent=2))
+    print(f"Selected features written to {path}")
+
+    return {
+        "model": model,
+        "selected_columns": selected_columns,
+        "selected_features": selected_features,
+        "selected_hashed_columns": hashed_ranges,
+        "scores": result["scores"],
+        "timings": timings,
+    }
+
 
 # -----------------------
-# Grid Search
+# EDA, tree plot and final scores
 # -----------------------
-search_grid = {
-    "max_depth": [1, 2, 3, 4, 5, 6, 7, 8, 9, None],
-    "min_samples_split": [2, 5, 10, 20, 50],
-    "min_samples_leaf": [1, 2, 5, 10, 20],
-    "max_features": [None, "sqrt", "log2"],
-    "criterion": ["gini", "entropy"],
-    "class_weight": [None, "balanced"],
-}
+def report(config, featurize, vectorize, ablation, select):
+    # Plotting libraries are only needed here
+    import pandas as pd
+    import altair as alt
+    import altair_ally as aly
+    import matplotlib.pyplot as plt
+
+    image_dir = config.image_dir
+    image_dir.mkdir(parents=True, exist_ok=True)
+
+    # DataFrames for EDA
+    train = pd.DataFrame(featurize["X_train"])
+    train["target"] = featurize["y_train"]
+
+    cat_cols = train.select_dtypes(include=["bool", "object"]).columns.tolist()
+
+    aly.alt.data_transformers.enable("vegafusion")
+
+    with profiling.record("report:altair_dist"):
+        dist_chart = aly.dist(train, color="target").resolve_scale(y="independent")
+        dist_chart.save(image_dir / "dist_target.png")
 
-tree = DecisionTreeClassifier(random_state=521)
+    cat_train = train[cat_cols].melt(
+        id_vars="target", var_name="variable", value_name="value"
+    )
 
-grid_search = GridSearchCV(
-    estimator=tree,
-    param_grid=search_grid,
-    scoring="accuracy",
-)
+    cat_chart = alt.Chart(cat_train).mark_bar().encode(
+        x=alt.X("value:N").title("Category"),
+        y=alt.Y("count()").title("Count"),
+        color="target",
+    ).properties(
+        width=150,
+        height=150,
+    ).facet(
+        "variable:N",
+        columns=3,
+    )
+    with profiling.record("report:altair_categorical"):
+        cat_chart.save(image_dir / "categorical_distributions.png")
 
-grid_search.fit(X_train_array, y_train)
+    with profiling.record("report:altair_corr"):
+        corr_chart = aly.corr(train)
+        corr_chart.save(image_dir / "correlation.png")
+
+    # Tree visualization (only the decision tree has a single tree to draw)
+    if not isinstance(ablation["test_tree"], DecisionTreeClassifier):
+        print(f"No tree plot for {config.model}")
+    else:
+        with profiling.record("report:tree_plot"):
+            plt.figure(figsize=(14, 8))
+            plot_tree(
+                ablation["test_tree"],
+                feature_names=vectorize["feature_names"],
+                class_names=[str(c) for c in decode_labels(ablation["test_tree"].classes_, vectorize.get("classes"))],
+                filled=True,
+                impurity=False,
+                fontsize=10,
+            )
+            plt.tight_layout()
+            plt.savefig(image_dir / "decision_tree.png", dpi=200)
+            plt.close()
+
+    model, columns = select["model"], select["selected_columns"]
+    dev_score = model.score(vectorize["X_dev_array"][:, columns], vectorize["y_dev"])
+    test_score = model.score(vectorize["X_test_array"][:, columns], vectorize["y_test"])
+
+    print(
+        "Dev prediction score with hyperparameter optimization and feature selection:",
+        dev_score,
+    )
+
+    print(
+        "Test prediction score with hyperparameter optimization and feature selection:",
+        test_score,
+    )
+
+    return {"dev_score": dev_score, "test_score": test_score}
 
-best_tree = grid_search.best_estimator_
 
 # -----------------------
-# RFECV
+# Model bundle for inference
 # -----------------------
-cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=521)
-
-rfecv = RFECV(
-    estimator=best_tree,
-    n_jobs=-1,
-    verbose=1,
-    cv=cv,
-    scoring="accuracy",
-)
-
-rfecv.fit(X_train_array, y_train)
-
-selected_features = [
-    f for f, keep in zip(vec.feature_names_, rfecv.get_support()) if keep
-]
-
-print(
-    "Dev prediction score with hyperparameter optimization and feature selection:",
-    rfecv.score(X_dev_array, y_dev),
-)
-
-print(
-    "Test prediction score with hyperparameter optimization and feature selection:",
-    rfecv.score(X_test_array, y_test),
-)
+def export(config, vectorize, ablation, select):
+    # The tuned model on the selected columns is the default; the ablation
+    # model only sees keep_cols
+    path = save_bundle(
+        config.model_path,
+        vectorizer=vectorize["vec"],
+        models={
+            "selected": (select["model"], select["selected_columns"]),
+            "ablation_tree": (ablation["test_tree"], ablation["keep_cols"]),
+        },
+        default_model="selected",
+        classes=vectorize.get("classes"),
+        ngrams=vectorize["ngrams"],
+        pos_tagger=config.pos_tagger,
+    )
+    print(f"Model bundle saved to {path}")
+    return {"model_path": path}
+
+
+if __name__ == "__main__":
+    from src.pipeline import PART_5_STAGES, PipelineConfig, run_pipeline
+
+    run_pipeline(PipelineConfig(), PART_5_STAGES)
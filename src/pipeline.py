@@ -0,0 +1,363 @@
+"""
+Pipeline orchestration
+
+Named stages, in order:
+
+    extract -> featurize -> vectorize -> baseline -> compare -> ablation -> tune -> select -> report -> export
+
+Each stage is a function in part_3.py / part_5.py taking the run config and
+the outputs of the stages it depends on. Its output dict is persisted to
+<artifact_dir>/<stage>.joblib, so any stage can be run on its own: missing
+inputs are loaded from earlier runs, or computed if they were never built.
+
+Next to each output goes a fingerprint of the config fields the stage reads
+(STAGE_CONFIG) and of its upstream stages' fingerprints. Input files (the
+zip or corpus, the split lists) count with their size and modification
+time. A saved output is only reused while the fingerprint still matches,
+so changing e.g. the label scheme, editing train.txt or rebuilding the
+corpus recomputes extract and everything downstream of it.
+"""
+
+import cProfile
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import joblib
+
+from src import part_3, part_5, profiling, taggers
+from src.build_dataset import extractor_versions
+from src.labels import LabelMapper
+from src.models import DEFAULT_MODEL
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# stage name -> (function, names of the stages whose outputs it needs)
+STAGES = {
+    "extract": (part_3.extract, ()),
+    "featurize": (part_3.featurize, ("extract",)),
+    "vectorize": (part_3.vectorize, ("extract", "featurize")),
+    "baseline": (part_3.baseline, ("vectorize",)),
+    "compare": (part_3.compare, ("vectorize",)),
+    "ablation": (part_3.ablation, ("vectorize",)),
+    "tune": (part_5.tune, ("vectorize",)),
+    "select": (part_5.select, ("vectorize", "tune")),
+    "report": (part_5.report, ("featurize", "vectorize", "ablation", "select")),
+    "export": (part_5.export, ("vectorize", "ablation", "select")),
+}
+
+# stage name -> PipelineConfig fields its output depends on. Paths of caches
+# and outputs, n_jobs and profiling settings do not change results
+STAGE_CONFIG = {
+    "extract": ("source", "train_split", "dev_split", "test_split", "parser", "label_scheme", "exclude_l1",
+                "other_label"),
+    "featurize": ("pos_tagger", "extractors"),
+    "vectorize": ("sample_fraction", "max_per_class", "sparse", "ngram_features"),
+    "baseline": ("model",),
+    "compare": ("compare_models",),
+    "ablation": ("model",),
+    "tune": ("model", "scoring", "search_mode", "search_n_iter", "search_time_budget"),
+    "select": ("model", "scoring", "selection", "selection_step", "min_features_to_select",
+               "selection_threshold", "permutation_repeats"),
+    "report": ("model",),
+    "export": ("pos_tagger",),
+}
+
+PART_3_STAGES = ("extract", "featurize", "vectorize", "baseline", "compare", "ablation")
+PART_5_STAGES = ("tune", "select", "report", "export")
+
+
+@dataclass
+class PipelineConfig:
+    """
+    Paths and settings shared by all stages.
+    """
+    root: Path = PROJECT_ROOT
+    n_jobs: int = -1
+    # HTML extraction backend, see part_1.PARSERS
+    parser: str = "fast"
+    # POS tagging backend, see taggers.TAGGERS
+    pos_tagger: str = "nltk"
+    # Classes: 'binary', 'family' or 'l1' (src/labels.py), L1s always left out,
+    # and the label of L1s a scheme does not map (None drops them)
+    label_scheme: str = "binary"
+    exclude_l1: Tuple[str, ...] = ()
+    other_label: Optional[str] = None
+    # Cut the training set down for fast iteration: a stratified fraction
+    # and / or at most this many documents per class
+    sample_fraction: Optional[float] = None
+    max_per_class: Optional[int] = None
+    # sklearn scorer for tuning and RFECV, e.g. "balanced_accuracy" for many classes
+    scoring: str = "accuracy"
+    # Keep feature matrices as CSR instead of densifying them
+    sparse: bool = True
+    # Hashed word + char n-gram columns per analyzer (src/ngrams.py); 0 = off
+    ngram_features: int = 0
+    # Model for baseline, ablation, tune and select (src/models.py), and the
+    # models fitted side by side by the compare stage (None: every model that
+    # fits the features, models.default_comparison)
+    model: str = DEFAULT_MODEL
+    compare_models: Optional[Tuple[str, ...]] = None
+    # Hyperparameter search, see src/search.py
+    search_mode: str = "grid"
+    search_n_iter: Optional[int] = None
+    search_time_budget: Optional[float] = None
+    # Feature selection, see src/selection.py: 'importance', 'permutation' or
+    # 'rfecv'; RFECV drops `selection_step` features per round (a float in
+    # (0, 1): that fraction of the remaining ones; with n-grams always a
+    # fraction, part_5.NGRAM_SELECTION_STEP unless a smaller one is given)
+    selection: str = "rfecv"
+    selection_step: Union[int, float] = 1
+    min_features_to_select: int = 1
+    # 'importance' cut-off: 'mean', 'median' or a number
+    selection_threshold: str = "mean"
+    permutation_repeats: int = 5
+    artifact_dir: Optional[Path] = field(default=None)
+    # Record per-stage / per-extractor timings (src/profiling.py)
+    profile: bool = False
+    # Stage to run under cProfile, dumped to <profile_dir>/<stage>.prof
+    cprofile_stage: Optional[str] = None
+
+    def __post_init__(self):
+        self.root = Path(self.root)
+        if self.artifact_dir is None:
+            self.artifact_dir = self.root / "artifacts"
+        self.artifact_dir = Path(self.artifact_dir)
+
+    @property
+    def data_dir(self):
+        return self.root / "data"
+
+    @property
+    def label_fn(self):
+        return LabelMapper(self.label_scheme, exclude=self.exclude_l1, other=self.other_label)
+
+    @property
+    def extractors(self):
+        # Feature extractor versions with this POS backend (build_dataset)
+        return extractor_versions(self.pos_tagger)
+
+    @property
+    def zip_path(self):
+        return self.data_dir / "raw" / "lang-8.zip"
+
+    @property
+    def corpus_path(self):
+        # Written once by `python src/corpus.py`
+        return self.data_dir / "processed" / "lang-8.corpus"
+
+    @property
+    def source(self):
+        """
+        Pre-extracted corpus when it has been built, the raw zip otherwise.
+        """
+        return self.corpus_path if self.corpus_path.exists() else self.zip_path
+
+    @property
+    def train_split(self):
+        return self.data_dir / "train.txt"
+
+    @property
+    def dev_split(self):
+        return self.data_dir / "dev.txt"
+
+    @property
+    def test_split(self):
+        return self.data_dir / "test.txt"
+
+    @property
+    def feature_cache(self):
+        return self.data_dir / "cache" / "features.sqlite"
+
+    @property
+    def search_checkpoint(self):
+        return self.data_dir / "cache" / f"search_{self.model}_{self.search_mode}.joblib"
+
+    @property
+    def selection_cache(self):
+        # joblib.Memory location of the RFECV fold results
+        return self.data_dir / "cache" / "selection"
+
+    @property
+    def selection_path(self):
+        # Selected feature list and timings, next to the model bundle
+        return self.root / "models" / "selected_features.json"
+
+    @property
+    def image_dir(self):
+        return self.root / "reports" / "figures" / "part_5"
+
+    @property
+    def model_path(self):
+        # Loaded by src/predict.py
+        return self.root / "models" / "l2_classifier.joblib"
+
+    @property
+    def model_comparison_path(self):
+        return self.root / "reports" / "model_comparison.csv"
+
+    @property
+    def profile_dir(self):
+        return self.root / "reports" / "profiling"
+
+
+class ArtifactStore:
+    """
+    One joblib file per stage output under a directory.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, name):
+        return self.root / f"{name}.joblib"
+
+    def fingerprint_path(self, name):
+        return self.root / f"{name}.fingerprint"
+
+    def exists(self, name):
+        return self.path(name).exists()
+
+    def fingerprint(self, name):
+        """
+        Fingerprint the output was saved with, None if unknown.
+        """
+        path = self.fingerprint_path(name)
+        if not self.exists(name) or not path.exists():
+            return None
+        return path.read_text().strip()
+
+    def save(self, name, artifacts, fingerprint=None):
+        self.root.mkdir(parents=True, exist_ok=True)
+        joblib.dump(artifacts, self.path(name))
+        # Written after the output, so a crash in between leaves it stale
+        if fingerprint is not None:
+            self.fingerprint_path(name).write_text(fingerprint + "\n")
+        else:
+            self.fingerprint_path(name).unlink(missing_ok=True)
+
+    def load(self, name):
+        return joblib.load(self.path(name))
+
+
+def _fingerprint_value(value):
+    """
+    JSON-able form of a config value for a fingerprint. Paths stand for
+    their file: size and modification time, so an edited or replaced file
+    changes the fingerprint without hashing gigabytes of zip.
+    """
+    if not isinstance(value, Path):
+        return value
+    try:
+        stat = value.stat()
+    except FileNotFoundError:
+        return {"path": str(value), "missing": True}
+    return {"path": str(value), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class Pipeline:
+    """
+    Runs stages and resolves their inputs from memory, the artifact store,
+    or by running the upstream stage.
+    """
+
+    def __init__(self, config=None, store=None):
+        self.config = config or PipelineConfig()
+        self.store = store or ArtifactStore(self.config.artifact_dir)
+        self._outputs = {}
+        self._fingerprints = {}
+
+    def fingerprint(self, stage):
+        """
+        Hash of the config fields a stage reads (STAGE_CONFIG) and of the
+        fingerprints of the stages it depends on.
+        """
+        if stage not in self._fingerprints:
+            _, deps = STAGES[stage]
+            state = {
+                "stage": stage,
+                "config": {name: _fingerprint_value(getattr(self.config, name)) for name in STAGE_CONFIG[stage]},
+                "deps": {dep: self.fingerprint(dep) for dep in deps},
+            }
+            payload = json.dumps(state, sort_keys=True, default=str).encode("utf-8")
+            self._fingerprints[stage] = hashlib.sha1(payload).hexdigest()
+        return self._fingerprints[stage]
+
+    def get(self, stage):
+        """
+        Output of a stage: from this run, from disk if it was saved with the
+        same fingerprint, or computed now.
+        """
+        if stage not in self._outputs:
+            if self.store.fingerprint(stage) == self.fingerprint(stage):
+                self._outputs[stage] = self.store.load(stage)
+            else:
+                if self.store.exists(stage):
+                    print(f"[{stage}] saved output is out of date with the config, recomputing")
+                self.run(stage)
+        return self._outputs[stage]
+
+    def run(self, stage):
+        """
+        (Re)compute one stage and persist its output.
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage!r}, expected one of {list(STAGES)}")
+
+        func, deps = STAGES[stage]
+        inputs = {dep: self.get(dep) for dep in deps}
+
+        print(f"\n========== Stage: {stage} ==========\n")
+        start = time.perf_counter()
+        with profiling.record(f"stage:{stage}"):
+            if stage == self.config.cprofile_stage:
+                outputs = self._run_cprofile(stage, func, inputs)
+            else:
+                outputs = func(self.config, **inputs)
+        print(f"[{stage}] done in {time.perf_counter() - start:.1f}s")
+
+        self.store.save(stage, outputs, self.fingerprint(stage))
+        self._outputs[stage] = outputs
+        return outputs
+
+    def _run_cprofile(self, stage, func, inputs):
+        profiler = cProfile.Profile()
+        outputs = profiler.runcall(func, self.config, **inputs)
+
+        path = self.config.profile_dir / f"{stage}.prof"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        print(f"cProfile output for {stage}: {path} (inspect with python -m pstats)")
+        return outputs
+
+
+def run_pipeline(config=None, stages=None):
+    """
+    Run the given stages in order (default: all of them).
+
+    Listed stages are always recomputed; stages they depend on are reused
+    from the artifact store when available.
+
+    Returns:
+        Pipeline: holding every stage output loaded or computed in this run
+    """
+    pipeline = Pipeline(config)
+    # For code that reads the process-wide backend; workers get
+    # config.pos_tagger passed explicitly
+    taggers.set_backend(pipeline.config.pos_tagger)
+    if pipeline.config.profile:
+        profiling.enable()
+        profiling.reset()
+
+    for stage in stages or STAGES:
+        pipeline.run(stage)
+
+    if pipeline.config.profile:
+        print()
+        profiling.print_report()
+        json_path, csv_path = profiling.write_report(pipeline.config.profile_dir)
+        print(f"Profile written to {json_path} and {csv_path}")
+    return pipeline
@@ -0,0 +1,403 @@
+"""
+Classify new learner texts with a trained model bundle
+
+The pipeline's `export` stage saves a bundle (joblib) with the fitted
+DictVectorizer (and the n-gram hasher, if any), the tuned model on its
+selected columns and the ablation model with its kept columns. `L2Classifier` loads it once, keeps the NLTK / spaCy resources
+warm and classifies raw text or Lang-8 HTML pages, a batch at a time.
+
+Modes:
+    - one-off:  python src/predict.py --text "Yesterday I went to Tokyo..."
+                python src/predict.py --file entry.html
+    - stdin:    one document per line (raw text, or JSON {"text": ...}),
+                one JSON prediction per line, in input order
+    - HTTP:     python src/predict.py --serve --port 8000
+                POST /predict {"text": ...} or {"texts": [...]}, GET /health
+
+In the streaming modes requests are micro-batched: documents arriving within
+max_wait_ms of each other (up to max_batch) share one spaCy nlp.pipe call,
+one vectorizer transform and one predict_proba call.
+"""
+
+import argparse
+import json
+import queue
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import joblib
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src import taggers
+from src.build_dataset import extractor_versions, featurize_texts
+from src.part_1 import parse_html_fast
+from src.sparse import as_csr32, hstack_features
+from src.resources import warm_up
+
+BUNDLE_FORMAT = 1
+
+DEFAULT_MODEL_PATH = Path(__file__).resolve().parent.parent / "models" / "l2_classifier.joblib"
+
+# Something that looks like markup rather than learner prose
+_HTML_RE = re.compile(r"<\s*(html|body|div|li|p|ul|br)\b", re.IGNORECASE)
+
+
+# -----------------------
+# Bundle
+# -----------------------
+def save_bundle(path, vectorizer, models, default_model, classes=None, ngrams=None, pos_tagger=None):
+    """
+    Persist everything needed to classify new documents.
+
+    Args:
+        path: output .joblib path
+        vectorizer: fitted DictVectorizer
+        models (dict): name -> (fitted estimator, kept column indices or None)
+        default_model (str): key of models used unless another is asked for
+        classes: class names when the models were fitted on integer label
+            codes (src/labels.py encode_labels)
+        ngrams: NgramHasher whose columns follow the vectorizer's, or None
+        pos_tagger (str): POS backend the features were computed with
+            (taggers.TAGGERS), None for this process's
+
+    Returns:
+        Path: the written file
+    """
+    pos_tagger = pos_tagger or taggers.get_backend()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    bundle = {
+        "format": BUNDLE_FORMAT,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        # Features must be computed by the same extractor versions and POS
+        # tagger; L2Classifier switches to that tagger
+        "pos_tagger": pos_tagger,
+        "extractors": extractor_versions(pos_tagger),
+        "vectorizer": vectorizer,
+        "ngrams": ngrams,
+        "models": {name: {"estimator": est, "columns": cols} for name, (est, cols) in models.items()},
+        "default_model": default_model,
+        "classes": None if classes is None else [str(c) for c in classes],
+    }
+    joblib.dump(bundle, path)
+    return path
+
+
+def load_bundle(path):
+    bundle = joblib.load(path)
+    if bundle.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"{path}: unsupported bundle format {bundle.get('format')!r}")
+
+    # Bundles from before the backend was recorded used the default one
+    current = extractor_versions(bundle.setdefault("pos_tagger", taggers.DEFAULT_BACKEND))
+    if bundle["extractors"] != current:
+        raise ValueError(
+            f"{path} was trained with feature extractors {bundle['extractors']}, "
+            f"this code has {current}; rerun the pipeline to export a new bundle"
+        )
+    return bundle
+
+
+def document_text(document):
+    """
+    Learner text of a document given as raw text or as an HTML page.
+
+    Lang-8 pages give their <div id='body_show_ori'> text; other HTML
+    gives all of its text.
+    """
+    if not _HTML_RE.search(document):
+        return document
+
+    text = parse_html_fast(document, None)[1]
+    if text:
+        return text
+
+    from lxml import html as lxml_html
+    try:
+        return " ".join(lxml_html.document_fromstring(document).text_content().split())
+    except Exception:
+        return document
+
+
+# -----------------------
+# Classifier
+# -----------------------
+class L2Classifier:
+    """
+    Classifier for new documents (Asian / European, or the classes of the
+    label scheme the bundle was trained with).
+
+    Usage:
+        clf = L2Classifier.load("models/l2_classifier.joblib")
+        clf.warm_up()
+        clf.predict(["Yesterday I went to Tokyo with my friend."])
+        # [{'label': 'Asian', 'probabilities': {'Asian': 0.8, 'European': 0.2}}]
+    """
+
+    def __init__(self, bundle, model=None):
+        self.bundle = bundle
+        self.model_name = model or bundle["default_model"]
+        if self.model_name not in bundle["models"]:
+            raise ValueError(f"Unknown model {self.model_name!r}, expected one of {list(bundle['models'])}")
+
+        self.vectorizer = bundle["vectorizer"]
+        self.ngrams = bundle.get("ngrams")
+        self.pos_tagger = bundle.get("pos_tagger", taggers.DEFAULT_BACKEND)
+        self.estimator = bundle["models"][self.model_name]["estimator"]
+        self.columns = bundle["models"][self.model_name]["columns"]
+        # Integer-coded labels are named from the bundle's class list
+        names = bundle.get("classes")
+        self.classes = [str(names[c] if names is not None else c) for c in self.estimator.classes_]
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH, model=None):
+        return cls(load_bundle(path), model=model)
+
+    def warm_up(self):
+        """
+        Load NLTK / spaCy now and run one prediction, so the first real
+        request does not pay for it.
+        """
+        warm_up()
+        self.predict(["Warm up sentence for the classifier."])
+
+    def predict(self, documents):
+        """
+        Classify a batch of documents (raw text or HTML).
+
+        Returns:
+            list: {'label': str, 'probabilities': {label: float}} per document
+        """
+        if not documents:
+            return []
+
+        texts = [document_text(d) for d in documents]
+        with taggers.using_backend(self.pos_tagger):
+            features = featurize_texts(texts)
+        X = as_csr32(self.vectorizer.transform(features))
+        if self.ngrams is not None:
+            X = hstack_features(X, self.ngrams.transform(texts))
+        if self.columns is not None:
+            X = X[:, self.columns]
+
+        probabilities = self.estimator.predict_proba(X)
+        predictions = []
+        for row in probabilities:
+            best = int(row.argmax())
+            predictions.append({
+                "label": self.classes[best],
+                "probabilities": {label: float(p) for label, p in zip(self.classes, row)},
+            })
+        return predictions
+
+
+# -----------------------
+# Micro-batching
+# -----------------------
+class MicroBatcher:
+    """
+    Collects single-document requests from many threads and classifies them
+    together on one worker thread (which is also the only thread touching
+    NLTK / spaCy).
+
+    A batch is sent when max_batch documents are waiting, or max_wait_ms
+    after its first document arrived.
+    """
+
+    def __init__(self, classifier, max_batch=32, max_wait_ms=5.0):
+        self.classifier = classifier
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="predict-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, document):
+        """
+        Returns:
+            Future: resolves to the prediction dict of the document
+        """
+        future = Future()
+        self._queue.put((document, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            closing = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+            if closing:
+                return
+
+    def _process(self, batch):
+        try:
+            predictions = self.classifier.predict([document for document, _ in batch])
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+                return
+            # One bad document must not fail the others: retry them one by one
+            for item in batch:
+                self._process([item])
+            return
+        for (_, future), prediction in zip(batch, predictions):
+            future.set_result(prediction)
+
+
+# -----------------------
+# Streaming modes
+# -----------------------
+def _line_document(line):
+    line = line.rstrip("\n")
+    if line.startswith("{"):
+        try:
+            return json.loads(line)["text"]
+        except (ValueError, KeyError, TypeError):
+            pass
+    return line
+
+
+def serve_stdin(batcher, stdin=sys.stdin, stdout=sys.stdout):
+    """
+    One document per input line -> one JSON prediction per output line,
+    written in input order as soon as it is ready.
+    """
+    pending = queue.Queue()
+
+    def read():
+        for line in stdin:
+            if line.strip():
+                pending.put(batcher.submit(_line_document(line)))
+        pending.put(None)
+
+    threading.Thread(target=read, name="stdin-reader", daemon=True).start()
+    while True:
+        future = pending.get()
+        if future is None:
+            return
+        try:
+            result = future.result()
+        except Exception as exc:
+            result = {"error": str(exc)}
+        stdout.write(json.dumps(result) + "\n")
+        stdout.flush()
+
+
+def make_handler(batcher):
+    class PredictHandler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "model": batcher.classifier.model_name})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                texts = request["texts"] if "texts" in request else [request["text"]]
+                if not all(isinstance(t, str) for t in texts):
+                    raise TypeError("texts must be strings")
+            except (ValueError, KeyError, TypeError) as exc:
+                self._send(400, {"error": f"expected JSON {{'text': str}} or {{'texts': [str]}} ({exc})"})
+                return
+
+            futures = [batcher.submit(text) for text in texts]
+            try:
+                predictions = [future.result() for future in futures]
+            except Exception as exc:
+                self._send(500, {"error": str(exc)})
+                return
+            self._send(200, {"predictions": predictions})
+
+        def log_message(self, format, *args):
+            # Keep the console quiet; one line per request is too much under load
+            pass
+
+    return PredictHandler
+
+
+def serve_http(batcher, host="127.0.0.1", port=8000):
+    server = ThreadingHTTPServer((host, port), make_handler(batcher))
+    print(f"Serving predictions on http://{host}:{server.server_port}/predict", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Classify learner texts as Asian / European L1")
+    parser.add_argument("--model", type=Path, default=DEFAULT_MODEL_PATH, help="Model bundle (export stage)")
+    parser.add_argument("--model-name", default=None, help="Model inside the bundle (default: the bundle's default)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--text", action="append", help="Text or HTML to classify (repeatable)")
+    source.add_argument("--file", type=Path, action="append", help="File with one text / HTML page (repeatable)")
+    source.add_argument("--serve", action="store_true", help="Run the HTTP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=32, help="Max documents per micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Max wait to fill a micro-batch")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    classifier = L2Classifier.load(args.model, model=args.model_name)
+    classifier.warm_up()
+
+    if args.text or args.file:
+        documents = args.text or [path.read_text(encoding="utf-8", errors="ignore") for path in args.file]
+        for prediction in classifier.predict(documents):
+            print(json.dumps(prediction))
+    else:
+        batcher = MicroBatcher(classifier, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+        try:
+            if args.serve:
+                serve_http(batcher, args.host, args.port)
+            else:
+                serve_stdin(batcher)
+        finally:
+            batcher.close()
@@ -0,0 +1,166 @@
+"""
+Lightweight run instrumentation
+
+Named sections (pipeline stages, feature extractors, HTML parsing, spaCy
+segmentation, NLTK tagging, ...) are timed with `record`:
+
+    with profiling.record("extractor:pos", calls=len(docs)):
+        ...
+
+For each name the totals of wall time, CPU time (this process) and calls
+are kept, plus the peak RSS of the process seen when a section ends.
+Sections nest and times are inclusive, e.g. an extractor's time includes
+the NLTK tagging it triggers.
+
+Off by default; `record` is then a no-op. Turn it on with enable() or
+L2_PROFILE=1. Worker processes send their totals back with their results
+(see build_dataset._map_shards); those are merged with `merge`.
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_enabled = os.environ.get('L2_PROFILE', '').lower() not in ('', '0', 'false', 'no')
+
+# name -> {'calls', 'wall_s', 'cpu_s', 'peak_rss_mb'}
+_stats = {}
+
+REPORT_COLUMNS = ('name', 'calls', 'wall_s', 'cpu_s', 'wall_ms_per_call', 'peak_rss_mb')
+
+
+def enable(enabled=True):
+    """
+    Turn instrumentation on or off for this process.
+    """
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled():
+    return _enabled
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far, in MiB (None if unknown).
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, KiB elsewhere
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2 ** 20
+    except (ImportError, AttributeError):
+        return None
+
+
+def _add(name, calls, wall, cpu, rss):
+    entry = _stats.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': None})
+    entry['calls'] += calls
+    entry['wall_s'] += wall
+    entry['cpu_s'] += cpu
+    if rss is not None:
+        entry['peak_rss_mb'] = max(entry['peak_rss_mb'] or 0.0, rss)
+
+
+@contextmanager
+def record(name, calls=1):
+    """
+    Time the enclosed block under `name` (no-op when disabled).
+
+    Args:
+        name (str): section name, e.g. 'stage:tune' or 'extractor:pos'
+        calls (int): how many calls the block stands for, e.g. documents in a batch
+    """
+    if not _enabled:
+        yield
+        return
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield
+    finally:
+        _add(name, calls, time.perf_counter() - wall_start,
+             time.process_time() - cpu_start, peak_rss_mb())
+
+
+def snapshot():
+    """
+    Copy of the totals recorded in this process.
+    """
+    return {name: dict(entry) for name, entry in _stats.items()}
+
+
+def merge(stats):
+    """
+    Add totals from another process (a snapshot()) to this one's.
+    """
+    for name, entry in stats.items():
+        _add(name, entry['calls'], entry['wall_s'], entry['cpu_s'], entry['peak_rss_mb'])
+
+
+def reset():
+    _stats.clear()
+
+
+def report_rows():
+    """
+    One dict per recorded name (REPORT_COLUMNS), slowest first.
+    """
+    rows = []
+    for name, entry in _stats.items():
+        rows.append({
+            'name': name,
+            'calls': entry['calls'],
+            'wall_s': entry['wall_s'],
+            'cpu_s': entry['cpu_s'],
+            'wall_ms_per_call': entry['wall_s'] / entry['calls'] * 1000 if entry['calls'] else 0.0,
+            'peak_rss_mb': entry['peak_rss_mb'],
+        })
+    return sorted(rows, key=lambda row: row['wall_s'], reverse=True)
+
+
+def write_report(out_dir, stem='profile'):
+    """
+    Write the recorded totals to <out_dir>/<stem>.json and <stem>.csv.
+
+    Returns:
+        tuple: (json path, csv path)
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rows = report_rows()
+
+    json_path = out_dir / f"{stem}.json"
+    json_path.write_text(json.dumps(rows, indent=2))
+
+    csv_path = out_dir / f"{stem}.csv"
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return json_path, csv_path
+
+
+def print_report(limit=25):
+    """
+    Print the slowest recorded sections.
+    """
+    print(f"{'section':<36}{'calls':>8}{'wall s':>10}{'cpu s':>10}{'ms/call':>10}{'peak RSS MiB':>14}")
+    for row in report_rows()[:limit]:
+        rss = '' if row['peak_rss_mb'] is None else f"{row['peak_rss_mb']:.0f}"
+        print(f"{row['name']:<36}{row['calls']:>8}{row['wall_s']:>10.2f}{row['cpu_s']:>10.2f}"
+              f"{row['wall_ms_per_call']:>10.3f}{rss:>14}")
@@ -0,0 +1,166 @@
+"""
+Lazy, cached NLP resources
+
+Nothing heavy happens at import time: NLTK data is looked up (and, unless
+offline, downloaded) and spaCy / WordNet objects are built the first time a
+feature function asks for them, then reused for the rest of the process.
+
+Offline mode (set L2_OFFLINE=1 or call set_offline(True)) never touches the
+network: a missing NLTK package raises a LookupError naming the package to
+install instead of trying to download it.
+"""
+
+import os
+from functools import lru_cache
+
+# NLTK package name -> resource path checked with nltk.data.find()
+NLTK_RESOURCES = {
+    'averaged_perceptron_tagger_eng': 'taggers/averaged_perceptron_tagger_eng',
+    'wordnet': 'corpora/wordnet',
+}
+
+_offline = os.environ.get('L2_OFFLINE', '').lower() not in ('', '0', 'false', 'no')
+
+
+def set_offline(offline=True):
+    """
+    Turn offline mode on or off for this process.
+    """
+    global _offline
+    _offline = bool(offline)
+
+
+def is_offline():
+    return _offline
+
+
+@lru_cache(maxsize=None)
+def require_nltk(package):
+    """
+    Make sure an NLTK data package is installed locally.
+
+    Checked once per process. Online, a missing package is downloaded;
+    offline, a LookupError is raised.
+
+    Args:
+        package (str): key of NLTK_RESOURCES
+
+    Returns:
+        str: the package name
+    """
+    import nltk
+
+    path = NLTK_RESOURCES[package]
+    try:
+        nltk.data.find(path)
+        return package
+    except LookupError:
+        if _offline:
+            raise LookupError(
+                f"NLTK package '{package}' is not installed and offline mode is on. "
+                f"Install it with: python -m nltk.downloader {package}"
+            ) from None
+
+    nltk.download(package, quiet=True)
+    # Raises LookupError if the download did not work either
+    nltk.data.find(path)
+    return package
+
+
+@lru_cache(maxsize=None)
+def get_word_tokenizer():
+    """
+    Returns:
+        callable: NLTK's word_tokenize for one sentence (no Punkt sentence
+            splitting, so no NLTK data is needed; sentences come from
+            get_sentencizer)
+    """
+    from nltk.tokenize import NLTKWordTokenizer
+    return NLTKWordTokenizer().tokenize
+
+
+@lru_cache(maxsize=None)
+def get_pos_tagger():
+    """
+    Returns:
+        callable: nltk.pos_tag, with its data available
+    """
+    require_nltk('averaged_perceptron_tagger_eng')
+    from nltk import pos_tag
+    return pos_tag
+
+
+@lru_cache(maxsize=None)
+def get_pos_tag_sents():
+    """
+    Returns:
+        callable: nltk.pos_tag_sents, with its data available
+    """
+    require_nltk('averaged_perceptron_tagger_eng')
+    from nltk import pos_tag_sents
+    return pos_tag_sents
+
+
+@lru_cache(maxsize=None)
+def get_tagdict():
+    """
+    Returns:
+        dict: word -> tag of the words the NLTK perceptron tags without
+            looking at context (frequent, unambiguous in its training data)
+    """
+    require_nltk('averaged_perceptron_tagger_eng')
+    from nltk.tag.perceptron import PerceptronTagger
+    return PerceptronTagger().tagdict
+
+
+@lru_cache(maxsize=None)
+def get_spacy_tagger(model='en_core_web_sm'):
+    """
+    Returns:
+        spacy.Language: a trained spaCy pipeline with only what tagging needs
+    """
+    import spacy
+
+    try:
+        return spacy.load(model, exclude=['parser', 'ner', 'lemmatizer', 'senter'])
+    except OSError:
+        raise LookupError(
+            f"spaCy model '{model}' is not installed. "
+            f"Install it with: python -m spacy download {model}"
+        ) from None
+
+
+@lru_cache(maxsize=None)
+def get_lemmatizer():
+    """
+    Returns:
+        WordNetLemmatizer: shared instance
+    """
+    require_nltk('wordnet')
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer()
+
+
+@lru_cache(maxsize=None)
+def get_sentencizer():
+    """
+    Returns:
+        spacy.Language: blank English pipeline with a rule-based sentencizer
+    """
+    import spacy
+
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+
+def warm_up():
+    """
+    Load every resource now instead of on first use, e.g. before forking
+    workers or serving requests.
+    """
+    get_word_tokenizer()
+    get_pos_tagger()
+    # WordNet itself is only read on the first lookup
+    get_lemmatizer().lemmatize('warm')
+    get_sentencizer()
@@ -0,0 +1,224 @@
+"""
+Hyperparameter search for part_5
+
+Modes:
+    - 'grid': exhaustive grid (SEARCH_GRID), parallel over n_jobs
+    - 'random': randomized search over SEARCH_DISTRIBUTIONS
+    - 'halving_grid' / 'halving_random': successive halving
+      (HalvingGridSearchCV / HalvingRandomSearchCV)
+
+'grid' and 'random' evaluate candidates in chunks. After every chunk the
+scores are written to an optional checkpoint file, so an interrupted search
+resumes where it stopped, and a time budget (seconds) or an iteration budget
+(number of candidates) stops the search early with the best result so far.
+"""
+
+import hashlib
+import time
+from pathlib import Path
+
+import joblib
+import pandas as pd
+from scipy.stats import randint
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    GridSearchCV,
+    HalvingGridSearchCV,
+    HalvingRandomSearchCV,
+    ParameterGrid,
+    ParameterSampler,
+)
+
+SEARCH_MODES = ('grid', 'random', 'halving_grid', 'halving_random')
+
+# 10 x 5 x 5 x 3 x 2 x 2 = 3000 configurations
+SEARCH_GRID = {
+    "max_depth": [1, 2, 3, 4, 5, 6, 7, 8, 9, None],
+    "min_samples_split": [2, 5, 10, 20, 50],
+    "min_samples_leaf": [1, 2, 5, 10, 20],
+    "max_features": [None, "sqrt", "log2"],
+    "criterion": ["gini", "entropy"],
+    "class_weight": [None, "balanced"],
+}
+
+# Same ranges as SEARCH_GRID, with the integer ones sampled
+SEARCH_DISTRIBUTIONS = {
+    "max_depth": [1, 2, 3, 4, 5, 6, 7, 8, 9, None],
+    "min_samples_split": randint(2, 51),
+    "min_samples_leaf": randint(1, 21),
+    "max_features": [None, "sqrt", "log2"],
+    "criterion": ["gini", "entropy"],
+    "class_weight": [None, "balanced"],
+}
+
+
+def _candidates(mode, param_space, n_iter, random_state):
+    """
+    The ordered list of parameter dicts a chunked search will evaluate.
+    """
+    if mode == 'grid':
+        candidates = list(ParameterGrid(param_space))
+        return candidates if n_iter is None else candidates[:n_iter]
+    return list(ParameterSampler(param_space, n_iter or 100, random_state=random_state))
+
+
+def _describe(param_space):
+    """
+    A repr-stable description of a parameter space (scipy distributions
+    otherwise repr as memory addresses).
+    """
+    described = {}
+    for name, values in param_space.items():
+        if hasattr(values, 'rvs') and hasattr(values, 'dist'):
+            values = (values.dist.name, values.args, values.kwds)
+        described[name] = values
+    return described
+
+
+def _signature(*parts):
+    """
+    Short hash identifying a search setup, stored with its checkpoint.
+    """
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def _load_checkpoint(checkpoint, signature):
+    if checkpoint is not None and Path(checkpoint).exists():
+        state = joblib.load(checkpoint)
+        if state.get('signature') == signature:
+            return state
+    return {'signature': signature, 'rows': [], 'finished': False}
+
+
+def _save_checkpoint(checkpoint, state):
+    if checkpoint is not None:
+        Path(checkpoint).parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(state, checkpoint)
+
+
+def _run_chunked(estimator, X, y, candidates, scoring, cv, n_jobs,
+                 time_budget, chunk_size, checkpoint, signature, verbose):
+    """
+    Evaluate candidates chunk by chunk with GridSearchCV, checkpointing as it goes.
+
+    Returns:
+        list: result rows (params, mean_test_score, std_test_score), in candidate order
+    """
+    state = _load_checkpoint(checkpoint, signature)
+    rows = state['rows']
+    if rows and verbose:
+        print(f"Resuming search: {len(rows)}/{len(candidates)} candidates already scored")
+
+    start = time.perf_counter()
+    while len(rows) < len(candidates):
+        chunk = candidates[len(rows):len(rows) + chunk_size]
+        search = GridSearchCV(
+            estimator=clone(estimator),
+            param_grid=[{k: [v] for k, v in params.items()} for params in chunk],
+            scoring=scoring,
+            cv=cv,
+            n_jobs=n_jobs,
+            refit=False,
+        )
+        search.fit(X, y)
+
+        results = search.cv_results_
+        for i, params in enumerate(results['params']):
+            rows.append({
+                'params': params,
+                'mean_test_score': results['mean_test_score'][i],
+                'std_test_score': results['std_test_score'][i],
+            })
+        _save_checkpoint(checkpoint, state)
+
+        # Checked after each chunk, so every run makes progress
+        if time_budget is not None and time.perf_counter() - start >= time_budget:
+            if len(rows) < len(candidates) and verbose:
+                print(f"Search time budget reached after {len(rows)}/{len(candidates)} candidates")
+            break
+
+    return rows
+
+
+def run_search(estimator, X, y, mode='grid', param_space=None, n_iter=None,
+               time_budget=None, n_jobs=-1, cv=5, scoring='accuracy',
+               checkpoint=None, chunk_size=100, random_state=521, verbose=True):
+    """
+    Tune `estimator` and refit the best configuration on (X, y).
+
+    Args:
+        estimator: unfitted sklearn estimator
+        X, y: training data (dense or sparse)
+        mode (str): one of SEARCH_MODES
+        param_space (dict): grid / distributions; defaults to SEARCH_GRID for
+            grid modes and SEARCH_DISTRIBUTIONS for random modes
+        n_iter (int): iteration budget -- max candidates for 'grid', number of
+            sampled candidates for 'random' (default 100), n_candidates for
+            'halving_random'
+        time_budget (float): seconds; 'grid' / 'random' stop after the chunk
+            that uses it up (halving modes ignore it)
+        n_jobs (int): parallel fits (-1 = all cores)
+        cv: folds (int) or CV splitter
+        scoring (str): sklearn scorer name
+        checkpoint: optional path; finished chunks are saved there and a rerun
+            with the same setup resumes from it
+        chunk_size (int): candidates per checkpointed chunk
+        random_state (int): seed for sampling candidates
+
+    Returns:
+        tuple: (best_estimator, results) -- results is a DataFrame with one
+            row per scored candidate (params, mean_test_score, std_test_score)
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode {mode!r}, expected one of {SEARCH_MODES}")
+
+    if param_space is None:
+        param_space = SEARCH_GRID if mode in ('grid', 'halving_grid') else SEARCH_DISTRIBUTIONS
+
+    # Includes a hash of the data so a checkpoint is never reused for other inputs
+    signature = _signature(mode, _describe(param_space), n_iter, scoring, cv, random_state,
+                           clone(estimator).get_params(), joblib.hash((X, y)))
+
+    if mode in ('grid', 'random'):
+        candidates = _candidates(mode, param_space, n_iter, random_state)
+        rows = _run_chunked(estimator, X, y, candidates, scoring, cv, n_jobs,
+                            time_budget, chunk_size, checkpoint, signature, verbose)
+        results = pd.DataFrame(rows, columns=['params', 'mean_test_score', 'std_test_score'])
+        # First best wins ties, like GridSearchCV's rank_test_score
+        best_params = results.loc[results['mean_test_score'].idxmax(), 'params']
+    else:
+        state = _load_checkpoint(checkpoint, signature)
+        if not state['finished']:
+            if mode == 'halving_grid':
+                search = HalvingGridSearchCV(
+                    clone(estimator), param_space, scoring=scoring, cv=cv,
+                    n_jobs=n_jobs, random_state=random_state, refit=False,
+                )
+            else:
+                search = HalvingRandomSearchCV(
+                    clone(estimator), param_space, n_candidates=n_iter or 'exhaust',
+                    scoring=scoring, cv=cv, n_jobs=n_jobs,
+                    random_state=random_state, refit=False,
+                )
+            search.fit(X, y)
+
+            # Only candidates that survived to the last (full-data) round
+            last = search.cv_results_['iter'] == search.n_iterations_ - 1
+            state['rows'] = [
+                {
+                    'params': search.cv_results_['params'][i],
+                    'mean_test_score': search.cv_results_['mean_test_score'][i],
+                    'std_test_score': search.cv_results_['std_test_score'][i],
+                }
+                for i in last.nonzero()[0]
+            ]
+            state['best_params'] = search.best_params_
+            state['finished'] = True
+            _save_checkpoint(checkpoint, state)
+        results = pd.DataFrame(state['rows'], columns=['params', 'mean_test_score', 'std_test_score'])
+        best_params = state['best_params']
+
+    best_estimator = clone(estimator).set_params(**best_params)
+    best_estimator.fit(X, y)
+    return best_estimator, results
@@ -0,0 +1,276 @@
+"""
+Feature selection for part_5
+
+Methods, from cheapest to most thorough:
+
+    - 'importance': fit once, keep the features whose model importance
+      (feature_importances_ / |coef_|) reaches a threshold
+    - 'permutation': fit once on most of the training set, then measure the
+      score lost on the rest when each feature is shuffled, features in
+      parallel, and keep the features whose loss exceeds its spread over the
+      repeats. Only features the model uses (non-zero importance) are
+      shuffled, since shuffling an unused one cannot change a prediction
+    - 'rfecv': recursive feature elimination with cross-validation. step
+      can be a fraction (drop that share of the remaining features per
+      round), so the number of refits grows with log(n_features) rather
+      than n_features
+
+The RFECV folds run in parallel and each fold's elimination path is cached
+with joblib.Memory, so a rerun with the same model, data and settings (or
+one resuming after an interrupted run) only refits the folds it is missing.
+
+    result = select_features(model, X_train, y_train, method='rfecv', step=0.2)
+    result['support'], result['scores'], result['timings']
+"""
+
+import time
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from joblib import Memory, Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+from src import profiling
+
+SELECTION_METHODS = ('importance', 'permutation', 'rfecv')
+
+
+def feature_importances(estimator, importance_getter='auto'):
+    """
+    Non-negative importance per feature of a fitted estimator.
+
+    Args:
+        importance_getter (str): 'auto' (feature_importances_, else coef_) or
+            an attribute path such as 'named_steps.model.coef_'
+
+    Returns:
+        np.ndarray: (n_features,); coefficients are summed in absolute value
+            over the classes
+    """
+    if importance_getter == 'auto':
+        importances = getattr(estimator, 'feature_importances_', None)
+        if importances is None:
+            importances = estimator.coef_
+    else:
+        importances = attrgetter(importance_getter)(estimator)
+    importances = np.abs(np.asarray(importances, dtype=float))
+    return importances.sum(axis=0) if importances.ndim == 2 else importances
+
+
+def _n_drop(step, n_remaining, min_features):
+    """
+    Features eliminated in one round: step features, or a step fraction of
+    the remaining ones (at least one), never going below min_features.
+    """
+    n = int(step * n_remaining) if 0 < step < 1 else int(step)
+    return min(max(n, 1), n_remaining - min_features)
+
+
+# -----------------------
+# Recursive elimination
+# -----------------------
+def _eliminate(estimator, X, y, step, min_features, importance_getter):
+    """
+    Yield (support, fitted model) from all features down to min_features.
+    """
+    support = np.arange(X.shape[1])
+    while True:
+        model = clone(estimator).fit(X[:, support], y)
+        yield support, model
+        if len(support) <= min_features:
+            return
+        importances = feature_importances(model, importance_getter)
+        # Least important first; ties drop the later column
+        order = np.lexsort((-np.arange(len(support)), importances))
+        support = np.sort(support[order[_n_drop(step, len(support), min_features):]])
+
+
+def _fold_path(estimator, X, y, train, test, step, min_features, importance_getter, scoring):
+    """
+    Test scores of one CV fold along the elimination path.
+
+    Returns:
+        list: (n_features, score) per round, most features first
+    """
+    scorer = check_scoring(estimator, scoring)
+    X_test, y_test = X[test], y[test]
+    return [
+        (len(support), scorer(model, X_test[:, support], y_test))
+        for support, model in _eliminate(estimator, X[train], y[train], step, min_features, importance_getter)
+    ]
+
+
+def _rfecv(estimator, X, y, step, min_features, importance_getter, scoring, cv, n_jobs, memory, random_state,
+           timings):
+    folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state).split(np.zeros(len(y)), y)
+    fold_path = Memory(memory, verbose=0).cache(_fold_path)
+
+    start = time.perf_counter()
+    with profiling.record('selection:rfecv_folds', calls=cv):
+        paths = Parallel(n_jobs=n_jobs)(
+            delayed(fold_path)(estimator, X, y, train, test, step, min_features, importance_getter, scoring)
+            for train, test in folds
+        )
+    timings['cv_s'] = time.perf_counter() - start
+
+    scores = pd.DataFrame(
+        [(n, fold, score) for fold, path in enumerate(paths) for n, score in path],
+        columns=['n_features', 'fold', 'score'],
+    ).pivot(index='n_features', columns='fold', values='score')
+    scores = pd.DataFrame({
+        'n_features': scores.index,
+        'mean_score': scores.mean(axis=1).values,
+        'std_score': scores.std(axis=1, ddof=0).values,
+    })
+    # Fewest features among the best mean scores
+    best_n = int(scores.loc[scores['mean_score'] == scores['mean_score'].max(), 'n_features'].min())
+
+    start = time.perf_counter()
+    with profiling.record('selection:rfecv_final'):
+        for support, _ in _eliminate(estimator, X, y, step, best_n, importance_getter):
+            pass
+    timings['final_s'] = time.perf_counter() - start
+    return support, scores.sort_values('n_features', ascending=False).reset_index(drop=True)
+
+
+# -----------------------
+# One-shot selection
+# -----------------------
+def _threshold(importances, threshold):
+    if threshold == 'mean':
+        return importances.mean()
+    if threshold == 'median':
+        return np.median(importances)
+    return float(threshold)
+
+
+def _keep(importances, threshold, min_features):
+    """
+    Columns with a positive importance at or above the threshold, topped up
+    with the next most important ones to reach min_features.
+    """
+    keep = np.flatnonzero((importances > 0) & (importances >= _threshold(importances, threshold)))
+    if len(keep) < min_features:
+        keep = np.sort(np.argsort(-importances, kind='stable')[:min_features])
+    return keep
+
+
+def _permuted_scores(model, X, y, column, scorer, n_repeats, seed):
+    """
+    Scores of `model` with one column of X shuffled, n_repeats times.
+    """
+    rng = np.random.default_rng(seed)
+    sparse = sp.issparse(X)
+    values = X[:, column].toarray().ravel() if sparse else X[:, column].copy()
+    scores = []
+    for _ in range(n_repeats):
+        shuffled = rng.permutation(values)
+        if sparse:
+            X_perm = sp.hstack(
+                [X[:, :column], sp.csc_matrix(shuffled[:, None], dtype=X.dtype), X[:, column + 1:]], format='csr'
+            )
+        else:
+            X_perm = X.copy()
+            X_perm[:, column] = shuffled
+        scores.append(scorer(model, X_perm, y))
+    return scores
+
+
+def permutation_importances(model, X, y, columns=None, n_repeats=5, scoring='accuracy', n_jobs=-1,
+                            random_state=521):
+    """
+    Score lost when each column is shuffled, like
+    sklearn.inspection.permutation_importance but for sparse X too, and only
+    over the given columns (one parallel task per column).
+
+    Returns:
+        pd.DataFrame: column, importance_mean, importance_std
+    """
+    if sp.issparse(X):
+        # Column slicing and stacking are cheap on CSC
+        X = X.tocsc()
+    columns = np.arange(X.shape[1]) if columns is None else np.asarray(columns)
+    scorer = check_scoring(model, scoring)
+    base = scorer(model, X, y)
+
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_permuted_scores)(model, X, y, column, scorer, n_repeats, random_state + int(column))
+        for column in columns
+    )
+    drops = base - np.asarray(scores, dtype=float).reshape(len(columns), n_repeats)
+    return pd.DataFrame({
+        'column': columns,
+        'importance_mean': drops.mean(axis=1),
+        'importance_std': drops.std(axis=1),
+    })
+
+
+def select_features(estimator, X, y, method='rfecv', importance_getter='auto', step=1,
+                    min_features_to_select=1, threshold='mean', n_repeats=5, cv=5, scoring='accuracy',
+                    n_jobs=-1, memory=None, random_state=521):
+    """
+    Choose the columns of X worth keeping for `estimator`.
+
+    Args:
+        estimator: unfitted (e.g. tuned) sklearn estimator
+        X, y: training data (dense or sparse)
+        method (str): one of SELECTION_METHODS
+        importance_getter (str): see feature_importances
+        step (int or float): rfecv features dropped per round; a float in
+            (0, 1) drops that fraction of the remaining features
+        min_features_to_select (int): never keep fewer features
+        threshold: 'importance' cut-off, 'mean', 'median' or a number
+        n_repeats (int): 'permutation' shuffles per feature
+        cv (int): rfecv folds
+        scoring (str): sklearn scorer for rfecv and permutation
+        n_jobs (int): parallel folds / permuted features (-1 = all cores)
+        memory: directory caching the rfecv fold results (None = no cache)
+        random_state (int): seed for folds, holdout and shuffles
+
+    Returns:
+        dict: 'support' (bool mask over the columns of X), 'scores'
+            (DataFrame: rfecv mean / std score per feature count, or the
+            importance per column) and 'timings' (seconds per phase)
+    """
+    if method not in SELECTION_METHODS:
+        raise ValueError(f"Unknown selection method {method!r}, expected one of {SELECTION_METHODS}")
+    min_features = max(1, min(min_features_to_select, X.shape[1]))
+
+    timings = {}
+    start = time.perf_counter()
+    if method == 'rfecv':
+        keep, scores = _rfecv(estimator, X, y, step, min_features, importance_getter, scoring, cv, n_jobs,
+                              memory, random_state, timings)
+    elif method == 'importance':
+        with profiling.record('selection:fit'):
+            model = clone(estimator).fit(X, y)
+        timings['fit_s'] = time.perf_counter() - start
+        importances = feature_importances(model, importance_getter)
+        keep = _keep(importances, threshold, min_features)
+        scores = pd.DataFrame({'column': np.arange(len(importances)), 'importance': importances})
+    else:
+        X_fit, X_val, y_fit, y_val = train_test_split(X, y, test_size=0.2, stratify=y, random_state=random_state)
+        with profiling.record('selection:fit'):
+            model = clone(estimator).fit(X_fit, y_fit)
+        timings['fit_s'] = time.perf_counter() - start
+
+        used = np.flatnonzero(feature_importances(model, importance_getter) > 0)
+        mark = time.perf_counter()
+        with profiling.record('selection:permutation', calls=len(used)):
+            permuted = permutation_importances(model, X_val, y_val, used, n_repeats, scoring, n_jobs, random_state)
+        timings['permutation_s'] = time.perf_counter() - mark
+
+        importances = np.zeros(X.shape[1])
+        # A feature counts when its score drop exceeds its spread over the repeats
+        importances[permuted['column']] = (permuted['importance_mean'] - permuted['importance_std']).clip(lower=0)
+        keep = _keep(importances, 0.0, min_features)
+        scores = permuted
+
+    support = np.zeros(X.shape[1], dtype=bool)
+    support[keep] = True
+    timings['total_s'] = time.perf_counter() - start
+    return {'support': support, 'scores': scores, 'timings': timings}
@@ -0,0 +1,32 @@
+"""
+Sparse matrix helpers shared by the stages
+
+sklearn's trees refuse CSR/CSC input with int64 indices at predict time,
+and DictVectorizer and scipy's stacking emit them. Every feature matrix
+that reaches a model goes through as_csr32 (or hstack_features) first.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def as_csr32(X):
+    """
+    CSR matrix with int32 indices. DictVectorizer emits int64 indices, which
+    sklearn's trees refuse at predict time.
+    """
+    X = X.tocsr()
+    if X.indices.dtype != np.int32 or X.indptr.dtype != np.int32:
+        X = sp.csr_matrix(
+            (X.data, X.indices.astype(np.int32), X.indptr.astype(np.int32)),
+            shape=X.shape,
+        )
+    return X
+
+
+def hstack_features(*blocks):
+    """
+    Column-wise concatenation of CSR blocks (e.g. the hand-crafted features
+    and the hashed n-grams), as CSR with int32 indices.
+    """
+    return as_csr32(sp.hstack(blocks, format="csr", dtype=np.float32))
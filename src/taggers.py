@@ -0,0 +1,388 @@
+"""
+Pluggable POS tagging backends
+
+Every backend tags lists of already tokenized words (one per sentence, see
+DocAnalysis.sentence_words) and returns Penn Treebank tags, so the tag groups the features count (TAG_GROUPS:
+articles, pronouns, prepositions, modals, adjectives, nouns) mean the same
+thing whichever backend produced them:
+
+    nltk        nltk.pos_tag, one sentence at a time (the reference)
+    nltk_sents  nltk.pos_tag_sents over a whole batch of sentences
+    spacy       a trained spaCy pipeline (default en_core_web_sm) over the
+                same words, batched with nlp.pipe
+    cached      the NLTK tagger per sentence, skipped for sentences whose
+                words are all in the perceptron's own tag dictionary and for
+                sentences already seen (LRU cache)
+
+Pick one with set_backend() or L2_POS_TAGGER=<name>. Functions that run in
+worker processes take the backend as an argument (using_backend), so they
+do not rely on the workers inheriting it. Backends other than
+'nltk' trade some agreement for throughput; measure how much with:
+
+    python src/taggers.py --docs 500 --backends nltk_sents cached spacy
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.resources import get_pos_tag_sents, get_pos_tagger, get_spacy_tagger, get_tagdict
+
+DEFAULT_BACKEND = 'nltk'
+
+# Tags counted by the POS features, one entry per feature group
+NOUN_TAGS = {'NN', 'NNS', 'NNP', 'NNPS'}
+TAG_GROUPS = {
+    'article': {'DT'},
+    'pronoun': {'PRP', 'PRP$'},
+    'preposition': {'IN'},
+    'modal': {'MD'},
+    'adjective': {'JJ', 'JJR', 'JJS'},
+    'noun': NOUN_TAGS,
+}
+# Words that make a DT an article
+ARTICLES = {'a', 'an', 'the'}
+
+# spaCy's English tag set is PTB plus a few tags NLTK never emits
+SPACY_TAG_MAP = {
+    'HYPH': ':',
+    'NFP': ':',
+    'ADD': 'NN',
+    'XX': 'FW',
+    'AFX': 'JJ',
+    '_SP': ':',
+}
+
+# Tokens that end a sentence for the cached backend
+_SENTENCE_END = {'.', '!', '?'}
+
+# Max distinct sentences kept by the cached backend (per process)
+SENTENCE_CACHE_SIZE = int(os.environ.get('L2_TAG_CACHE_SIZE', 2 ** 16))
+
+_backend = os.environ.get('L2_POS_TAGGER', DEFAULT_BACKEND)
+
+
+def _check_backend(name):
+    if name not in TAGGERS:
+        raise ValueError(f"Unknown POS tagger {name!r}, expected one of {list(TAGGERS)}")
+
+
+def set_backend(name):
+    """
+    Choose the POS tagging backend for this process (see TAGGERS).
+
+    It is exported as L2_POS_TAGGER as well, so processes spawned from now
+    on start with it too.
+    """
+    global _backend
+    _check_backend(name)
+    _backend = name
+    os.environ['L2_POS_TAGGER'] = name
+
+
+def get_backend():
+    return _backend
+
+
+@contextmanager
+def using_backend(name=None):
+    """
+    Switch this process's backend for the duration of a block (None keeps
+    the current one), e.g. in a worker given the backend of its parent.
+    """
+    global _backend
+    previous = _backend
+    if name is not None:
+        _check_backend(name)
+        _backend = name
+    try:
+        yield
+    finally:
+        _backend = previous
+
+
+def in_group(word, tag, group):
+    """
+    Whether a tagged word counts towards one of TAG_GROUPS.
+    """
+    if group == 'article':
+        return tag == 'DT' and word in ARTICLES
+    return tag in TAG_GROUPS[group]
+
+
+# -----------------------
+# Backends
+# -----------------------
+def tag_nltk(word_lists):
+    """
+    Returns:
+        list: (word, tag) pairs per word list
+    """
+    pos_tag = get_pos_tagger()
+    return [pos_tag(words) if words else [] for words in word_lists]
+
+
+def tag_nltk_sents(word_lists):
+    return get_pos_tag_sents()(word_lists)
+
+
+def tag_spacy(word_lists, model='en_core_web_sm', batch_size=256):
+    """
+    Tag with a trained spaCy pipeline. The words are handed over as they are
+    (no spaCy tokenization), so tags line up with the NLTK words.
+    """
+    from spacy.tokens import Doc
+
+    nlp = get_spacy_tagger(model)
+    docs = (Doc(nlp.vocab, words=words) for words in word_lists)
+    tagged = []
+    for doc in nlp.pipe(docs, batch_size=batch_size):
+        tagged.append([(t.text, SPACY_TAG_MAP.get(t.tag_, t.tag_)) for t in doc])
+    return tagged
+
+
+def split_sentences(words):
+    """
+    Cut a word list after each sentence-final punctuation token.
+    """
+    sentences, current = [], []
+    for word in words:
+        current.append(word)
+        if word in _SENTENCE_END:
+            sentences.append(current)
+            current = []
+    if current:
+        sentences.append(current)
+    return sentences
+
+
+class CachedTagger:
+    """
+    Sentence-level tagger that avoids calling the underlying tagger where
+    it can:
+      - a sentence made only of words in `lexicon` is tagged by lookup
+        (the NLTK perceptron itself tags those words without context, so
+        this gives its exact tags)
+      - any other sentence is tagged once and kept in an LRU cache; Lang-8
+        entries repeat many sentences ("Thank you for reading!")
+
+    Word lists are cut at sentence-final punctuation first, so whole
+    documents can be passed too; their tags can then differ from tagging the
+    document at once around sentence boundaries.
+    """
+
+    def __init__(self, tag_sents, lexicon, cache_size=SENTENCE_CACHE_SIZE):
+        self.tag_sents = tag_sents
+        self.lexicon = lexicon
+        self._tag_sentence = lru_cache(maxsize=cache_size)(self._tag_uncached)
+
+    def _tag_uncached(self, sentence):
+        return tuple(self.tag_sents([list(sentence)])[0])
+
+    def __call__(self, word_lists):
+        tagged = []
+        for words in word_lists:
+            pairs = []
+            for sentence in split_sentences(words):
+                if all(word in self.lexicon for word in sentence):
+                    pairs.extend((word, self.lexicon[word]) for word in sentence)
+                else:
+                    pairs.extend(self._tag_sentence(tuple(sentence)))
+            tagged.append(pairs)
+        return tagged
+
+    def cache_info(self):
+        return self._tag_sentence.cache_info()
+
+
+@lru_cache(maxsize=None)
+def get_cached_tagger():
+    """
+    CachedTagger over NLTK's tagger and the perceptron's tag dictionary,
+    built once per process.
+    """
+    return CachedTagger(get_pos_tag_sents(), get_tagdict())
+
+
+def tag_cached(word_lists):
+    return get_cached_tagger()(word_lists)
+
+
+# name -> function(list of word lists) -> list of (word, tag) lists
+TAGGERS = {
+    'nltk': tag_nltk,
+    'nltk_sents': tag_nltk_sents,
+    'spacy': tag_spacy,
+    'cached': tag_cached,
+}
+
+
+def tag_batch(word_lists, backend=None):
+    """
+    POS-tag several word lists with the chosen (default: current) backend.
+
+    Returns:
+        list: (word, tag) pairs per word list, in input order
+    """
+    return TAGGERS[backend or _backend](word_lists)
+
+
+def tag_parallel(word_lists, n_jobs=-1, chunk_size=256, backend=None):
+    """
+    tag_batch over a process pool, chunk_size word lists (sentences) per task.
+    Meant for a few long documents, where document-level parallelism does
+    not help.
+
+    Returns:
+        list: (word, tag) pairs per word list, in input order
+    """
+    if n_jobs is None or n_jobs < 0:
+        n_workers = os.cpu_count() or 1
+    else:
+        n_workers = max(1, n_jobs)
+    chunks = [word_lists[i:i + chunk_size] for i in range(0, len(word_lists), chunk_size)]
+    if n_workers == 1 or len(chunks) <= 1:
+        return tag_batch(word_lists, backend)
+
+    tagged = []
+    # The backend is passed explicitly: workers may not share this process' setting
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(chunks))) as pool:
+        for chunk_tags in pool.map(partial(tag_batch, backend=backend or _backend), chunks):
+            tagged.extend(chunk_tags)
+    return tagged
+
+
+# -----------------------
+# Agreement report
+# -----------------------
+def _group_counts(tagged):
+    tagged = list(tagged)
+    return {group: sum(1 for word, tag in tagged if in_group(word, tag, group)) for group in TAG_GROUPS}
+
+
+def agreement_report(documents, backends, reference=DEFAULT_BACKEND):
+    """
+    Compare backends with a reference backend on the same tokenized documents.
+
+    Args:
+        documents (list): per document, its word lists (one per sentence,
+            e.g. DocAnalysis.sentence_words)
+        backends (list): keys of TAGGERS to compare
+        reference (str): backend the others are compared with
+
+    Per backend:
+        - docs_per_sec: tagging throughput (all sentences in one tag_batch call)
+        - token_agreement: share of tokens given the reference tag
+        - <group>_agreement: share of tokens on which both agree whether the
+          token is in the group (what the features actually count)
+        - max_ratio_diff / mean_ratio_diff: absolute difference of the
+          per-document group ratios (count / words), as used by the features
+
+    Returns:
+        list: one row dict per backend (the reference included); a backend
+            that cannot be loaded gets {'backend', 'skipped'}
+    """
+    sentences = [words for sentence_words in documents for words in sentence_words]
+    n_tokens = sum(len(words) for words in sentences)
+
+    rows, reference_tags = [], None
+    for backend in [reference] + [b for b in backends if b != reference]:
+        try:
+            start = time.perf_counter()
+            tagged = tag_batch(sentences, backend)
+            elapsed = time.perf_counter() - start
+        except LookupError as exc:
+            rows.append({'backend': backend, 'skipped': str(exc).strip().splitlines()[0]})
+            continue
+        if reference_tags is None:
+            if backend != reference:
+                raise LookupError(f"Reference tagger {reference!r} is not available")
+            reference_tags = tagged
+
+        pairs = [
+            (word, ref_tag, tag)
+            for ref, got in zip(reference_tags, tagged) for (word, ref_tag), (_, tag) in zip(ref, got)
+        ]
+        row = {
+            'backend': backend,
+            'docs': len(documents),
+            'tokens': n_tokens,
+            'docs_per_sec': len(documents) / elapsed if elapsed > 0 else float('inf'),
+            'token_agreement': sum(a == b for _, a, b in pairs) / n_tokens if n_tokens else 1.0,
+        }
+        for group in TAG_GROUPS:
+            agree = sum(in_group(w, a, group) == in_group(w, b, group) for w, a, b in pairs)
+            row[f'{group}_agreement'] = agree / n_tokens if n_tokens else 1.0
+
+        diffs, position = [], 0
+        for sentence_words in documents:
+            end = position + len(sentence_words)
+            n_words = sum(len(words) for words in sentence_words)
+            if n_words:
+                ref_counts = _group_counts(p for s in reference_tags[position:end] for p in s)
+                counts = _group_counts(p for s in tagged[position:end] for p in s)
+                diffs.extend(abs(ref_counts[g] - counts[g]) / n_words for g in TAG_GROUPS)
+            position = end
+        row['max_ratio_diff'] = max(diffs, default=0.0)
+        row['mean_ratio_diff'] = sum(diffs) / len(diffs) if diffs else 0.0
+        rows.append(row)
+
+    return rows
+
+
+def print_agreement(rows):
+    print(f"{'backend':<12}{'docs/sec':>10}{'tokens':>10}{'agree':>8}"
+          + ''.join(f"{group[:6]:>8}" for group in TAG_GROUPS) + f"{'max diff':>10}")
+    for row in rows:
+        if 'skipped' in row:
+            print(f"{row['backend']:<12}  skipped: {row['skipped']}")
+            continue
+        print(f"{row['backend']:<12}{row['docs_per_sec']:>10.1f}{row['tokens']:>10}{row['token_agreement']:>8.3f}"
+              + ''.join(f"{row[f'{group}_agreement']:>8.3f}" for group in TAG_GROUPS)
+              + f"{row['max_ratio_diff']:>10.4f}")
+
+
+def parse_args():
+    project_root = Path(__file__).resolve().parent.parent
+    corpus_path = project_root / "data" / "processed" / "lang-8.corpus"
+
+    parser = argparse.ArgumentParser(description="POS tagger agreement with the NLTK reference")
+    parser.add_argument("--source", type=Path,
+                        default=corpus_path if corpus_path.exists() else project_root / "data" / "raw" / "lang-8.zip",
+                        help="lang-8.zip or a corpus file (default: the corpus if it exists)")
+    parser.add_argument("--docs", type=int, default=500, help="Documents to tag")
+    parser.add_argument("--backends", nargs="+", choices=list(TAGGERS),
+                        default=[b for b in TAGGERS if b != DEFAULT_BACKEND])
+    parser.add_argument("--reference", choices=list(TAGGERS), default=DEFAULT_BACKEND)
+    parser.add_argument("--out", type=Path, help="Also write the rows to this CSV file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    import csv
+    from itertools import islice
+
+    from src.corpus import iter_documents
+    from src.part_2_analysis import DocAnalysis
+
+    args = parse_args()
+    documents = islice(iter_documents(args.source, parser="fast"), args.docs)
+    sentence_words = [DocAnalysis(text).sentence_words for _, text, _ in documents if text]
+
+    rows = agreement_report(sentence_words, args.backends, reference=args.reference)
+    print_agreement(rows)
+
+    if args.out is not None:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+        with open(args.out, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Wrote {args.out}")
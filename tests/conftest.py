@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+
+@pytest.fixture
+def toy_data():
+    """
+    Factory for a toy classification set where only features 0 and 1 carry
+    signal (label 1 when their sum, plus optional noise, is above 1):
+
+        X_train, y_train = toy_data(0, n_features=5, sparse=True)
+        X_dev, y_dev = toy_data(1, n_features=5, sparse=True)
+
+    Args (of the factory):
+        seed (int): random seed, e.g. 0 for train and 1 for dev
+        n (int): rows
+        n_features (int): columns, float32 in [0, 1)
+        sparse (bool): CSR instead of a dense array
+        labels (sequence): class for label 0 and label 1
+        noise (float): std of gaussian noise added to the signal
+
+    Returns:
+        (X, y)
+    """
+    def make(seed=0, n=300, n_features=4, sparse=False, labels=np.array([0, 1], dtype=np.int8), noise=0.0):
+        rng = np.random.default_rng(seed)
+        X = rng.random((n, n_features)).astype(np.float32)
+        signal = X[:, 0] + X[:, 1]
+        if noise:
+            signal = signal + rng.normal(0, noise, n)
+        y = np.asarray(labels)[(signal > 1.0).astype(np.intp)]
+        return (sp.csr_matrix(X) if sparse else X), y
+
+    return make
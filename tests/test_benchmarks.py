@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+# Make sure `src` / `benchmarks` are importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.run_benchmarks import compare, run_benchmarks
+from benchmarks.synthetic import L1S, make_documents
+from src.part_1 import parse_html
+
+
+def test_synthetic_documents_deterministic_and_parseable():
+    docs = make_documents(5, "small", seed=1)
+
+    assert docs == make_documents(5, "small", seed=1)
+    assert docs != make_documents(5, "small", seed=2)
+    for filename, html in docs:
+        l1, text, _ = parse_html(html, filename)
+        assert l1 in L1S
+        # Roughly the requested size, and no text from outside the entry
+        assert len(text.split()) >= 50
+        assert "Corrections" not in text
+
+    print("test_synthetic_documents_deterministic_and_parseable pass")
+
+
+def test_run_benchmarks_reports_rates_and_percentiles():
+    results = run_benchmarks(["parse_html_fast"], ["small"], n_docs=10)
+    row = results["parse_html_fast"]["small"]
+
+    assert row["calls"] == 10
+    assert row["docs_per_sec"] > 0
+    assert row["p50_ms"] <= row["p90_ms"] <= row["p99_ms"]
+    assert row["peak_mem_kib"] > 0
+
+    print("test_run_benchmarks_reports_rates_and_percentiles pass")
+
+
+def test_compare_flags_regressions():
+    baseline = {
+        "a": {"small": {"docs_per_sec": 100.0}},
+        "b": {"small": {"docs_per_sec": 100.0}},
+        "c": {"small": {"skipped": "missing data"}},
+    }
+    results = {
+        "a": {"small": {"docs_per_sec": 85.0}},
+        "b": {"small": {"docs_per_sec": 70.0}},
+        "c": {"small": {"docs_per_sec": 50.0}},
+        "d": {"small": {"docs_per_sec": 50.0}},
+    }
+    rows = compare(results, baseline, tolerance=0.2)
+
+    # Skipped / new benchmarks are not compared
+    assert [(name, regressed) for name, _, _, _, _, regressed in rows] == [("a", False), ("b", True)]
+
+    print("test_compare_flags_regressions pass")
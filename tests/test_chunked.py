@@ -0,0 +1,155 @@
+import sys
+import zipfile
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction import DictVectorizer
+
+from src import chunked
+from src.chunked import (FEATURE_NAMES, SchemaVectorizer, _imap_batches, iter_feature_blocks,
+                         load_feature_blocks, stack_feature_blocks, write_feature_blocks)
+from src.labels import LabelMapper
+from src.ngrams import NgramHasher
+
+PAGES = {
+    "lang-8/1.html": "<li class='speaking'>French</li><div id='body_show_ori'>One.</div>",
+    "lang-8/2.html": "<li class='speaking'>Russian</li><div id='body_show_ori'>Two.</div>",
+    "lang-8/3.html": "<li class='speaking'>Japanese</li><div id='body_show_ori'>Three.</div>",
+    "lang-8/4.html": "<li class='speaking'>Spanish</li><div id='body_show_ori'>Four.</div>",
+    "lang-8/5.html": "<li class='speaking'>Korean</li><div id='body_show_ori'>Five.</div>",
+}
+
+
+def fake_featurize_items(items, parser, cache_path, label_fn, with_text, pos_tagger):
+    # Stands in for the NLTK / spaCy extractors: one feature, the text length
+    results = []
+    for member, split, raw in items:
+        l1, text, _ = chunked._parse_member(raw, member, parser)
+        label = label_fn(l1)
+        if label is not None:
+            features = {"mean_word_len": len(text), "unknown": 1}
+            results.append((member, split, label, features, text if with_text else None))
+    return results
+
+
+@pytest.fixture
+def zip_path(tmp_path):
+    path = tmp_path / "lang-8.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        for member, html in PAGES.items():
+            zf.writestr(member, html)
+    return path
+
+
+def test_schema_vectorizer_matches_dict_vectorizer():
+    rows = [
+        {name: float(i + j) for j, name in enumerate(FEATURE_NAMES)} for i in range(3)
+    ]
+    rows[1]["asian_top_word_match"] = True
+    rows[2]["Religious_Feature"] = False
+    expected = DictVectorizer(dtype=np.float32).fit(rows)
+
+    vec = SchemaVectorizer()
+    X = vec.fit_transform(rows)
+    assert vec.feature_names_ == expected.feature_names_
+    assert X.dtype == np.float32 and X.indices.dtype == np.int32
+    assert np.array_equal(X.toarray(), expected.transform(rows).toarray())
+
+    # Missing keys are 0, keys outside the schema are ignored
+    X = SchemaVectorizer(["a", "b"]).transform([{"b": 2, "c": 5}])
+    assert X.toarray().tolist() == [[0.0, 2.0]]
+
+    print("test_schema_vectorizer_matches_dict_vectorizer pass")
+
+
+def test_blocks_per_split(zip_path, monkeypatch):
+    monkeypatch.setattr(chunked, "featurize_items", fake_featurize_items)
+    split_sets = {"train": {"1.html", "2.html", "3.html", "4.html"}, "dev": {"5.html"}, "test": set()}
+
+    blocks = list(iter_feature_blocks(zip_path, split_sets, block_size=2, batch_size=2))
+    # Russian has no binary label
+    assert [(b.split, list(b.members)) for b in blocks] == [
+        ("train", ["lang-8/1.html", "lang-8/3.html"]),
+        ("train", ["lang-8/4.html"]),
+        ("dev", ["lang-8/5.html"]),
+    ]
+    assert list(blocks[0].y) == ["European", "Asian"]
+    assert blocks[0].X.shape == (2, len(FEATURE_NAMES))
+
+    # Every L1, no split files
+    blocks = list(iter_feature_blocks(zip_path, None, block_size=10, label_fn=LabelMapper("l1")))
+    assert len(blocks) == 1 and blocks[0].split == "all"
+    assert list(blocks[0].y) == ["French", "Russian", "Japanese", "Spanish", "Korean"]
+
+    print("test_blocks_per_split pass")
+
+
+def test_write_and_load_blocks(zip_path, monkeypatch, tmp_path):
+    monkeypatch.setattr(chunked, "featurize_items", fake_featurize_items)
+    split_sets = {"train": {"1.html", "3.html", "4.html"}, "dev": {"5.html"}, "test": set()}
+    blocks = list(iter_feature_blocks(zip_path, split_sets, block_size=2))
+
+    manifest = write_feature_blocks(blocks, tmp_path / "blocks")
+    assert manifest["feature_names"] == FEATURE_NAMES
+    assert manifest["splits"]["train"]["documents"] == 3
+    assert len(manifest["splits"]["train"]["blocks"]) == 2
+
+    loaded = list(load_feature_blocks(tmp_path / "blocks", "train"))
+    assert [list(b.members) for b in loaded] == [list(b.members) for b in blocks[:2]]
+    X, y = stack_feature_blocks(tmp_path / "blocks", "train")
+    assert X.shape == (3, len(FEATURE_NAMES)) and X.indices.dtype == np.int32
+    assert list(y) == ["European", "Asian", "European"]
+
+    X, y = stack_feature_blocks(tmp_path / "blocks", "test")
+    assert X.shape == (0, len(FEATURE_NAMES)) and len(y) == 0
+
+    print("test_write_and_load_blocks pass")
+
+
+def test_blocks_with_ngrams(zip_path, monkeypatch, tmp_path):
+    monkeypatch.setattr(chunked, "featurize_items", fake_featurize_items)
+    split_sets = {"train": {"1.html", "3.html", "4.html"}, "dev": set(), "test": set()}
+    hasher = NgramHasher(n_features=64)
+    blocks = list(iter_feature_blocks(zip_path, split_sets, block_size=2, ngrams=hasher))
+
+    n_features = len(FEATURE_NAMES) + 2 * 64
+    assert [b.X.shape for b in blocks] == [(2, n_features), (1, n_features)]
+    assert blocks[0].X.indices.dtype == np.int32
+    # Hand-crafted columns first, then the hashed n-grams of the same texts
+    plain = list(iter_feature_blocks(zip_path, split_sets, block_size=2))
+    assert np.array_equal(blocks[0].X[:, :len(FEATURE_NAMES)].toarray(), plain[0].X.toarray())
+    assert np.allclose(blocks[0].X[:, len(FEATURE_NAMES):].toarray(), hasher.transform(["One.", "Three."]).toarray())
+
+    manifest = write_feature_blocks(blocks, tmp_path / "blocks", ngrams=hasher)
+    assert manifest["n_features"] == n_features and manifest["ngrams"]["n_features"] == 64
+    X, _ = stack_feature_blocks(tmp_path / "blocks", "train")
+    assert X.shape == (3, n_features)
+    X, _ = stack_feature_blocks(tmp_path / "blocks", "dev")
+    assert X.shape == (0, n_features)
+
+    print("test_blocks_with_ngrams pass")
+
+
+def _double(batch):
+    return [2 * x for x in batch]
+
+
+def test_imap_batches_is_lazy_and_ordered():
+    pulled = []
+
+    def batches():
+        for i in range(100):
+            pulled.append(i)
+            yield [i]
+
+    results = _imap_batches(_double, batches(), 2)
+    assert next(results) == [0]
+    # At most two batches per worker are pulled ahead
+    assert len(pulled) <= 5
+    assert [r[0] for r in results] == [2 * i for i in range(1, 100)]
+
+    print("test_imap_batches_is_lazy_and_ordered pass")
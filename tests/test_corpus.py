@@ -0,0 +1,84 @@
+import sys
+import zipfile
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.corpus import Corpus, convert_zip, is_corpus, iter_documents
+from src.feature_store import content_hash
+
+PAGES = {
+    "lang-8/1.html": "<li class='speaking'>French</li><div id='body_show_ori'>Bonjour à tous.</div>",
+    "lang-8/2.html": "<li class='speaking'>Russian</li><div id='body_show_ori'>Hello.</div>",
+    "lang-8/3.html": "<div id='body_show_ori'>No profile.</div>",
+    "lang-8/4.html": "<li class='speaking'>Japanese</li><div id='body_show_ori'>今日は</div>",
+}
+
+
+@pytest.fixture
+def corpus_path(tmp_path):
+    zip_path = tmp_path / "lang-8.zip"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for member, html in PAGES.items():
+            zf.writestr(member, html)
+    out = tmp_path / "lang-8.corpus"
+    assert convert_zip(zip_path, out) == len(PAGES)
+    return out
+
+
+def test_roundtrip_in_zip_order(corpus_path):
+    with Corpus(corpus_path) as corpus:
+        records = list(corpus)
+
+    assert [r["member"] for r in records] == list(PAGES)
+    assert records[0] == {
+        "member": "lang-8/1.html",
+        "l1": "French",
+        "label": "European",
+        "text": "Bonjour à tous.",
+        "content_hash": content_hash(PAGES["lang-8/1.html"].encode("utf-8"), "fast"),
+    }
+    # Missing L1 / unlabelled L1 are stored as None
+    assert records[1]["label"] is None
+    assert records[2]["l1"] is None and records[2]["label"] is None
+
+    print("test_roundtrip_in_zip_order pass")
+
+
+def test_random_access_and_allow_list(corpus_path):
+    with Corpus(corpus_path) as corpus:
+        assert len(corpus) == len(PAGES)
+        # By member name or by bare filename, as in the split files
+        assert corpus["lang-8/4.html"]["text"] == "今日は"
+        assert corpus["4.html"]["l1"] == "Japanese"
+        assert "5.html" not in corpus
+        with pytest.raises(KeyError):
+            corpus["5.html"]
+
+        members = [r["member"] for r in corpus.records(allow=["3.html", "lang-8/1.html"])]
+        assert members == ["lang-8/1.html", "lang-8/3.html"]
+
+    print("test_random_access_and_allow_list pass")
+
+
+def test_magic_dispatch(corpus_path, tmp_path):
+    assert is_corpus(corpus_path)
+    assert not is_corpus(tmp_path / "lang-8.zip")
+    assert not is_corpus(tmp_path / "missing.corpus")
+
+    # Same documents whichever source is read
+    assert list(iter_documents(corpus_path)) == list(iter_documents(tmp_path / "lang-8.zip"))
+
+    print("test_magic_dispatch pass")
+
+
+def test_truncated_file_rejected(corpus_path, tmp_path):
+    truncated = tmp_path / "truncated.corpus"
+    truncated.write_bytes(corpus_path.read_bytes()[:-4])
+    with pytest.raises(ValueError):
+        Corpus(truncated)
+
+    print("test_truncated_file_rejected pass")
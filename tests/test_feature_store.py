@@ -0,0 +1,120 @@
+import sqlite3
+import sys
+import zipfile
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import part_2_analysis, taggers
+from src.build_dataset import build_dataset
+from src.feature_store import FeatureStore, content_hash
+from src.part_2_stats import lemmatize
+
+
+def test_features_roundtrip(tmp_path):
+    feats = {"article_ratio": 0.125, "Religious_Feature": True, "avg_sent_len_tokens": 10}
+    h = content_hash(b"<html></html>")
+
+    with FeatureStore(tmp_path / "cache.sqlite") as store:
+        store.put_features("a.html", h, "pos", "1", feats)
+
+    # Values come back unchanged in a fresh connection
+    with FeatureStore(tmp_path / "cache.sqlite") as store:
+        assert store.get_features("a.html", h, "pos", "1") == feats
+
+    print("test_features_roundtrip pass")
+
+
+def test_features_invalidated_by_version_and_content(tmp_path):
+    h = content_hash(b"old")
+
+    with FeatureStore(tmp_path / "cache.sqlite") as store:
+        store.put_features("a.html", h, "pos", "1", {"x": 1.0})
+
+        assert store.get_features("a.html", h, "pos", "2") is None
+        assert store.get_features("a.html", content_hash(b"new"), "pos", "1") is None
+        assert store.get_features("a.html", h, "lexicon", "1") is None
+
+        # Text extracted by another HTML parser is another key
+        store.put_l1("a.html", content_hash(b"old", "bs4"), "French")
+        assert store.get_l1("a.html", content_hash(b"old", "fast")) == (False, None)
+        assert store.get_l1("a.html", h) == (False, None)
+
+    print("test_features_invalidated_by_version_and_content pass")
+
+
+def test_l1_missing_vs_cached_none(tmp_path):
+    h = content_hash(b"doc")
+
+    with FeatureStore(tmp_path / "cache.sqlite") as store:
+        assert store.get_l1("a.html", h) == (False, None)
+
+        # A document without an L1 is still a cache hit
+        store.put_l1("a.html", h, None)
+        assert store.get_l1("a.html", h) == (True, None)
+
+        store.put_l1("b.html", h, "Korean")
+        assert store.get_l1("b.html", h) == (True, "Korean")
+
+    print("test_l1_missing_vs_cached_none pass")
+
+
+def test_pending_writes_do_not_block_other_writers(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    h = content_hash(b"doc")
+
+    with FeatureStore(path) as slow, FeatureStore(path, timeout=0.1) as fast:
+        # A worker in the middle of a batch: rows buffered, not yet committed
+        slow.put_l1("a.html", h, "Korean")
+        slow.put_features("a.html", h, "pos", "1", {"x": 1.0})
+        assert slow.get_features("a.html", h, "pos", "1") == {"x": 1.0}
+
+        # Another worker can still commit its batch right away
+        fast.put_l1("b.html", h, "French")
+        fast.commit()
+        assert slow.get_l1("b.html", h) == (True, "French")
+        assert fast.get_l1("a.html", h) == (False, None)
+
+        slow.commit()
+        assert fast.get_l1("a.html", h) == (True, "Korean")
+
+    print("test_pending_writes_do_not_block_other_writers pass")
+
+
+def test_cached_parallel_build_matches_serial(tmp_path, monkeypatch):
+    class FakeLemmatizer:
+        def lemmatize(self, token):
+            return token
+
+    def fake_tag_batch(word_lists, backend=None):
+        return [[(w, "DT" if w in ("the", "a") else "NN") for w in words] for words in word_lists]
+
+    # No NLTK data needed; forked workers inherit the patches
+    monkeypatch.setattr(part_2_analysis, "get_lemmatizer", lambda: FakeLemmatizer())
+    monkeypatch.setattr(taggers, "tag_batch", fake_tag_batch)
+    lemmatize.cache_clear()
+
+    zip_path = tmp_path / "lang-8.zip"
+    splits = {"train": [], "dev": [], "test": []}
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for i in range(24):
+            l1 = ["French", "Japanese", "Korean", "Spanish"][i % 4]
+            zf.writestr(f"lang-8/{i}.html", f"<li class='speaking'>{l1}</li>"
+                                            f"<div id='body_show_ori'>The cat {i} sat. A dog ran far.</div>")
+            splits[["train", "train", "dev", "test"][i % 4]].append(f"{i}.html")
+    for split, names in splits.items():
+        (tmp_path / f"{split}.txt").write_text("\n".join(names))
+    split_paths = [tmp_path / f"{split}.txt" for split in ("train", "dev", "test")]
+
+    serial = build_dataset(zip_path, *split_paths, n_jobs=1, batch_size=4)
+    cache = tmp_path / "cache.sqlite"
+    # Cold cache written by two workers at once, then a warm rerun
+    cold = build_dataset(zip_path, *split_paths, n_jobs=2, cache_path=cache, batch_size=4)
+    warm = build_dataset(zip_path, *split_paths, n_jobs=2, cache_path=cache, batch_size=4)
+    assert cold == serial and warm == serial
+
+    with sqlite3.connect(cache) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 24
+
+    print("test_cached_parallel_build_matches_serial pass")
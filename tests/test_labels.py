@@ -0,0 +1,68 @@
+import pickle
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from src.build_dataset import create_label
+from src.labels import (LabelMapper, balanced_subsample, class_counts, decode_labels, encode_labels,
+                        load_families, one_hot, stratified_sample)
+
+
+def test_label_schemes():
+    binary = LabelMapper("binary")
+    for l1 in ["French", "Spanish", "Mandarin", "Japanese", "Korean", "Russian", "", None]:
+        assert binary(l1) == create_label(l1)
+
+    family = LabelMapper("family", exclude=["Russian"])
+    assert family("Spanish") == "Romance" and family("Korean") == load_families()["Korean"]
+    assert family("Russian") is None
+    assert family("Klingon") is None
+    assert LabelMapper("family", other="Other")("Klingon") == "Other"
+
+    l1 = pickle.loads(pickle.dumps(LabelMapper("l1", exclude=["Russian"])))
+    assert l1("Tagalog") == "Tagalog" and l1("Russian") is None and l1("") is None
+
+    with pytest.raises(ValueError):
+        LabelMapper("continent")
+
+    print("test_label_schemes pass")
+
+
+def test_encode_and_decode_labels():
+    classes, (train, dev) = encode_labels(["b", "a", "b"], ["a", "c"])
+    assert list(classes) == ["a", "b", "c"]
+    assert train.dtype == np.int8 and train.tolist() == [1, 0, 1] and dev.tolist() == [0, 2]
+    assert list(decode_labels(dev, classes)) == ["a", "c"]
+    assert decode_labels([0, 1], None).tolist() == [0, 1]
+
+    # Unknown labels get -1; more than 127 classes need int16
+    _, (codes,) = encode_labels(["a", "z"], classes=["a", "b"])
+    assert codes.tolist() == [0, -1]
+    _, (codes,) = encode_labels([f"l1_{i}" for i in range(300)])
+    assert codes.dtype == np.int16
+
+    assert one_hot([1, 0, 2], 3).toarray().tolist() == [[0, 1, 0], [1, 0, 0], [0, 0, 1]]
+
+    print("test_encode_and_decode_labels pass")
+
+
+def test_class_aware_sampling():
+    y = np.array([0] * 80 + [1] * 15 + [2] * 5)
+
+    index = stratified_sample(y, 0.2)
+    assert class_counts(y[index]) == {0: 16, 1: 3, 2: 1}
+    assert np.all(np.diff(index) > 0)
+    assert np.array_equal(index, stratified_sample(y, 0.2))
+
+    index = balanced_subsample(y, 10)
+    assert class_counts(y[index]) == {0: 10, 1: 10, 2: 5}
+
+    with pytest.raises(ValueError):
+        stratified_sample(y, 0)
+
+    print("test_class_aware_sampling pass")
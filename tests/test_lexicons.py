@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import part_2_analysis, taggers
+from src.lexicons import LexiconMatcher, load_lexicons
+from src.part_2_lexicon_pos import European_words, extract_lexicon_features
+
+
+def test_load_lexicons_normalizes(tmp_path):
+    (tmp_path / "places.txt").write_text("# comment\nParis\n\n  New   York  # inline comment\nTOKYO\n")
+    (tmp_path / "notes.md").write_text("not a lexicon")
+
+    assert load_lexicons(tmp_path) == {"places": frozenset({"paris", "new york", "tokyo"})}
+
+    print("test_load_lexicons_normalizes pass")
+
+
+def test_shipped_european_lexicon_matches_lowercased_text():
+    # The old in-code set was capitalized and could never match lowercased text
+    assert "paris" in European_words
+    matcher = LexiconMatcher({"european": European_words})
+    assert matcher.counts("i moved from PARIS to madrid.") == {"european": 2}
+
+    print("test_shipped_european_lexicon_matches_lowercased_text pass")
+
+
+def test_matcher_counts_and_booleans():
+    matcher = LexiconMatcher({
+        "asia": {"japan", "tokyo"},
+        "religion": {"god", "holy spirit"},
+        "cities": {"tokyo"},
+    })
+    text = "Tokyo's temples! I love JAPAN, japanese food and the Holy\nSpirit. godzilla, (God)"
+
+    assert matcher.counts(text) == {"asia": 2, "religion": 2, "cities": 1}
+    assert matcher.term_counts(text)["asia"] == {"tokyo": 1, "japan": 1}
+    assert matcher.features("nothing here") == {
+        "asia_count": 0, "asia_match": False,
+        "religion_count": 0, "religion_match": False,
+        "cities_count": 0, "cities_match": False,
+    }
+    assert LexiconMatcher({}).counts("anything") == {}
+
+    print("test_matcher_counts_and_booleans pass")
+
+
+def test_lexicon_features_skip_pos_tagger(monkeypatch):
+    def no_tagger(*args):
+        raise AssertionError("POS tagger should not be needed")
+
+    monkeypatch.setattr(taggers, "tag_batch", no_tagger)
+    monkeypatch.setattr(part_2_analysis, "get_word_tokenizer", no_tagger)
+
+    feats = extract_lexicon_features("We went to church in Tokyo.")
+    assert feats == {"asian_top_word_match": False, "Religious_Feature": True}
+    assert extract_lexicon_features("") == {"asian_top_word_match": False, "Religious_Feature": False}
+
+    print("test_lexicon_features_skip_pos_tagger pass")
@@ -0,0 +1,107 @@
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+from sklearn.feature_selection import RFECV
+
+from src.ablation import run_ablation
+from src.models import (COMPARISON_COLUMNS, MODELS, check_ngram_input, compare_models, default_comparison,
+                        get_spec, make_model, search_space)
+from src.search import run_search
+
+
+@pytest.mark.parametrize("name", list(MODELS))
+def test_models_fit_sparse_and_rank_features(name, toy_data):
+    X_train, y_train = toy_data(0, n=200, n_features=5, sparse=True)
+    X_dev, y_dev = toy_data(1, n=200, n_features=5, sparse=True)
+
+    model = make_model(name, stage="ablation").fit(X_train, y_train)
+    assert model.score(X_dev, y_dev) > 0.75
+    assert model.predict_proba(X_dev[:3]).shape == (3, 2)
+
+    rfecv = RFECV(make_model(name, stage="ablation"), cv=3, importance_getter=get_spec(name).importance_getter)
+    rfecv.fit(X_train, y_train)
+    assert rfecv.support_[:2].all()
+
+    print(f"test_models_fit_sparse_and_rank_features[{name}] pass")
+
+
+def test_hist_gb_gain_importances(toy_data):
+    X_train, y_train = toy_data(0, n=200, n_features=5, sparse=True)
+    model = make_model("hist_gb").set_params(max_iter=20).fit(X_train, y_train)
+
+    importances = model.feature_importances_
+    assert importances.shape == (5,) and importances.sum() == pytest.approx(1.0)
+    assert set(np.argsort(importances)[-2:]) == {0, 1}
+
+    print("test_hist_gb_gain_importances pass")
+
+
+def test_search_and_ablation_take_any_model(toy_data):
+    X_train, y_train = toy_data(0, n=200, n_features=5, sparse=True)
+    X_dev, y_dev = toy_data(1, n=200, n_features=5, sparse=True)
+
+    best, results = run_search(make_model("linear"), X_train, y_train, mode="grid",
+                               param_space=search_space("linear", "grid"), n_iter=3, cv=3, n_jobs=1,
+                               verbose=False)
+    assert len(results) == 3 and "model__C" in results["params"][0]
+    assert best.named_steps["model"].C in (0.01, 0.1, 1.0)
+    assert search_space("hist_gb", "random") is MODELS["hist_gb"].search_distributions
+
+    table = run_ablation(X_train, y_train, X_dev, y_dev, list("abcde"),
+                         estimator=make_model("random_forest", stage="ablation"), n_jobs=1)
+    assert table.iloc[-1]["name"] in ("a", "b")
+
+    with pytest.raises(ValueError):
+        make_model("svm")
+
+    print("test_search_and_ablation_take_any_model pass")
+
+
+def test_compare_models_table(toy_data):
+    X_train, y_train = toy_data(0, n=200, n_features=5, sparse=True)
+    X_dev, y_dev = toy_data(1, n=200, n_features=5, sparse=True)
+
+    table = compare_models(["tree", "linear"], X_train, y_train, X_dev, y_dev, n_jobs=1)
+    assert list(table.columns) == list(COMPARISON_COLUMNS)
+    assert sorted(table["model"]) == ["linear", "tree"]
+    assert list(table["dev_score"]) == sorted(table["dev_score"], reverse=True)
+    assert (table["fit_s"] > 0).all() and (table["dev_score_per_cpu_s"] > 0).all()
+
+    print("test_compare_models_table pass")
+
+
+def test_dense_models_are_kept_away_from_ngrams(tmp_path, toy_data):
+    from src import part_3, part_5
+    from src.pipeline import PipelineConfig
+
+    assert default_comparison() == list(MODELS)
+    assert "hist_gb" not in default_comparison(262144)
+    check_ngram_input("hist_gb", 0)
+    check_ngram_input("linear", 262144)
+    with pytest.raises(ValueError, match="hist_gb"):
+        check_ngram_input("hist_gb", 262144)
+
+    # Refused before anything is fitted, whatever the stage
+    config = PipelineConfig(root=tmp_path, ngram_features=262144, model="hist_gb")
+    for stage, inputs in [(part_3.baseline, ({},)), (part_3.ablation, ({},)),
+                          (part_5.tune, ({},)), (part_5.select, ({}, {}))]:
+        with pytest.raises(ValueError, match="densifies"):
+            stage(config, *inputs)
+    config = PipelineConfig(root=tmp_path, ngram_features=262144, compare_models=("tree", "hist_gb"))
+    with pytest.raises(ValueError, match="densifies"):
+        part_3.compare(config, {})
+
+    # The default comparison runs without it
+    X_train, y_train = toy_data(0, n=200, n_features=5, sparse=True)
+    X_dev, y_dev = toy_data(1, n=200, n_features=5, sparse=True)
+    config = PipelineConfig(root=tmp_path, ngram_features=4, n_jobs=1)
+    table = part_3.compare(config, {"X_train_array": X_train, "y_train": y_train,
+                                    "X_dev_array": X_dev, "y_dev": y_dev})["comparison"]
+    assert sorted(table["model"]) == sorted(default_comparison(4))
+
+    print("test_dense_models_are_kept_away_from_ngrams pass")
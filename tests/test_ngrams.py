@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pickle
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from src.ngrams import FeatureNames, NgramHasher, iter_ngram_blocks
+from src.sparse import hstack_features
+
+TEXTS = [
+    "I goed to school yesterday.",
+    "Yesterday I went to the school with my friend.",
+    "I goed to school yesterday.",
+]
+
+
+def test_hasher_shape_and_determinism():
+    hasher = NgramHasher(n_features=256)
+    X = hasher.transform(TEXTS)
+
+    assert X.shape == (3, 512) and X.dtype == np.float32
+    assert np.array_equal(X[0].toarray(), X[2].toarray())
+    # Stateless: a fresh hasher (e.g. in another process) gives the same columns
+    assert np.array_equal(NgramHasher(n_features=256).transform(TEXTS[:1]).toarray(), X[:1].toarray())
+    # l2-normalized per analyzer
+    assert np.allclose(np.linalg.norm(X[:, :256].toarray(), axis=1), 1.0)
+    assert len(hasher.feature_names_) == hasher.n_output_features == 512
+
+    X = NgramHasher(n_features=16, analyzers=("char",), norm=None).transform(["ab"])
+    # char_wb bigrams to 4-grams of " ab ": " a", "ab", "b ", " ab", "ab ", " ab "
+    assert X.sum() == 6
+
+    with pytest.raises(ValueError):
+        NgramHasher(analyzers=("pos",)).transform(TEXTS)
+
+    print("test_hasher_shape_and_determinism pass")
+
+
+def test_blocks_and_hstack():
+    hasher = NgramHasher(n_features=32)
+    blocks = list(iter_ngram_blocks(iter(TEXTS), hasher, block_size=2))
+    assert [b.shape[0] for b in blocks] == [2, 1]
+
+    dense = np.ones((3, 4), dtype=np.float32)
+    X = hstack_features(sp.csr_matrix(dense), hasher.transform(TEXTS))
+    assert X.shape == (3, 4 + 64) and X.indices.dtype == np.int32
+    assert np.array_equal(X[:, :4].toarray(), dense)
+
+    print("test_blocks_and_hstack pass")
+
+
+def test_feature_names_are_lazy():
+    hasher = NgramHasher(n_features=2 ** 18)
+    names = FeatureNames(["mean_word_len", "pronoun_density"], hasher)
+
+    assert len(names) == 2 + 2 ** 19
+    assert names[1] == "pronoun_density"
+    assert names[2] == "word_ngram_0" and names[np.int64(2 + 2 ** 18)] == "char_ngram_0"
+    assert names[-1] == f"char_ngram_{2 ** 18 - 1}"
+    assert names[:3] == ["mean_word_len", "pronoun_density", "word_ngram_0"]
+    assert names.hashed_columns == range(2, 2 + 2 ** 19)
+    with pytest.raises(IndexError):
+        names[len(names)]
+    # Nothing but the leading names is stored
+    assert len(pickle.dumps(names)) < 1000
+
+    # Same names as the list they stand in for
+    small = NgramHasher(n_features=3, analyzers=("char", "word"))
+    assert list(small.feature_names_) == [f"{a}_ngram_{i}" for a in ("char", "word") for i in range(3)]
+    assert list(small.get_feature_names_out()) == list(small.feature_names_)
+
+    print("test_feature_names_are_lazy pass")
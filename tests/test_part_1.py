@@ -12,8 +12,11 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import tempfile
+import zipfile
 from bs4 import BeautifulSoup
-from src.part_1 import extract_l1, extract_text, parse_html
+from src.part_1 import (extract_l1, extract_text, iter_zip_members, iterate_documents,
+                        parse_html, parse_html_fast)
 import unittest
 
 class TestExtraction(unittest.TestCase):
@@ -101,5 +104,119 @@ class TestExtraction(unittest.TestCase):
         self.assertIn(text, '')
         self.assertEqual(filename, "test.html")
 
+class TestFastExtraction(unittest.TestCase):
+    """
+    Test 'parse_html_fast' gives the same (l1, text, filename) as 'parse_html'
+    """
+    def assertSameAsBs4(self, html):
+        self.assertEqual(parse_html_fast(html, "test.html"), parse_html(html, "test.html"))
+
+    def test_fast_lang8_page(self):
+        # Lang-8 like page: profile list, nested markup and entities in the body
+        html = """
+        <html><head><title>Entry</title></head><body>
+        <ul class='user_info'>
+        <li class='gender'>Female</li>
+        <li class='speaking' data-title='Native language' rel='tooltip' title='Native language'>Japanese</li>
+        <li class='studying'>English</li>
+        </ul>
+        <div id='body_show_ori'><p>Today I went to   Tokyo.</p>
+        <p>It was fun &amp; tiring!<br/>See you&nbsp;soon.</p></div>
+        <div id='body_show_mod'>Corrected text</div>
+        </body></html>
+        """
+        self.assertSameAsBs4(html)
+
+    def test_fast_multiple_classes(self):
+        # 'speaking' is one of several classes
+        self.assertSameAsBs4("<li class='icon speaking'> <b>Korean</b> </li>")
+
+    def test_fast_skips_comments_and_scripts(self):
+        html = ("<div id='body_show_ori'>a<!-- hidden -->b"
+                "<script>var x = 1;</script>c<style>p {}</style>d</div>")
+        self.assertSameAsBs4(html)
+
+    def test_fast_first_match_wins(self):
+        html = ("<li class='speaking'>French</li><li class='speaking'>Spanish</li>"
+                "<div id='body_show_ori'>first</div><div id='body_show_ori'>second</div>")
+        self.assertSameAsBs4(html)
+
+    def test_fast_missing_and_empty(self):
+        # Missing elements, empty and whitespace-only documents
+        for html in ["<html><body></body></html>", "<html></html>", "", "   "]:
+            self.assertSameAsBs4(html)
+
+    def test_fast_stray_end_tags(self):
+        # An end tag with nothing to close still ends the string
+        self.assertSameAsBs4("<div id='body_show_ori'>a</span>b</div>")
+        self.assertSameAsBs4("<li class='speaking'>Fr<br>en</br>ch</br>!</li>")
+
+    def test_fast_no_implicit_closing(self):
+        # html.parser never closes <p> for a block, nor drops nested html/head/body
+        self.assertSameAsBs4("<div id='body_show_ori'>a<p>b<div>c</div>d</p>e</div>")
+        self.assertSameAsBs4("<div id='body_show_ori'>a<html>b<head>c</head><body>d</body>e</html>f</div>")
+
+    def test_fast_entities(self):
+        # Unknown entities lose their ';', bad character references stay as text
+        self.assertSameAsBs4("<div id='body_show_ori'>x &foo; y&amp;z &#65;&#x42; &#xZZ; &#12ab; &nbsp;.</div>")
+
+    def test_fast_character_references(self):
+        # windows-1252 code points, U+FFFD for invalid ones, HTML5-only names
+        self.assertSameAsBs4("<div id='body_show_ori'>&#150;&#x80;&#x81;&#0;&#xD800;&#1114112;"
+                             "&#x1F600;&#12ab;&#x1fg;&NotEqualTilde;&bigstar;&lt</div>")
+
+    def test_fast_raw_text_tags(self):
+        # Only script / style are raw text for html.parser, not xmp / iframe
+        self.assertSameAsBs4("<div id='body_show_ori'><xmp><b>x</b></xmp><iframe><i>y</i></iframe>z</div>")
+        self.assertSameAsBs4("<div id='body_show_ori'><![CDATA[cd]]>a<!DOCTYPE x>b<?pi?>c"
+                             "<template>t<b>u</b></template>v<pre>  </pre>w</div>")
+
+    def test_fast_unclosed_li(self):
+        # An unclosed <li class='speaking'> runs to the end of the page
+        self.assertSameAsBs4("<li class='speaking'>French<div id='body_show_ori'>text</div><li>Spanish")
+        self.assertSameAsBs4("<li class='speaking'>Ko<b>  </b>rean\n<li class='speaking'>Thai</li></li>")
+
+
+class TestZipStreaming(unittest.TestCase):
+    """
+    Test 'iter_zip_members' / 'iterate_documents' on a small zip
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.zip_path = Path(self.tmp.name) / "docs.zip"
+        self.members = [f"lang-8/{i}.html" for i in range(20)]
+        with zipfile.ZipFile(self.zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("lang-8/", "")
+            zf.writestr("lang-8/readme.txt", "not a document")
+            for i, member in enumerate(self.members):
+                zf.writestr(member, f"<li class='speaking'>French</li>"
+                                    f"<div id='body_show_ori'>Entry {i}</div>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_archive_order(self):
+        # Same members and bytes with and without the reader thread
+        threaded = list(iter_zip_members(self.zip_path, prefetch=2))
+        inline = list(iter_zip_members(self.zip_path, prefetch=0))
+        self.assertEqual([m for m, _ in threaded], self.members)
+        self.assertEqual(threaded, inline)
+
+    def test_allow_list(self):
+        # Bare filenames (as in train.txt) and full member names both match
+        allow = ["3.html", "lang-8/7.html", "missing.html"]
+        members = [m for m, _ in iter_zip_members(self.zip_path, allow=allow)]
+        self.assertEqual(members, ["lang-8/3.html", "lang-8/7.html"])
+
+    def test_early_close(self):
+        # Stopping after one member must not leave the reader thread blocked
+        stream = iter_zip_members(self.zip_path, prefetch=1)
+        self.assertEqual(next(stream)[0], self.members[0])
+        stream.close()
+
+    def test_iterate_documents(self):
+        documents = list(iterate_documents(self.zip_path, parser='fast', allow=["5.html"]))
+        self.assertEqual(documents, [("French", "Entry 5", "lang-8/5.html")])
+
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
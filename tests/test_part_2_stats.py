@@ -4,7 +4,10 @@ from pathlib import Path
 # Make sure `src` is importable when running this file directly
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.part_2_stats import text_stats, sentence_length_stats
+from src import part_2_analysis
+from src.part_2_stats import text_stats, text_stats_batch, TEXT_STATS_COLUMNS
+from src.part_2_stats import sentence_length_stats, sentence_length_stats_batch
+from src.part_2_stats import lemma_cache_info, lemmatize
 from src.part_2_lexicon_pos import extract_lexicon_features, get_POS_rato_features
 
 
@@ -44,6 +47,58 @@ def test_text_stats_empty():
     print("test_text_stats_empty pass")
 
 
+def test_text_stats_batch_matches_single(monkeypatch):
+    class FakeLemmatizer:
+        def lemmatize(self, token):
+            return token.rstrip("s")
+
+    monkeypatch.setattr(part_2_analysis, "get_lemmatizer", lambda: FakeLemmatizer())
+    lemmatize.cache_clear()
+    try:
+        texts = [
+            "Hello world! Hello again.",
+            "",
+            "!!! ...",
+            "123 456_7 a_b",
+            "Naïve café, 3rd time... x² ½ 一二三!",
+            "Dogs and cats; dogs, DOGS.",
+        ]
+        table = text_stats_batch(texts)
+
+        assert list(table.columns) == list(TEXT_STATS_COLUMNS)
+        assert table.shape == (len(texts), len(TEXT_STATS_COLUMNS))
+        # Exactly the per-document values, not just close to them
+        assert table.to_dict("records") == [text_stats(t) for t in texts]
+        assert text_stats_batch([]).shape == (0, len(TEXT_STATS_COLUMNS))
+    finally:
+        lemmatize.cache_clear()
+
+    print("test_text_stats_batch_matches_single pass")
+
+
+def test_lemma_cache_hits(monkeypatch):
+    calls = []
+
+    class FakeLemmatizer:
+        def lemmatize(self, token):
+            calls.append(token)
+            return token.rstrip("s")
+
+    monkeypatch.setattr(part_2_analysis, "get_lemmatizer", lambda: FakeLemmatizer())
+    lemmatize.cache_clear()
+    try:
+        assert [lemmatize(t) for t in ["dogs", "cats", "dogs", "dogs"]] == ["dog", "cat", "dog", "dog"]
+
+        # WordNet is only consulted once per distinct token
+        assert calls == ["dogs", "cats"]
+        info = lemma_cache_info()
+        assert (info.hits, info.misses) == (2, 2)
+    finally:
+        lemmatize.cache_clear()
+
+    print("test_lemma_cache_hits pass")
+
+
 def test_sentence_length_stats_basic():
     text = "This is a short sentence. This is a much longer sentence with many words."
     stats = sentence_length_stats(text, long_thresh=5)
@@ -87,6 +142,43 @@ def test_sentence_length_stats_variability():
     print("test_sentence_length_stats_variability pass")
 
 
+def test_sentence_length_stats_batch_matches_single():
+    texts = [
+        "Short sentence. This is definitely a much longer sentence with many many words in it.",
+        "",
+        "One sentence only",
+        "I went to Seoul!   Was it fun? Yes.",
+    ]
+    # Generator input: the batch API must also accept streams
+    batch = list(sentence_length_stats_batch((t for t in texts), batch_size=2))
+
+    assert batch == [sentence_length_stats(t) for t in texts]
+
+    print("test_sentence_length_stats_batch_matches_single pass")
+
+
+
+def test_one_segmentation_feeds_words_and_tags(monkeypatch):
+    batches = []
+
+    def fake_tag_batch(word_lists, backend=None):
+        batches.append(word_lists)
+        return [[(w, "NN") for w in words] for words in word_lists]
+
+    monkeypatch.setattr(part_2_analysis.taggers, "tag_batch", fake_tag_batch)
+    docs = list(part_2_analysis.analyze_batch(["Hello world. I can't go!", "One more."]))
+
+    assert docs[0].sentences == [["Hello", "world", "."], ["I", "ca", "n't", "go", "!"]]
+    assert docs[0].sentence_words == [["hello", "world", "."], ["i", "ca", "n't", "go", "!"]]
+    assert docs[0].words == ["hello", "world", ".", "i", "ca", "n't", "go", "!"]
+
+    # All sentences of the batch are tagged in one backend call
+    part_2_analysis.tag_docs(docs)
+    assert batches == [docs[0].sentence_words + docs[1].sentence_words]
+    assert docs[1].pos_tags == [("one", "NN"), ("more", "NN"), (".", "NN")]
+
+    print("test_one_segmentation_feeds_words_and_tags pass")
+
 # -----------------------
 # part_2_lexicon_pos.py tests
 # -----------------------
@@ -148,6 +240,7 @@ if __name__ == "__main__":
     test_sentence_length_stats_basic()
     test_sentence_length_stats_empty()
     test_sentence_length_stats_variability()
+    test_sentence_length_stats_batch_matches_single()
     test_lexicon_asian_top_word_match_false()
     test_lexicon_religious_feature_true()
     test_pos_ratio_all_in_range()
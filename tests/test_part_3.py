@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction import DictVectorizer
+
+from src.models import make_model
+from src.part_3 import vectorize
+from src.sparse import as_csr32
+from src.pipeline import PipelineConfig
+
+
+def _feature_dicts(n, seed):
+    # Sparse dicts like build_dataset's: zero-valued and missing keys mixed
+    rng = np.random.default_rng(seed)
+    dicts, labels = [], []
+    for _ in range(n):
+        a, b = rng.random(2)
+        features = {"article_ratio": a, "pronoun_density": b}
+        if rng.random() < 0.5:
+            features["Religious_Feature"] = True
+        dicts.append(features)
+        labels.append("Asian" if a + b > 1.0 else "European")
+    return dicts, labels
+
+
+def test_tree_fits_and_scores_dict_vectorizer_output():
+    X_train, y_train = _feature_dicts(200, 0)
+    X_dev, y_dev = _feature_dicts(100, 1)
+
+    # DictVectorizer's CSR has int64 indices, which trees refuse at predict time
+    raw = DictVectorizer(sparse=True, dtype=np.float32).fit_transform(X_train)
+    assert sp.issparse(raw) and raw.indices.dtype == np.int64
+    X = as_csr32(raw)
+    assert X.indices.dtype == np.int32 and X.indptr.dtype == np.int32
+    assert np.array_equal(X.toarray(), raw.toarray())
+
+    # The vectorize stage output goes straight into fit and score
+    outputs = vectorize(PipelineConfig(), {"documents": []}, {
+        "X_train": X_train, "y_train": y_train,
+        "X_dev": X_dev, "y_dev": y_dev,
+        "X_test": X_dev, "y_test": y_dev,
+    })
+    assert outputs["X_dev_array"].indices.dtype == np.int32
+    model = make_model("tree", stage="baseline").fit(outputs["X_train_array"], outputs["y_train"])
+    sparse_score = model.score(outputs["X_dev_array"], outputs["y_dev"])
+    assert sparse_score > 0.75
+
+    # Same score as on the dense matrices
+    dense = vectorize(PipelineConfig(sparse=False), {"documents": []}, {
+        "X_train": X_train, "y_train": y_train,
+        "X_dev": X_dev, "y_dev": y_dev,
+        "X_test": X_dev, "y_test": y_dev,
+    })
+    model = make_model("tree", stage="baseline").fit(dense["X_train_array"], dense["y_train"])
+    assert model.score(dense["X_dev_array"], dense["y_dev"]) == sparse_score
+
+    print("test_tree_fits_and_scores_dict_vectorizer_output pass")
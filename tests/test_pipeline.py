@@ -0,0 +1,119 @@
+import os
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import pipeline
+from src.pipeline import ArtifactStore, Pipeline, PipelineConfig
+
+
+def test_saved_outputs_reused_only_with_the_same_config(tmp_path, monkeypatch):
+    calls = []
+
+    def extract(config):
+        calls.append("extract")
+        return {"labels": config.label_scheme}
+
+    def vectorize(config, extract):
+        calls.append("vectorize")
+        return {"labels": extract["labels"], "ngrams": config.ngram_features}
+
+    def baseline(config, vectorize):
+        calls.append("baseline")
+        return {"model": config.model, **vectorize}
+
+    monkeypatch.setattr(pipeline, "STAGES", {
+        "extract": (extract, ()),
+        "vectorize": (vectorize, ("extract",)),
+        "baseline": (baseline, ("vectorize",)),
+    })
+    monkeypatch.setattr(pipeline, "STAGE_CONFIG", {
+        "extract": ("label_scheme",),
+        "vectorize": ("ngram_features",),
+        "baseline": ("model",),
+    })
+
+    def run(**settings):
+        calls.clear()
+        config = PipelineConfig(root=tmp_path, **settings)
+        return Pipeline(config).get("baseline")
+
+    assert run() == {"model": "tree", "labels": "binary", "ngrams": 0}
+    assert calls == ["extract", "vectorize", "baseline"]
+
+    # Same config: everything comes from disk; n_jobs is not part of it
+    assert run(n_jobs=1)["labels"] == "binary"
+    assert calls == []
+
+    # A model change only reruns the stage that uses it
+    assert run(model="linear")["model"] == "linear"
+    assert calls == ["baseline"]
+
+    # An upstream change invalidates the stages downstream of it
+    assert run(model="linear", label_scheme="family")["labels"] == "family"
+    assert calls == ["extract", "vectorize", "baseline"]
+
+    # Outputs saved without a fingerprint (older runs) are recomputed
+    ArtifactStore(tmp_path / "artifacts").fingerprint_path("baseline").unlink()
+    run(model="linear", label_scheme="family")
+    assert calls == ["baseline"]
+
+    print("test_saved_outputs_reused_only_with_the_same_config pass")
+
+
+def test_featurize_fingerprint_follows_pos_backend(tmp_path):
+    nltk = Pipeline(PipelineConfig(root=tmp_path))
+    spacy = Pipeline(PipelineConfig(root=tmp_path, pos_tagger="spacy"))
+    assert nltk.fingerprint("extract") == spacy.fingerprint("extract")
+    assert nltk.fingerprint("featurize") != spacy.fingerprint("featurize")
+    assert nltk.fingerprint("export") != spacy.fingerprint("export")
+
+    print("test_featurize_fingerprint_follows_pos_backend pass")
+
+
+def test_input_file_changes_invalidate_extract(tmp_path, monkeypatch):
+    calls = []
+
+    def extract(config):
+        calls.append("extract")
+        return {"train": config.train_split.read_text().split()}
+
+    monkeypatch.setattr(pipeline, "STAGES", {"extract": (extract, ())})
+    monkeypatch.setattr(pipeline, "STAGE_CONFIG", {"extract": ("source", "train_split")})
+
+    data = tmp_path / "data"
+    (data / "raw").mkdir(parents=True)
+    (data / "raw" / "lang-8.zip").write_bytes(b"zip")
+    (data / "train.txt").write_text("1.html\n")
+
+    def run():
+        calls.clear()
+        return Pipeline(PipelineConfig(root=tmp_path)).get("extract")
+
+    assert run() == {"train": ["1.html"]} and calls == ["extract"]
+    run()
+    assert calls == []
+
+    # Edited split list, even to the same size
+    (data / "train.txt").write_text("2.html\n")
+    stat = (data / "train.txt").stat()
+    os.utime(data / "train.txt", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert run() == {"train": ["2.html"]} and calls == ["extract"]
+
+    # Replaced zip
+    (data / "raw" / "lang-8.zip").write_bytes(b"new zip")
+    run()
+    assert calls == ["extract"]
+
+    # A corpus file built next to it becomes the source, then is rebuilt
+    (data / "processed").mkdir()
+    (data / "processed" / "lang-8.corpus").write_bytes(b"corpus")
+    run()
+    assert calls == ["extract"]
+    (data / "processed" / "lang-8.corpus").write_bytes(b"rebuilt corpus")
+    run()
+    assert calls == ["extract"]
+
+    print("test_input_file_changes_invalidate_extract pass")
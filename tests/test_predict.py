@@ -0,0 +1,248 @@
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.feature_extraction import DictVectorizer
+from sklearn.tree import DecisionTreeClassifier
+
+from src import part_2_analysis, predict, taggers
+from src.build_dataset import extractor_versions
+from src.ngrams import NgramHasher
+from src.part_2_stats import lemmatize
+from src.sparse import hstack_features
+from src.predict import (L2Classifier, MicroBatcher, document_text, load_bundle, make_handler,
+                         save_bundle, serve_stdin)
+
+
+class EchoClassifier:
+    """
+    Stands in for L2Classifier: labels a text by its length, records batch sizes.
+    """
+    model_name = "echo"
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, documents):
+        self.batches.append(len(documents))
+        return [{"label": "long" if len(d) > 5 else "short"} for d in documents]
+
+
+class FailingClassifier(EchoClassifier):
+    """
+    EchoClassifier that fails any batch containing "boom".
+    """
+
+    def predict(self, documents):
+        if "boom" in documents:
+            raise ValueError("cannot classify boom")
+        return super().predict(documents)
+
+
+def test_document_text_html_and_plain():
+    page = ("<html><li class='speaking'>French</li>"
+            "<div id='body_show_ori'>I went   to Paris.</div></html>")
+    assert document_text(page) == "I went to Paris."
+    # Non Lang-8 HTML -> all of its text
+    assert document_text("<div><p>Hello</p> <p>world</p></div>") == "Hello world"
+    # Plain text with a '<' is left alone
+    assert document_text("1 < 2 is true") == "1 < 2 is true"
+
+    print("test_document_text_html_and_plain pass")
+
+
+def test_bundle_roundtrip_and_extractor_check(tmp_path):
+    vec = DictVectorizer()
+    X = vec.fit_transform([{"a": 0.0, "b": 1.0}, {"a": 1.0, "b": 0.0}] * 5)
+    y = ["Asian", "European"] * 5
+    tree = DecisionTreeClassifier(random_state=521).fit(X, y)
+
+    path = save_bundle(tmp_path / "model.joblib", vec, {"tree": (tree, None), "cols": (tree, [0, 1])}, "tree")
+    clf = L2Classifier(load_bundle(path))
+    assert clf.model_name == "tree"
+    assert clf.classes == ["Asian", "European"]
+    with pytest.raises(ValueError):
+        L2Classifier(load_bundle(path), model="missing")
+
+    # A bundle trained with other extractor versions is refused
+    bundle = joblib.load(path)
+    bundle["extractors"] = [("lexicon", "0")]
+    joblib.dump(bundle, path)
+    with pytest.raises(ValueError):
+        load_bundle(path)
+
+    print("test_bundle_roundtrip_and_extractor_check pass")
+
+
+def test_bundle_with_ngrams_and_class_codes(tmp_path, monkeypatch):
+    # Hand-crafted features stand in as the text length only
+    monkeypatch.setattr(predict, "featurize_texts", lambda texts: [{"n": len(t)} for t in texts])
+    texts = ["I goed to school.", "Yesterday I went there."] * 5
+    vec = DictVectorizer(dtype=np.float32)
+    ngrams = NgramHasher(n_features=32)
+    X = hstack_features(vec.fit_transform([{"n": len(t)} for t in texts]), ngrams.transform(texts))
+    tree = DecisionTreeClassifier(random_state=521).fit(X, [0, 1] * 5)
+
+    path = save_bundle(tmp_path / "model.joblib", vec, {"tree": (tree, None)}, "tree",
+                       classes=["Asian", "European"], ngrams=ngrams)
+    clf = L2Classifier(load_bundle(path))
+    assert clf.classes == ["Asian", "European"]
+    assert [p["label"] for p in clf.predict(texts[:2])] == ["Asian", "European"]
+
+    print("test_bundle_with_ngrams_and_class_codes pass")
+
+
+def test_empty_text_is_classified(tmp_path, monkeypatch):
+    class FakeLemmatizer:
+        def lemmatize(self, token):
+            return token
+
+    # Real featurization, without NLTK data
+    monkeypatch.setattr(part_2_analysis, "get_lemmatizer", lambda: FakeLemmatizer())
+    monkeypatch.setattr(taggers, "tag_batch",
+                        lambda word_lists, backend=None: [[(w, "NN") for w in words] for words in word_lists])
+    lemmatize.cache_clear()
+
+    texts = ["I goed to school.", "Yesterday I went there."] * 5
+    vec = DictVectorizer()
+    tree = DecisionTreeClassifier(random_state=521).fit(vec.fit_transform(predict.featurize_texts(texts)),
+                                                        ["Asian", "European"] * 5)
+    clf = L2Classifier(load_bundle(save_bundle(tmp_path / "model.joblib", vec, {"tree": (tree, None)}, "tree")))
+
+    predictions = clf.predict(["", "I goed to school."])
+    assert len(predictions) == 2
+    assert predictions[0]["label"] in clf.classes
+
+    print("test_empty_text_is_classified pass")
+
+
+def test_bundle_featurizes_with_its_pos_tagger(tmp_path, monkeypatch):
+    class FakeLemmatizer:
+        def lemmatize(self, token):
+            return token
+
+    used = []
+
+    def fake_backend(name):
+        def tag(word_lists):
+            used.append(name)
+            return [[(w, "NN") for w in words] for words in word_lists]
+        return tag
+
+    monkeypatch.setattr(part_2_analysis, "get_lemmatizer", lambda: FakeLemmatizer())
+    monkeypatch.setattr(taggers, "TAGGERS", {name: fake_backend(name) for name in ("nltk", "spacy")})
+    monkeypatch.setattr(taggers, "_backend", "nltk")
+    lemmatize.cache_clear()
+
+    texts = ["I goed to school.", "Yesterday I went there."] * 5
+    with taggers.using_backend("spacy"):
+        X = predict.featurize_texts(texts)
+    vec = DictVectorizer()
+    tree = DecisionTreeClassifier(random_state=521).fit(vec.fit_transform(X), ["Asian", "European"] * 5)
+    path = save_bundle(tmp_path / "model.joblib", vec, {"tree": (tree, None)}, "tree", pos_tagger="spacy")
+
+    # This process runs nltk: the bundle still loads and tags with spacy
+    bundle = load_bundle(path)
+    assert bundle["pos_tagger"] == "spacy" and bundle["extractors"] != extractor_versions()
+    used.clear()
+    L2Classifier(bundle).predict(["I goed to school."])
+    assert used == ["spacy"] and taggers.get_backend() == "nltk"
+
+    # A tampered backend no longer matches the recorded extractor versions
+    bundle = joblib.load(path)
+    bundle["pos_tagger"] = "nltk"
+    joblib.dump(bundle, path)
+    with pytest.raises(ValueError):
+        load_bundle(path)
+
+    print("test_bundle_featurizes_with_its_pos_tagger pass")
+
+
+def test_micro_batcher_groups_requests():
+    clf = EchoClassifier()
+    # Long wait: everything submitted at once ends up in batches of max_batch
+    batcher = MicroBatcher(clf, max_batch=4, max_wait_ms=200)
+    futures = [batcher.submit("x" * i) for i in range(10)]
+    results = [f.result(timeout=5) for f in futures]
+    batcher.close()
+
+    assert [r["label"] for r in results] == ["short"] * 6 + ["long"] * 4
+    assert sum(clf.batches) == 10
+    assert max(clf.batches) == 4
+    assert len(clf.batches) < 10
+
+    print("test_micro_batcher_groups_requests pass")
+
+
+def test_failing_document_does_not_fail_its_batch():
+    clf = FailingClassifier()
+    batcher = MicroBatcher(clf, max_batch=8, max_wait_ms=200)
+    futures = [batcher.submit(text) for text in ["hi", "boom", "a longer text"]]
+    assert futures[0].result(timeout=5) == {"label": "short"}
+    assert futures[2].result(timeout=5) == {"label": "long"}
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=5)
+
+    # serve_stdin reports the failure on its line and goes on
+    stdout = io.StringIO()
+    serve_stdin(batcher, io.StringIO("hi\nboom\nbye\n"), stdout)
+    batcher.close()
+
+    lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert lines == [{"label": "short"}, {"error": "cannot classify boom"}, {"label": "short"}]
+
+    print("test_failing_document_does_not_fail_its_batch pass")
+
+
+def test_stdin_streaming_keeps_order():
+    batcher = MicroBatcher(EchoClassifier(), max_batch=8, max_wait_ms=1)
+    stdin = io.StringIO("hi\n\n" + json.dumps({"text": "a longer text"}) + "\nbye\n")
+    stdout = io.StringIO()
+    serve_stdin(batcher, stdin, stdout)
+    batcher.close()
+
+    lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert lines == [{"label": "short"}, {"label": "long"}, {"label": "short"}]
+
+    print("test_stdin_streaming_keeps_order pass")
+
+
+def test_http_predict():
+    batcher = MicroBatcher(EchoClassifier(), max_batch=8, max_wait_ms=1)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(batcher))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        request = urllib.request.Request(
+            url + "/predict", data=json.dumps({"texts": ["hi", "a longer text"]}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            body = json.loads(response.read())
+        assert body == {"predictions": [{"label": "short"}, {"label": "long"}]}
+
+        with urllib.request.urlopen(url + "/health", timeout=5) as response:
+            assert json.loads(response.read())["status"] == "ok"
+
+        bad = urllib.request.Request(url + "/predict", data=b"not json")
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(bad, timeout=5)
+        assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.close()
+
+    print("test_http_predict pass")
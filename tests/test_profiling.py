@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import csv
+import json
+
+import pytest
+
+from src import profiling
+
+
+@pytest.fixture
+def profiler():
+    profiling.enable()
+    profiling.reset()
+    yield profiling
+    profiling.enable(False)
+    profiling.reset()
+
+
+def test_disabled_records_nothing():
+    profiling.enable(False)
+    profiling.reset()
+    with profiling.record("stage:x"):
+        pass
+    assert profiling.snapshot() == {}
+
+    print("test_disabled_records_nothing pass")
+
+
+def test_record_accumulates_calls_and_time(profiler):
+    with profiler.record("extractor:pos", calls=10):
+        sum(range(10000))
+    with profiler.record("extractor:pos", calls=5):
+        pass
+
+    entry = profiler.snapshot()["extractor:pos"]
+    assert entry["calls"] == 15
+    assert entry["wall_s"] > 0
+    assert entry["cpu_s"] >= 0
+    assert entry["peak_rss_mb"] > 0
+
+    print("test_record_accumulates_calls_and_time pass")
+
+
+def test_merge_worker_totals(profiler):
+    with profiler.record("parse:lxml", calls=2):
+        pass
+    local = profiler.snapshot()["parse:lxml"]
+
+    profiler.merge({"parse:lxml": {"calls": 3, "wall_s": 1.0, "cpu_s": 0.5, "peak_rss_mb": 1e6}})
+
+    merged = profiler.snapshot()["parse:lxml"]
+    assert merged["calls"] == 5
+    assert merged["wall_s"] == pytest.approx(local["wall_s"] + 1.0)
+    # Peak RSS is the max over processes, not a sum
+    assert merged["peak_rss_mb"] == 1e6
+
+    print("test_merge_worker_totals pass")
+
+
+def test_write_report(profiler, tmp_path):
+    with profiler.record("stage:slow", calls=1):
+        sum(range(100000))
+    with profiler.record("stage:fast", calls=1):
+        pass
+
+    json_path, csv_path = profiler.write_report(tmp_path)
+
+    rows = json.loads(json_path.read_text())
+    # Slowest first
+    assert [row["name"] for row in rows] == ["stage:slow", "stage:fast"]
+    with open(csv_path) as f:
+        table = list(csv.DictReader(f))
+    assert list(table[0]) == list(profiling.REPORT_COLUMNS)
+    assert table[0]["name"] == "stage:slow"
+
+    print("test_write_report pass")
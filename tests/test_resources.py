@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import nltk
+import pytest
+
+from src import resources
+
+
+def test_offline_missing_data_raises_without_download(monkeypatch):
+    def missing(path):
+        raise LookupError(path)
+
+    def no_download(*args, **kwargs):
+        raise AssertionError("offline mode must not download")
+
+    monkeypatch.setattr(nltk.data, "find", missing)
+    monkeypatch.setattr(nltk, "download", no_download)
+    resources.require_nltk.cache_clear()
+    resources.set_offline(True)
+    try:
+        with pytest.raises(LookupError, match="offline"):
+            resources.require_nltk("wordnet")
+    finally:
+        resources.set_offline(False)
+        resources.require_nltk.cache_clear()
+
+    print("test_offline_missing_data_raises_without_download pass")
+
+
+def test_sentencizer_is_cached():
+    assert resources.get_sentencizer() is resources.get_sentencizer()
+
+    print("test_sentencizer_is_cached pass")
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sklearn.model_selection import GridSearchCV
+from sklearn.tree import DecisionTreeClassifier
+
+from src.search import run_search
+
+SMALL_GRID = {
+    "max_depth": [1, 2, 3, None],
+    "min_samples_leaf": [1, 5, 20],
+    "criterion": ["gini", "entropy"],
+}
+
+
+def test_chunked_grid_matches_gridsearchcv(toy_data):
+    X, y = toy_data(n=200, labels=["European", "Asian"], noise=0.2)
+    tree = DecisionTreeClassifier(random_state=521)
+
+    reference = GridSearchCV(tree, SMALL_GRID, scoring="accuracy").fit(X, y)
+    best, results = run_search(tree, X, y, mode="grid", param_space=SMALL_GRID,
+                               chunk_size=5, n_jobs=1, verbose=False)
+
+    assert best.get_params() == reference.best_estimator_.get_params()
+    assert np.allclose(results["mean_test_score"], reference.cv_results_["mean_test_score"])
+
+    print("test_chunked_grid_matches_gridsearchcv pass")
+
+
+def test_random_search_resumes_from_checkpoint(tmp_path, toy_data):
+    X, y = toy_data(n=200, labels=["European", "Asian"], noise=0.2)
+    tree = DecisionTreeClassifier(random_state=521)
+    checkpoint = tmp_path / "search.joblib"
+
+    # A zero time budget still scores the first chunk, then stops
+    _, partial = run_search(tree, X, y, mode="random", n_iter=12, time_budget=0,
+                            chunk_size=4, n_jobs=1, checkpoint=checkpoint, verbose=False)
+    assert len(partial) == 4
+
+    _, full = run_search(tree, X, y, mode="random", n_iter=12,
+                         chunk_size=4, n_jobs=1, checkpoint=checkpoint, verbose=False)
+    assert len(full) == 12
+    assert full.iloc[:4].equals(partial)
+
+    print("test_random_search_resumes_from_checkpoint pass")
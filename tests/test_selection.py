@@ -0,0 +1,121 @@
+import json
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from src import part_5, selection
+from src.models import make_model
+from src.ngrams import FeatureNames, NgramHasher
+from src.pipeline import PipelineConfig
+from src.selection import _n_drop, permutation_importances, select_features
+
+
+def test_n_drop():
+    assert _n_drop(1, 10, 1) == 1
+    assert _n_drop(3, 10, 1) == 3
+    # Fractions are of the remaining features, at least one
+    assert _n_drop(0.5, 10, 1) == 5 and _n_drop(0.5, 3, 1) == 1
+    # Never below min_features
+    assert _n_drop(5, 6, 4) == 2
+
+    print("test_n_drop pass")
+
+
+@pytest.mark.parametrize("method", ["importance", "permutation", "rfecv"])
+def test_methods_find_the_signal(method, toy_data):
+    X, y = toy_data(n_features=12)
+    for data in (X, sp.csr_matrix(X)):
+        result = select_features(make_model("tree", stage="ablation"), data, y, method=method, step=0.3, n_jobs=1)
+        assert result["support"].dtype == bool and len(result["support"]) == X.shape[1]
+        assert list(np.flatnonzero(result["support"])) == [0, 1]
+        assert result["timings"]["total_s"] > 0
+
+    result = select_features(make_model("tree"), X, y, method=method, min_features_to_select=4, n_jobs=1)
+    assert result["support"].sum() >= 4
+
+    print(f"test_methods_find_the_signal[{method}] pass")
+
+
+def test_rfecv_scores_and_fold_cache(tmp_path, monkeypatch, toy_data):
+    X, y = toy_data(n_features=12)
+    result = select_features(make_model("tree"), X, y, method="rfecv", step=0.5, cv=3, memory=tmp_path, n_jobs=1)
+
+    # 12 -> 6 -> 3 -> 2 -> 1 features
+    assert list(result["scores"]["n_features"]) == [12, 6, 3, 2, 1]
+    assert set(result["timings"]) == {"cv_s", "final_s", "total_s"}
+
+    # A rerun reads every fold from the cache: only the final elimination runs
+    calls = []
+    original = selection._eliminate
+
+    def counting(*args):
+        calls.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(selection, "_eliminate", counting)
+    again = select_features(make_model("tree"), X, y, method="rfecv", step=0.5, cv=3, memory=tmp_path, n_jobs=1)
+    assert len(calls) == 1
+    assert np.array_equal(again["support"], result["support"])
+    assert again["scores"].equals(result["scores"])
+
+    print("test_rfecv_scores_and_fold_cache pass")
+
+
+def test_permutation_importances_only_given_columns(toy_data):
+    X, y = toy_data(n_features=12)
+    model = make_model("tree", stage="ablation").fit(X, y)
+    table = permutation_importances(model, sp.csr_matrix(X), y, columns=[0, 5], n_repeats=3, n_jobs=2)
+
+    assert list(table["column"]) == [0, 5]
+    assert table["importance_mean"][0] > 0.1
+    # Shuffling a feature the tree never split on changes nothing
+    if model.feature_importances_[5] == 0:
+        assert table["importance_mean"][1] == 0
+
+    with pytest.raises(ValueError):
+        select_features(model, X, y, method="boruta")
+
+    print("test_permutation_importances_only_given_columns pass")
+
+
+def test_select_stage_uses_a_fractional_step_with_ngrams(tmp_path, monkeypatch, toy_data):
+    X, y = toy_data()
+    steps = []
+
+    def fake_select_features(estimator, X, y, step, **kwargs):
+        steps.append(step)
+        return {"support": np.array([True, False, False, True]), "scores": None, "timings": {"total_s": 0.0}}
+
+    monkeypatch.setattr(part_5, "select_features", fake_select_features)
+    hasher = NgramHasher(n_features=1)
+    tune = {"best_tree": make_model("tree")}
+
+    for ngrams, names, expected in [(None, ["a", "b", "c", "d"], 1),
+                                    (hasher, FeatureNames(["a", "b"], hasher), part_5.NGRAM_SELECTION_STEP)]:
+        vectorize = {"X_train_array": X, "y_train": y, "ngrams": ngrams, "feature_names": names}
+        result = part_5.select(PipelineConfig(root=tmp_path), vectorize, tune)
+        assert steps[-1] == expected
+        assert list(result["selected_columns"]) == [0, 3]
+
+    # Only hand-crafted columns are named; hashed ones are [start, stop) ranges
+    assert result["selected_features"] == ["a"]
+    assert result["selected_hashed_columns"] == [[3, 4]]
+    written = json.loads(PipelineConfig(root=tmp_path).selection_path.read_text())
+    assert written["selected_columns"] == [0] and written["selected_hashed_columns"] == [[3, 4]]
+    assert written["n_selected"] == 2
+
+    print("test_select_stage_uses_a_fractional_step_with_ngrams pass")
+
+
+def test_column_ranges():
+    assert part_5.column_ranges(np.array([], dtype=int)) == []
+    assert part_5.column_ranges(np.array([4])) == [[4, 5]]
+    assert part_5.column_ranges(np.array([2, 3, 4, 7, 9, 10])) == [[2, 5], [7, 8], [9, 11]]
+
+    print("test_column_ranges pass")
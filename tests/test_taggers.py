@@ -0,0 +1,129 @@
+import sys
+from pathlib import Path
+
+# Make sure `src` is importable when running this file directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import multiprocessing
+
+import pytest
+
+from src import part_2_analysis, taggers
+from src.build_dataset import extractor_versions, featurize_documents
+from src.part_2_stats import lemmatize
+from src.taggers import CachedTagger, agreement_report, in_group, split_sentences
+
+
+def context_free_tags(word_lists):
+    # Stands in for NLTK: tags from a fixed table, nouns otherwise
+    table = {"the": "DT", "a": "DT", "i": "PRP", "in": "IN", "can": "MD", "big": "JJ", ".": "."}
+    return [[(w, table.get(w, "NN")) for w in words] for words in word_lists]
+
+
+def test_split_sentences():
+    assert split_sentences(["hi", ".", "i", "am", "!", "ok"]) == [["hi", "."], ["i", "am", "!"], ["ok"]]
+    assert split_sentences([]) == []
+
+    print("test_split_sentences pass")
+
+
+def test_cached_tagger_lookup_and_cache():
+    calls = []
+
+    def base(sentences):
+        calls.extend(sentences)
+        return context_free_tags(sentences)
+
+    tagger = CachedTagger(base, lexicon={"the": "DT", "cat": "NN", ".": "."})
+    words = ["the", "cat", ".", "i", "can", ".", "the", "cat", "."]
+    tagged = tagger([words, ["i", "can", "."]])
+
+    assert tagged[0] == context_free_tags([words])[0]
+    # Lexicon-only sentences never reach the base tagger, repeats are cached
+    assert calls == [["i", "can", "."]]
+    assert tagger.cache_info().hits == 1
+
+    print("test_cached_tagger_lookup_and_cache pass")
+
+
+def test_in_group_articles_need_article_words():
+    assert in_group("the", "DT", "article")
+    assert not in_group("this", "DT", "article")
+    assert in_group("cats", "NNS", "noun")
+    assert not in_group("big", "JJ", "noun")
+
+    print("test_in_group_articles_need_article_words pass")
+
+
+def test_agreement_report(monkeypatch):
+    def noisy(word_lists):
+        # Tags every adjective as a noun
+        return [[(w, "NN" if t == "JJ" else t) for w, t in doc] for doc in context_free_tags(word_lists)]
+
+    def missing(word_lists):
+        raise LookupError("model not installed")
+
+    monkeypatch.setitem(taggers.TAGGERS, "nltk", context_free_tags)
+    monkeypatch.setitem(taggers.TAGGERS, "nltk_sents", noisy)
+    monkeypatch.setitem(taggers.TAGGERS, "spacy", missing)
+
+    # Two documents, the first with two sentences
+    docs = [[["the", "big", "dog", "."], ["i", "can", "."]], [["i", "can", "."]]]
+    rows = {row["backend"]: row for row in agreement_report(docs, ["nltk_sents", "spacy"])}
+
+    assert rows["nltk"]["token_agreement"] == 1.0
+    assert rows["nltk"]["docs"] == 2 and rows["nltk"]["tokens"] == 10
+    assert rows["nltk_sents"]["token_agreement"] == pytest.approx(9 / 10)
+    assert rows["nltk_sents"]["adjective_agreement"] == pytest.approx(9 / 10)
+    assert rows["nltk_sents"]["pronoun_agreement"] == 1.0
+    # One adjective out of the 7 words of the first document
+    assert rows["nltk_sents"]["max_ratio_diff"] == pytest.approx(1 / 7)
+    assert "skipped" in rows["spacy"]
+
+    print("test_agreement_report pass")
+
+
+def test_backend_changes_extractor_versions(monkeypatch):
+    monkeypatch.setattr(taggers, "_backend", "nltk")
+    monkeypatch.setenv("L2_POS_TAGGER", "nltk")
+    default = dict(extractor_versions())
+
+    taggers.set_backend("cached")
+    versions = dict(extractor_versions())
+    assert versions["pos"] == default["pos"] + "+cached"
+    assert versions["lexicon"] == default["lexicon"] + "+cached"
+    assert versions["sentence"] == default["sentence"]
+
+    with pytest.raises(ValueError):
+        taggers.set_backend("missing")
+
+    print("test_backend_changes_extractor_versions pass")
+
+
+def test_backend_reaches_workers(monkeypatch):
+    class FakeLemmatizer:
+        def lemmatize(self, token):
+            return token
+
+    # Each fake backend tags every word with its own tag
+    monkeypatch.setattr(part_2_analysis, "get_lemmatizer", lambda: FakeLemmatizer())
+    monkeypatch.setattr(taggers, "TAGGERS", {
+        "nltk": lambda word_lists: [[(w, "NN") for w in words] for words in word_lists],
+        "spacy": lambda word_lists: [[(w, "PRP") for w in words] for words in word_lists],
+    })
+    monkeypatch.setattr(taggers, "_backend", "nltk")
+    monkeypatch.setenv("L2_POS_TAGGER", "nltk")
+    lemmatize.cache_clear()
+
+    records = [{"member": f"{i}.html", "content_hash": None, "text": "I saw it."} for i in range(4)]
+    for n_jobs in (1, 2):
+        features = featurize_documents(records, n_jobs=n_jobs, pos_tagger="spacy")
+        assert [f["pronoun_density"] for f in features] == [1.0] * 4
+        assert taggers.get_backend() == "nltk"
+
+    # set_backend also reaches processes that do not fork from this one
+    taggers.set_backend("spacy")
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        assert pool.apply(taggers.get_backend) == "spacy"
+
+    print("test_backend_reaches_workers pass")